@@ -3,19 +3,36 @@ ResearchForge AI - Deployable Agent
 Multi-agent research collaboration platform
 """
 
-from google.adk.agents import Agent
-from google.adk.tools import FunctionTool
-import vertexai
 import os
-import requests
-import xml.etree.ElementTree as ET
+import threading
 from typing import Dict, Any
 
-# Initialize Vertex AI
-vertexai.init(
-    project=os.environ.get("GOOGLE_CLOUD_PROJECT", "your-project-id"),
-    location=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"),
-)
+# Heavy SDKs (vertexai, google.adk, requests) are imported on first use so
+# that importing this module stays cheap for worker boot and cold starts.
+_init_lock = threading.Lock()
+_vertexai_initialized = False
+_root_agent = None
+
+
+def init_vertexai() -> None:
+    """
+    Initialize Vertex AI once per process.
+    
+    Safe to call repeatedly and from multiple threads; only the first call
+    imports the SDK and runs vertexai.init().
+    """
+    global _vertexai_initialized
+    if _vertexai_initialized:
+        return
+    with _init_lock:
+        if _vertexai_initialized:
+            return
+        import vertexai
+        vertexai.init(
+            project=os.environ.get("GOOGLE_CLOUD_PROJECT", "your-project-id"),
+            location=os.environ.get("GOOGLE_CLOUD_LOCATION", "us-central1"),
+        )
+        _vertexai_initialized = True
 
 
 # ============================================================================
@@ -38,6 +55,9 @@ def advanced_arxiv_search(
     Returns:
         Dictionary with search results
     """
+    import requests
+    import xml.etree.ElementTree as ET
+    
     try:
         base_url = "http://export.arxiv.org/api/query"
         
@@ -196,11 +216,7 @@ Best regards,
 # MAIN AGENT DEFINITION
 # ============================================================================
 
-root_agent = Agent(
-    name="ResearchForgeAI",
-    model="gemini-2.5-flash",
-    description="Multi-agent research collaboration platform for finding papers, researchers, and generating proposals",
-    instruction="""You are ResearchForge AI, a research collaboration assistant.
+AGENT_INSTRUCTION = """You are ResearchForge AI, a research collaboration assistant.
 
 Your capabilities:
 1. Search arXiv for research papers (use advanced_arxiv_search)
@@ -212,10 +228,41 @@ When users ask to:
 - "Generate proposal" → Use generate_research_proposal with defaults
 - "Draft email" → Use draft_collaboration_email with defaults
 
-Be proactive and use tools immediately with reasonable defaults.""",
-    tools=[
-        FunctionTool(advanced_arxiv_search),
-        FunctionTool(generate_research_proposal),
-        FunctionTool(draft_collaboration_email)
-    ]
-)
\ No newline at end of file
+Be proactive and use tools immediately with reasonable defaults."""
+
+
+def build_root_agent():
+    """
+    Build (once) and return the ResearchForge root agent.
+    
+    Initializes Vertex AI and imports google.adk on the first call.
+    """
+    global _root_agent
+    if _root_agent is not None:
+        return _root_agent
+    init_vertexai()
+    with _init_lock:
+        if _root_agent is None:
+            from google.adk.agents import Agent
+            from google.adk.tools import FunctionTool
+            
+            _root_agent = Agent(
+                name="ResearchForgeAI",
+                model="gemini-2.5-flash",
+                description="Multi-agent research collaboration platform for finding papers, researchers, and generating proposals",
+                instruction=AGENT_INSTRUCTION,
+                tools=[
+                    FunctionTool(advanced_arxiv_search),
+                    FunctionTool(generate_research_proposal),
+                    FunctionTool(draft_collaboration_email)
+                ]
+            )
+    return _root_agent
+
+
+def __getattr__(name: str):
+    # `root_agent` keeps working as a module attribute for ADK / Agent Engine,
+    # but is only constructed when something actually asks for it.
+    if name == "root_agent":
+        return build_root_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,243 @@
+"""
+Benchmark script for ResearchForge AI
+Run this locally to catch performance regressions before deploying
+"""
+
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+# Import-time budget for `import main` (milliseconds, sum of -X importtime self times)
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '600'))
+
+# Modules that must NOT be imported while importing the web app / agent.
+# They are loaded lazily on first use or from the warmup hook.
+DEFERRED_MODULES = ('google.genai', 'google.adk', 'vertexai', 'requests')
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)')
+
+
+def measure_import_time(module: str):
+    """
+    Import a module in a fresh interpreter with `-X importtime`.
+    
+    Returns:
+        Tuple of (total_ms, direct, imported) where direct is a list of
+        (cumulative_ms, name) for the modules imported directly by `module`,
+        slowest first, and imported is the set of every module name loaded.
+    """
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    
+    total_us = 0
+    pending = []
+    direct = []
+    imported = set()
+    # Children are reported before their parent, one extra space per level
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        total_us += int(self_us)
+        imported.add(name)
+        depth = len(indent) // 2
+        if depth == 1:
+            pending.append((int(cumulative_us) / 1000, name))
+        elif depth == 0:
+            if name == module:
+                direct = pending
+            pending = []
+    
+    direct.sort(reverse=True)
+    return total_us / 1000, direct, imported
+
+
+# ============================================================================
+# BENCHMARKS
+# ============================================================================
+
+def bench_import_time() -> bool:
+    """Benchmark 1: Import-time budget for main.py and agent.py"""
+    print("\n" + "="*70)
+    print("BENCHMARK 1: Import Time (-X importtime)")
+    print("="*70)
+    
+    ok = True
+    for module in ('main', 'agent'):
+        # Warm the bytecode cache so we measure imports, not compilation
+        measure_import_time(module)
+        total_ms, direct, imported = measure_import_time(module)
+        
+        print(f"\nimport {module}: {total_ms:.1f} ms (budget {IMPORT_BUDGET_MS:.0f} ms)")
+        for cumulative_ms, name in direct[:8]:
+            print(f"   {cumulative_ms:8.1f} ms  {name}")
+        
+        eager = sorted(
+            name for name in imported
+            if any(name == m or name.startswith(m + '.') for m in DEFERRED_MODULES)
+        )
+        if eager:
+            ok = False
+            print(f"❌ Eagerly imported: {', '.join(eager[:5])}")
+        if total_ms > IMPORT_BUDGET_MS:
+            ok = False
+            print(f"❌ Over budget by {total_ms - IMPORT_BUDGET_MS:.1f} ms")
+        elif not eager:
+            print("✅ Within budget")
+    
+    return ok
+
+
+def _sample_papers(count: int, seed: int = 7):
+    """Synthetic arXiv-like papers as plain dicts (the pre-PaperRecord shape)."""
+    rng = random.Random(seed)
+    # Realistic overlap: a pool of authors that recur across results
+    pool = [f"Author{i} Surname{i % 97}" for i in range(count // 4 + 1)]
+    papers = []
+    for i in range(count):
+        arxiv_id = f"24{i % 12 + 1:02d}.{i:05d}v1"
+        papers.append({
+            'title': f"A study of topic {i} with transformers",
+            'authors': [rng.choice(pool) for _ in range(rng.randint(1, 6))],
+            'arxiv_id': arxiv_id,
+            'published': f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            'abstract': ' '.join(f"word{rng.randint(0, 5000)}" for _ in range(70))[:500],
+            'pdf_url': f"https://arxiv.org/pdf/{arxiv_id}",
+            'web_url': f"https://arxiv.org/abs/{arxiv_id}",
+        })
+    return papers
+
+
+def _retained_bytes(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    value = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del value
+    return size
+
+
+def bench_paper_records() -> bool:
+    """Benchmark 2: Memory per cached paper and JSON serialization throughput"""
+    print("\n" + "="*70)
+    print("BENCHMARK 2: Paper Records (memory + JSON)")
+    print("="*70)
+    
+    from papers import PaperRecord, dumps_json, orjson
+    
+    count = 20000
+    # Each paper comes from its own parse, so strings are not shared up front
+    raw = json.dumps(_sample_papers(count))
+    
+    dict_bytes = _retained_bytes(lambda: json.loads(raw))
+    record_bytes = _retained_bytes(
+        lambda: [PaperRecord.from_dict(p) for p in json.loads(raw)]
+    )
+    print(f"\nMemory per paper ({count} papers):")
+    print(f"   dict:        {dict_bytes / count:8.0f} bytes")
+    print(f"   PaperRecord: {record_bytes / count:8.0f} bytes "
+          f"({100 * (1 - record_bytes / dict_bytes):.0f}% less)")
+    
+    dicts = json.loads(raw)
+    records = [PaperRecord.from_dict(p) for p in dicts]
+    payload_size = 100
+    
+    def throughput(encode, papers) -> float:
+        chunks = [papers[i:i + payload_size] for i in range(0, len(papers), payload_size)]
+        start = time.perf_counter()
+        for chunk in chunks:
+            encode({"status": "success", "papers": chunk})
+        return len(papers) / (time.perf_counter() - start)
+    
+    baseline = throughput(lambda obj: json.dumps(obj, sort_keys=True).encode('utf-8'), dicts)
+    fast = throughput(lambda obj: dumps_json(obj, sort_keys=True), records)
+    encoder = "orjson" if orjson is not None else "stdlib (orjson not installed)"
+    print(f"\nJSON serialization ({payload_size} papers per response):")
+    print(f"   json.dumps(dicts):          {baseline:10.0f} papers/s")
+    print(f"   dumps_json(records) {encoder}: {fast:10.0f} papers/s ({fast / baseline:.1f}x)")
+    
+    ok = record_bytes < dict_bytes
+    print("✅ Records are smaller" if ok else "❌ Records are not smaller than dicts")
+    return ok
+
+
+def bench_suggest() -> bool:
+    """Benchmark 3: Typeahead latency on a large prefix index"""
+    print("\n" + "="*70)
+    print("BENCHMARK 3: Suggestions (/api/suggest index)")
+    print("="*70)
+    
+    from suggest import QUERY_WEIGHT, TITLE_WEIGHT, create_suggest_index
+    
+    rng = random.Random(11)
+    vocabulary = [f"term{i}" for i in range(5000)] + [
+        'graph', 'neural', 'network', 'quantum', 'learning', 'deep', 'transformer'
+    ]
+    items = [
+        (' '.join(rng.choice(vocabulary) for _ in range(rng.randint(2, 8))),
+         rng.choice((QUERY_WEIGHT, TITLE_WEIGHT)), 'title')
+        for _ in range(100000)
+    ]
+    
+    index = create_suggest_index()
+    start = time.perf_counter()
+    index.add_many(items)
+    print(f"\nBuilt index of {len(index)} terms in {time.perf_counter() - start:.2f} s")
+    
+    ok = True
+    for prefix in ('t', 'te', 'term1', 'term12 ', 'gra', 'quantum le', 'machine'):
+        runs = 500
+        start = time.perf_counter()
+        for _ in range(runs):
+            index.suggest(prefix)
+        micros = (time.perf_counter() - start) / runs * 1e6
+        ok = ok and micros < 1000
+        print(f"   {prefix!r:14} {micros:8.1f} us")
+    
+    print("✅ All lookups under 1 ms" if ok else "❌ Some lookups took 1 ms or more")
+    return ok
+
+
+def run_all_benchmarks() -> bool:
+    """Run all benchmarks"""
+    print("\n" + "="*70)
+    print("⏱️  RESEARCHFORGE AI - BENCHMARKS")
+    print("="*70)
+    
+    results = [
+        bench_import_time(),
+        bench_paper_records(),
+        bench_suggest(),
+    ]
+    return all(results)
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+if __name__ == "__main__":
+    sys.exit(0 if run_all_benchmarks() else 1)
@@ -0,0 +1,551 @@
+"""
+ResearchForge AI - Caching
+Cache backends for search results and other recomputable values: a
+process-local TTL/LRU cache, and SQLite / Redis-protocol backends shared by
+every gunicorn worker (and, for Redis, every instance).
+"""
+
+import itertools
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import closing
+from typing import Any, Callable, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend:
+    """
+    Interface shared by all cache backends.
+
+    Subclasses implement get/set/add/delete. Shared backends store bytes;
+    LocalCache accepts any value. Backend failures never propagate: reads
+    degrade to misses and writes are dropped.
+    """
+
+    backend = 'base'
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        """Set `key` only if it is absent (or expired); True if it was set."""
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def available(self) -> bool:
+        """False while the backend is unreachable (operations are no-ops)."""
+        return True
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Optional[Any]],
+        ttl_seconds: Optional[float] = None,
+        lock_seconds: float = 30.0,
+        wait_seconds: float = 20.0
+    ) -> Optional[Any]:
+        """
+        Return the cached value, computing it at most once across processes.
+
+        On a miss, one caller takes a short-lived lock key and runs
+        `compute()`; concurrent callers (in any worker sharing the backend)
+        poll for its result instead of computing it again. If the lock
+        holder fails or `wait_seconds` pass, waiters compute for themselves.
+        A `None` result is returned but not cached.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument callable producing the value
+            ttl_seconds: TTL for the computed value (default: backend TTL)
+            lock_seconds: Lock expiry, bounds how long a crashed holder blocks others
+            wait_seconds: Longest time to wait for another caller's result
+
+        Returns:
+            Cached or freshly computed value
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex.encode()
+        give_up = time.monotonic() + wait_seconds
+        delay = 0.01
+        while not self.add(lock_key, token, lock_seconds):
+            if not self.available() or time.monotonic() >= give_up:
+                logger.info(f"Computing {key} without the cache lock")
+                return compute()
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            value = self.get(key)
+            if value is not None:
+                return value
+
+        try:
+            value = compute()
+            if value is not None:
+                self.set(key, value, ttl_seconds)
+            return value
+        finally:
+            # Only release our own lock; it may have expired and been re-taken
+            if self.get(lock_key) == token:
+                self.delete(lock_key)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+
+class LocalCache(CacheBackend):
+    """
+    Process-local cache with per-entry TTL and an LRU bound on entry count.
+
+    Entries are kept in least-recently-used order, so eviction only looks
+    at the front of the OrderedDict.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def add(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> bool:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and entry[0] >= now:
+                return False
+            self._entries[key] = (now + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# ============================================================================
+# SHARED BACKENDS
+# ============================================================================
+
+# Shared backends whose per-thread connections must be dropped in forked children
+_fork_safe = weakref.WeakSet()
+
+# Connections inherited across fork. They belong to the parent, so the child
+# must neither use nor close them (closing an SQLite handle in the child can
+# release the parent's file locks); they are simply kept alive here.
+_inherited: List[Any] = []
+
+
+def _reset_after_fork() -> None:
+    for backend in list(_fork_safe):
+        backend._reset_connections()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class _SharedCache(CacheBackend):
+    """
+    Common plumbing for backends shared between processes.
+
+    Connections are per thread, and re-created after fork (gunicorn
+    `preload_app` forks workers from a master that may already hold one).
+    After a failure the backend is skipped for `retry_seconds`, so an
+    outage costs one connection attempt per interval rather than per call.
+    """
+
+    retry_seconds = 5.0
+
+    def __init__(self, prefix: str, ttl_seconds: float):
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self._down_until = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._local = threading.local()
+        _fork_safe.add(self)
+
+    def _reset_connections(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            _inherited.append(conn)
+        self._local = threading.local()
+
+    def available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        self._down_until = time.monotonic() + self.retry_seconds
+        logger.warning(f"{self.backend} cache {operation} failed, bypassing for {self.retry_seconds:.0f}s: {error}")
+        self._drop_connection()
+
+    def _drop_connection(self) -> None:
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _count(self, value: Optional[bytes]) -> Optional[bytes]:
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+
+class SQLiteCache(_SharedCache):
+    """
+    Cache in an SQLite file, shared by every worker on the same host.
+
+    WAL journaling lets readers proceed while a writer commits. Expired
+    rows are ignored on read and purged, together with the oldest rows
+    beyond `max_entries`, every `evict_every` writes. Eviction and `len()`
+    only look at this cache's `prefix`, so namespaces sharing the file do
+    not evict each other.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(
+        self,
+        path: str,
+        prefix: str = '',
+        max_entries: int = 10000,
+        ttl_seconds: float = 300,
+        evict_every: int = 200
+    ):
+        super().__init__(prefix, ttl_seconds)
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_every = evict_every
+        # next() on a count is atomic, so concurrent sets never share a tick
+        self._writes = itertools.count(1)
+        # Schema setup on a throwaway connection, so none is held across fork
+        with closing(sqlite3.connect(path, timeout=10, isolation_level=None)) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_expires_at"
+                " ON cache_entries (expires_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.available():
+            return self._count(None)
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?",
+                (self.prefix + key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            self._failed('get', e)
+            return None
+        return self._count(bytes(row[0]) if row is not None else None)
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        if not self.available():
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (self.prefix + key, value, time.time() + ttl)
+            )
+            if next(self._writes) % self.evict_every == 0:
+                self._evict(conn)
+        except sqlite3.Error as e:
+            self._failed('set', e)
+
+    def add(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> bool:
+        if not self.available():
+            return False
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        try:
+            # Take over the row only if it is missing or expired
+            cursor = self._connect().execute(
+                "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at"
+                " WHERE cache_entries.expires_at <= ?",
+                (self.prefix + key, value, now + ttl, now)
+            )
+            return cursor.rowcount == 1
+        except sqlite3.Error as e:
+            self._failed('add', e)
+            return False
+
+    def delete(self, key: str) -> None:
+        if not self.available():
+            return
+        try:
+            self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (self.prefix + key,))
+        except sqlite3.Error as e:
+            self._failed('delete', e)
+
+    def _key_range(self) -> Tuple[str, str]:
+        """Bounds of this namespace's keys; the table is shared by all prefixes."""
+        return self.prefix, self.prefix + '\uffff'
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        low, high = self._key_range()
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key >= ? AND key < ? AND expires_at <= ?",
+            (low, high, time.time())
+        )
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            " SELECT key FROM cache_entries WHERE key >= ? AND key < ?"
+            " ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (low, high, self.max_entries)
+        )
+
+    def __len__(self) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM cache_entries WHERE key >= ? AND key < ?", self._key_range()
+        ).fetchone()[0]
+
+
+class RedisError(Exception):
+    """Error reply from a Redis-protocol server."""
+
+
+class RedisCache(_SharedCache):
+    """
+    Cache on a Redis-protocol (RESP) server, shared across hosts.
+
+    A minimal built-in client (GET / SET PX [NX] / DEL) keeps this free of
+    extra dependencies; it works with Redis, Valkey, KeyDB, Memorystore
+    and any RESP-compatible stand-in. One socket per thread.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, url: str, prefix: str = '', ttl_seconds: float = 300, timeout: float = 1.0):
+        super().__init__(prefix, ttl_seconds)
+        parts = urlsplit(url)
+        self.host = parts.hostname or 'localhost'
+        self.port = parts.port or 6379
+        self.username = unquote(parts.username) if parts.username else None
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+
+    def _connect(self) -> Tuple[socket.socket, Any]:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = _RespConnection(sock)
+            if self.password:
+                auth = (self.username, self.password) if self.username else (self.password,)
+                conn.command('AUTH', *auth)
+            if self.db:
+                conn.command('SELECT', self.db)
+        return conn
+
+    def _ttl_ms(self, ttl_seconds: Optional[float]) -> int:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        return max(1, int(ttl * 1000))
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.available():
+            return self._count(None)
+        try:
+            return self._count(self._connect().command('GET', self.prefix + key))
+        except (OSError, RedisError) as e:
+            self._failed('get', e)
+            return None
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        if not self.available():
+            return
+        try:
+            self._connect().command('SET', self.prefix + key, value, 'PX', self._ttl_ms(ttl_seconds))
+        except (OSError, RedisError) as e:
+            self._failed('set', e)
+
+    def add(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> bool:
+        if not self.available():
+            return False
+        try:
+            reply = self._connect().command(
+                'SET', self.prefix + key, value, 'PX', self._ttl_ms(ttl_seconds), 'NX'
+            )
+            return reply is not None
+        except (OSError, RedisError) as e:
+            self._failed('add', e)
+            return False
+
+    def delete(self, key: str) -> None:
+        if not self.available():
+            return
+        try:
+            self._connect().command('DEL', self.prefix + key)
+        except (OSError, RedisError) as e:
+            self._failed('delete', e)
+
+    def ping(self) -> bool:
+        if not self.available():
+            return False
+        try:
+            return self._connect().command('PING') == b'PONG'
+        except (OSError, RedisError) as e:
+            self._failed('ping', e)
+            return False
+
+
+class _RespConnection:
+    """One RESP2 connection: encodes commands and parses replies."""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def command(self, *args) -> Any:
+        out = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif not isinstance(arg, bytes):
+                arg = str(arg).encode('ascii')
+            out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(out))
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise ConnectionError("Connection closed by cache server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b'+':
+            return payload
+        if kind == b'-':
+            raise RedisError(payload.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(payload)
+        if kind == b'$':
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by cache server")
+            return data[:-2]
+        if kind == b'*':
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply type {kind!r}")
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+        finally:
+            self.sock.close()
+
+
+def create_cache(namespace: str, max_entries: int = 512, ttl_seconds: float = 300) -> CacheBackend:
+    """
+    Build a cache for one namespace, configured by environment variables.
+
+    CACHE_BACKEND: "memory" (default, per process), "sqlite" (shared by the
+    workers on one host) or "redis" (shared by every instance)
+    CACHE_URL: SQLite file path (default /tmp/researchforge_cache.db) or
+    redis://[user:password@]host:port/db
+    CACHE_TIMEOUT_SECONDS: Redis socket timeout (default 1)
+
+    Args:
+        namespace: Key prefix, so namespaces can share one backend
+        max_entries: Entry bound (memory and SQLite backends)
+        ttl_seconds: Default entry TTL
+    """
+    backend = os.environ.get('CACHE_BACKEND', 'memory').lower()
+    prefix = f"researchforge:{namespace}:"
+    if backend == 'sqlite':
+        path = os.environ.get('CACHE_URL', '/tmp/researchforge_cache.db')
+        logger.info(f"Using SQLite cache at {path} for {namespace}")
+        return SQLiteCache(path, prefix=prefix, max_entries=max_entries, ttl_seconds=ttl_seconds)
+    if backend == 'redis':
+        url = os.environ.get('CACHE_URL', 'redis://localhost:6379/0')
+        logger.info(f"Using Redis cache at {urlsplit(url).hostname} for {namespace}")
+        return RedisCache(
+            url, prefix=prefix, ttl_seconds=ttl_seconds,
+            timeout=float(os.environ.get('CACHE_TIMEOUT_SECONDS', 1.0))
+        )
+    if backend != 'memory':
+        logger.warning(f"Unknown CACHE_BACKEND '{backend}', using in-memory cache")
+    return LocalCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
@@ -0,0 +1,515 @@
+"""
+ResearchForge AI - Gemini Context Caching
+Provider-side cached content for the static chat system instruction and for
+long session prefixes, with a transparent fallback to uncached requests.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import CacheBackend
+from resilience import error_status, is_retryable
+from sessions import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class ContextCacheManager:
+    """
+    Tracks cached-content handles per model and uses them when generating.
+
+    Two kinds of handles are kept:
+    - one per model holding only the system instruction (refreshed before
+      expiry and reused by every request), used only when the instruction
+      alone reaches the provider minimum `min_tokens`, and
+    - one per (model, session) holding the system instruction plus a prefix
+      of that session's history, created once system instruction and prefix
+      together reach `min_tokens` and re-created whenever the uncached part
+      of the history grows past `session_min_tokens`.
+
+    Prompts below the minimum are never sent to caches.create. Any failure
+    to create or use a cache falls back to a plain request. A 400/404 saying
+    the model does not support caching backs off for that model for
+    `unsupported_backoff_seconds`; any other create failure (throttling,
+    outages, timeouts) only for `error_backoff_seconds`. Session handles and
+    their locks are dropped once idle for `session_ttl_seconds`.
+
+    The default `min_tokens` is the smallest explicit-cache minimum of the
+    Gemini Flash models the chat uses. The bundled system instruction is far
+    below it, so its static handle only applies to deployments with a longer
+    instruction; the chat prompt is cached together with session history.
+
+    With a `shared` cache backend, system-instruction handles and the
+    unsupported-model backoff are published there, so gunicorn workers and
+    instances reuse one provider cache per model instead of creating their own.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        ttl_seconds: int = 3600,
+        refresh_margin_seconds: int = 300,
+        session_ttl_seconds: int = 900,
+        min_tokens: int = 1024,
+        session_min_tokens: int = 1024,
+        unsupported_backoff_seconds: int = 3600,
+        error_backoff_seconds: int = 60,
+        shared: Optional[CacheBackend] = None
+    ):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self.min_tokens = min_tokens
+        self.session_min_tokens = session_min_tokens
+        self.unsupported_backoff_seconds = unsupported_backoff_seconds
+        self.error_backoff_seconds = error_backoff_seconds
+        self.shared = shared
+
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple, threading.Lock] = {}
+        # (model, fingerprint) -> handle dict for system-instruction caches
+        self._static: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # (model, session_id) -> handle dict for session-prefix caches
+        self._sessions: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # (model, kind) -> monotonic time until which caching is skipped
+        self._unsupported: Dict[Tuple[str, str], float] = {}
+        self._next_sweep = time.monotonic() + session_ttl_seconds
+
+        self._metrics = {
+            "requests": 0,
+            "cache_hits": 0,
+            "caches_created": 0,
+            "caches_refreshed": 0,
+            "cache_errors": 0,
+            "cached_tokens": 0,
+            "cached_latency_ms_total": 0.0,
+            "uncached_latency_ms_total": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def generate(
+        self,
+        client,
+        types,
+        model: str,
+        system_instruction: str,
+        contents: List[Any],
+        session_id: Optional[str] = None,
+        **config_kwargs
+    ):
+        """
+        Call generate_content, using cached content when available.
+
+        Args:
+            client: google.genai Client
+            types: google.genai.types module
+            model: Model name
+            system_instruction: Static system prompt
+            contents: Conversation contents; the last item is the new message
+            session_id: Chat session, enables session-prefix caching
+            **config_kwargs: Extra GenerateContentConfig fields
+
+        Returns:
+            The generate_content response
+        """
+        # Cache management calls share the request's per-attempt timeout
+        http_options = config_kwargs.get('http_options')
+        handle, remaining = self._prepare(
+            client, types, model, system_instruction, contents, session_id, http_options
+        )
+        if handle is not None:
+            start = time.perf_counter()
+            try:
+                response = client.models.generate_content(
+                    model=model,
+                    contents=remaining,
+                    config=types.GenerateContentConfig(
+                        cached_content=handle['name'], **config_kwargs
+                    )
+                )
+                self._record(response, time.perf_counter() - start, cached=True)
+                return response
+            except Exception as cache_error:
+                # Throttling / outages are the caller's to retry, not a cache problem
+                if is_retryable(cache_error):
+                    raise
+                # Most likely an expired or evicted handle: drop it and retry plain
+                logger.warning(f"Cached request failed for {model}, retrying uncached: {cache_error}")
+                self._invalidate(model, handle)
+
+        start = time.perf_counter()
+        response = client.models.generate_content(
+            model=model,
+            contents=contents,
+            config=types.GenerateContentConfig(
+                system_instruction=system_instruction, **config_kwargs
+            )
+        )
+        self._record(response, time.perf_counter() - start, cached=False)
+        return response
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of cache usage and estimated savings."""
+        with self._lock:
+            m = dict(self._metrics)
+            active = len(self._static) + len(self._sessions)
+        uncached_calls = m["requests"] - m["cache_hits"]
+        avg_cached = m["cached_latency_ms_total"] / m["cache_hits"] if m["cache_hits"] else None
+        avg_uncached = m["uncached_latency_ms_total"] / uncached_calls if uncached_calls else None
+        saved_ms = None
+        if avg_cached is not None and avg_uncached is not None:
+            saved_ms = round((avg_uncached - avg_cached) * m["cache_hits"], 1)
+        return {
+            "enabled": self.enabled,
+            "active_handles": active,
+            "requests": m["requests"],
+            "cache_hits": m["cache_hits"],
+            "caches_created": m["caches_created"],
+            "caches_refreshed": m["caches_refreshed"],
+            "cache_errors": m["cache_errors"],
+            "tokens_saved": m["cached_tokens"],
+            "avg_latency_ms_cached": round(avg_cached, 1) if avg_cached is not None else None,
+            "avg_latency_ms_uncached": round(avg_uncached, 1) if avg_uncached is not None else None,
+            "latency_saved_ms_estimate": saved_ms,
+        }
+
+    def eligibility(self, system_instruction: str, max_history_tokens: int) -> Dict[str, Any]:
+        """
+        Report which caches a prompt can ever get, given the history budget.
+
+        Args:
+            system_instruction: Static system prompt
+            max_history_tokens: Largest history (summary + turns) kept per session
+
+        Returns:
+            Dict with token counts and whether static / session caching is reachable
+        """
+        system_tokens = estimate_tokens(system_instruction)
+        return {
+            "min_tokens": self.min_tokens,
+            "system_tokens": system_tokens,
+            "static": self.enabled and system_tokens >= self.min_tokens,
+            "session": self.enabled and system_tokens + max_history_tokens >= self.min_tokens,
+        }
+
+    # ------------------------------------------------------------------
+    # Handle management
+    # ------------------------------------------------------------------
+
+    def _prepare(self, client, types, model, system_instruction, contents, session_id, http_options):
+        """Pick a cache handle and the contents still to send with it."""
+        if not self.enabled:
+            return None, contents
+        self._sweep()
+
+        prefix = contents[:-1]
+        if session_id and prefix:
+            handle = self._session_handle(
+                client, types, model, system_instruction, prefix, session_id, http_options
+            )
+            if handle is not None:
+                return handle, contents[handle['n_contents']:]
+
+        handle = self._static_handle(client, types, model, system_instruction, http_options)
+        if handle is not None:
+            return handle, contents
+        return None, contents
+
+    def _static_handle(self, client, types, model, system_instruction, http_options):
+        key = (model, _fingerprint([system_instruction]))
+        if estimate_tokens(system_instruction) < self.min_tokens or self._is_unsupported(model, 'static'):
+            return None
+
+        with self._key_lock(key):
+            handle = self._static.get(key)
+            now = time.monotonic()
+            if handle is not None and handle['expires_at'] - now < self.refresh_margin_seconds:
+                handle = self._refresh(client, types, handle, http_options)
+                if handle is None:
+                    self._static.pop(key, None)
+                elif self.shared is not None:
+                    self.shared.set(
+                        f"static:{model}:{key[1]}", _encode_handle(handle),
+                        ttl_seconds=self.ttl_seconds - self.refresh_margin_seconds
+                    )
+            if handle is None:
+                handle = self._shared_static_handle(
+                    client, types, model, key[1], system_instruction, http_options
+                )
+                if handle is not None:
+                    self._static[key] = handle
+            return handle
+
+    def _shared_static_handle(self, client, types, model, fingerprint, system_instruction, http_options):
+        """Adopt another worker's handle, or create one (once across workers)."""
+        def create():
+            return self._create(
+                client, types, model, 'static', self.ttl_seconds,
+                system_instruction=system_instruction, http_options=http_options
+            )
+
+        if self.shared is None:
+            return create()
+        created = []
+
+        def create_encoded():
+            handle = create()
+            if handle is None:
+                return None
+            created.append(handle)
+            return _encode_handle(handle)
+
+        encoded = self.shared.get_or_compute(
+            f"static:{model}:{fingerprint}", create_encoded,
+            ttl_seconds=self.ttl_seconds - self.refresh_margin_seconds
+        )
+        if created:
+            return created[0]
+        return _decode_handle(encoded) if encoded is not None else None
+
+    def _session_handle(self, client, types, model, system_instruction, prefix, session_id, http_options):
+        key = (model, session_id)
+        with self._key_lock(key):
+            handle = self._sessions.get(key)
+            now = time.monotonic()
+            if handle is not None:
+                n = handle['n_contents']
+                still_valid = (
+                    handle['expires_at'] - now > 0
+                    and n <= len(prefix)
+                    and handle['digest'] == _fingerprint(_content_texts(prefix[:n]))
+                )
+                if not still_valid:
+                    self._sessions.pop(key, None)
+                    self._delete(client, handle)
+                    handle = None
+
+            if handle is not None:
+                handle['last_used'] = now
+
+            # (Re)cache the whole prefix once it reaches the provider minimum
+            # and its uncached tail is big enough to be worth a new cache
+            texts = _content_texts(prefix)
+            start = handle['n_contents'] if handle is not None else 0
+            tail_tokens = sum(estimate_tokens(t) for t in _content_texts(prefix[start:]))
+            total_tokens = estimate_tokens(system_instruction) + sum(estimate_tokens(t) for t in texts)
+            worth_caching = (
+                total_tokens >= self.min_tokens
+                and (handle is None or tail_tokens >= self.session_min_tokens)
+            )
+            if worth_caching and not self._is_unsupported(model, 'session'):
+                new_handle = self._create(
+                    client, types, model, 'session', self.session_ttl_seconds,
+                    system_instruction=system_instruction, contents=list(prefix),
+                    http_options=http_options
+                )
+                if new_handle is not None:
+                    new_handle['n_contents'] = len(prefix)
+                    new_handle['digest'] = _fingerprint(texts)
+                    new_handle['last_used'] = now
+                    if handle is not None:
+                        self._delete(client, handle)
+                    self._sessions[key] = handle = new_handle
+            return handle
+
+    def _create(self, client, types, model, kind, ttl_seconds, **cache_fields):
+        if self.shared is not None and self.shared.get(f"unsupported:{model}:{kind}") is not None:
+            self._mark_unsupported(model, kind, publish=False)
+            return None
+        try:
+            cached = client.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"researchforge-{kind}",
+                    ttl=f"{ttl_seconds}s",
+                    **cache_fields
+                )
+            )
+        except Exception as e:
+            with self._lock:
+                self._metrics["cache_errors"] += 1
+            if _is_unsupported_error(e):
+                logger.info(f"Context caching unsupported for {model} ({kind}): {e}")
+                self._mark_unsupported(model, kind)
+            else:
+                # Transient or unexplained: skip caching briefly, in this worker only
+                logger.warning(f"Could not create {kind} context cache for {model}: {e}")
+                self._mark_unsupported(model, kind, self.error_backoff_seconds, publish=False)
+            return None
+
+        with self._lock:
+            self._metrics["caches_created"] += 1
+        logger.info(f"Created {kind} context cache {cached.name} for {model}")
+        return {
+            "name": cached.name,
+            "model": model,
+            "kind": kind,
+            "ttl_seconds": ttl_seconds,
+            "expires_at": time.monotonic() + ttl_seconds,
+            "n_contents": 0,
+        }
+
+    def _refresh(self, client, types, handle, http_options=None):
+        try:
+            client.caches.update(
+                name=handle['name'],
+                config=types.UpdateCachedContentConfig(
+                    ttl=f"{handle['ttl_seconds']}s", http_options=http_options
+                )
+            )
+        except Exception as e:
+            logger.info(f"Could not refresh context cache {handle['name']}: {e}")
+            return None
+        with self._lock:
+            self._metrics["caches_refreshed"] += 1
+        handle['expires_at'] = time.monotonic() + handle['ttl_seconds']
+        return handle
+
+    def _delete(self, client, handle) -> None:
+        try:
+            client.caches.delete(name=handle['name'])
+        except Exception as e:
+            logger.debug(f"Could not delete context cache {handle['name']}: {e}")
+
+    def _invalidate(self, model: str, handle: Dict[str, Any]) -> None:
+        with self._lock:
+            self._metrics["cache_errors"] += 1
+            stale = [key for key, value in self._static.items() if value is handle]
+            for key in stale:
+                del self._static[key]
+            for key, value in list(self._sessions.items()):
+                if value is handle:
+                    del self._sessions[key]
+        # Other workers would otherwise keep adopting the broken handle
+        if self.shared is not None:
+            for cached_model, fingerprint in stale:
+                self.shared.delete(f"static:{cached_model}:{fingerprint}")
+
+    def _mark_unsupported(
+        self, model: str, kind: str, seconds: Optional[float] = None, publish: bool = True
+    ) -> None:
+        if seconds is None:
+            seconds = self.unsupported_backoff_seconds
+        with self._lock:
+            self._unsupported[(model, kind)] = time.monotonic() + seconds
+        if publish and self.shared is not None:
+            self.shared.set(f"unsupported:{model}:{kind}", b"1", ttl_seconds=seconds)
+
+    def _is_unsupported(self, model: str, kind: str) -> bool:
+        until = self._unsupported.get((model, kind))
+        return until is not None and until > time.monotonic()
+
+    def _sweep(self) -> None:
+        """Forget session handles and key locks idle longer than the session TTL."""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_sweep:
+                return
+            self._next_sweep = now + self.session_ttl_seconds
+            for key, handle in list(self._sessions.items()):
+                if handle.get('last_used', 0) + self.session_ttl_seconds <= now:
+                    del self._sessions[key]
+            live = set(self._static) | set(self._sessions)
+            for key, lock in list(self._key_locks.items()):
+                # A held lock belongs to a request that is still running
+                if key not in live and not lock.locked():
+                    del self._key_locks[key]
+
+    def _key_lock(self, key) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _record(self, response, elapsed: float, cached: bool) -> None:
+        usage = getattr(response, 'usage_metadata', None)
+        cached_tokens = getattr(usage, 'cached_content_token_count', None) or 0
+        with self._lock:
+            self._metrics["requests"] += 1
+            if cached:
+                self._metrics["cache_hits"] += 1
+                self._metrics["cached_tokens"] += cached_tokens
+                self._metrics["cached_latency_ms_total"] += elapsed * 1000
+            else:
+                self._metrics["uncached_latency_ms_total"] += elapsed * 1000
+
+
+def _is_unsupported_error(error: Exception) -> bool:
+    """A definitive 400/404 saying the model cannot use cached content."""
+    if is_retryable(error) or error_status(error) not in (400, 404):
+        return False
+    message = str(error).lower()
+    return 'not supported' in message or 'not found' in message or 'unsupported' in message
+
+
+def _encode_handle(handle: Dict[str, Any]) -> bytes:
+    """Serialize a handle for the shared cache (expiry as wall-clock time)."""
+    record = dict(handle)
+    record['expires_at'] = time.time() + (handle['expires_at'] - time.monotonic())
+    return json.dumps(record).encode('utf-8')
+
+
+def _decode_handle(data: bytes) -> Dict[str, Any]:
+    record = json.loads(data)
+    record['expires_at'] = time.monotonic() + (record['expires_at'] - time.time())
+    return record
+
+
+def _content_texts(contents: List[Any]) -> List[str]:
+    texts = []
+    for content in contents:
+        for part in getattr(content, 'parts', None) or []:
+            texts.append(f"{content.role}:{getattr(part, 'text', '') or ''}")
+    return texts
+
+
+def _fingerprint(texts: List[str]) -> str:
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def create_context_cache(
+    shared: Optional[CacheBackend] = None,
+    max_history_tokens: Optional[int] = None
+) -> ContextCacheManager:
+    """
+    Build the context cache manager configured by environment variables.
+
+    Args:
+        shared: Cross-worker cache for handles (see cache.create_cache)
+        max_history_tokens: Session history budget; SESSION_CACHE_MIN_TOKENS
+            is clamped to half of it so a session can be re-cached at all
+
+    CONTEXT_CACHE_ENABLED (default true), CONTEXT_CACHE_TTL_SECONDS,
+    CONTEXT_CACHE_REFRESH_MARGIN_SECONDS, CONTEXT_CACHE_MIN_TOKENS,
+    SESSION_CACHE_TTL_SECONDS, SESSION_CACHE_MIN_TOKENS
+    """
+    session_min_tokens = int(os.environ.get('SESSION_CACHE_MIN_TOKENS', 1024))
+    if max_history_tokens is not None and session_min_tokens > max_history_tokens // 2:
+        logger.warning(
+            f"SESSION_CACHE_MIN_TOKENS={session_min_tokens} exceeds half the history "
+            f"budget ({max_history_tokens}); using {max_history_tokens // 2}"
+        )
+        session_min_tokens = max_history_tokens // 2
+    return ContextCacheManager(
+        enabled=os.environ.get('CONTEXT_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes'),
+        ttl_seconds=int(os.environ.get('CONTEXT_CACHE_TTL_SECONDS', 3600)),
+        refresh_margin_seconds=int(os.environ.get('CONTEXT_CACHE_REFRESH_MARGIN_SECONDS', 300)),
+        session_ttl_seconds=int(os.environ.get('SESSION_CACHE_TTL_SECONDS', 900)),
+        min_tokens=int(os.environ.get('CONTEXT_CACHE_MIN_TOKENS', 1024)),
+        session_min_tokens=session_min_tokens,
+        shared=shared,
+    )
@@ -0,0 +1,222 @@
+"""
+ResearchForge AI - Streaming Exporters
+Serialize paper pages to JSONL, CSV or BibTeX incrementally, so exports of
+any size are written in bounded memory.
+"""
+
+import csv
+import io
+import logging
+import queue
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from papers import dumps_json
+
+logger = logging.getLogger(__name__)
+
+# Flush the output buffer to the client once it grows past this many bytes
+CHUNK_BYTES = 64 * 1024
+
+CSV_COLUMNS = ['arxiv_id', 'title', 'authors', 'published', 'abstract', 'pdf_url', 'web_url']
+
+# A paper dict or papers.PaperRecord (both support .get())
+Paper = Any
+
+
+# ============================================================================
+# FORMATS
+# ============================================================================
+
+def _jsonl_header(meta: Dict[str, Any]) -> str:
+    return ""
+
+
+def _jsonl_row(paper: Paper) -> str:
+    return dumps_json(paper).decode('utf-8') + "\n"
+
+
+def _csv_header(meta: Dict[str, Any]) -> str:
+    return _csv_line(CSV_COLUMNS)
+
+
+def _csv_row(paper: Paper) -> str:
+    return _csv_line([
+        paper.get('arxiv_id', ''),
+        paper.get('title', ''),
+        '; '.join(paper.get('authors') or []),
+        paper.get('published', ''),
+        paper.get('abstract', ''),
+        paper.get('pdf_url', ''),
+        paper.get('web_url', ''),
+    ])
+
+
+def _csv_line(values: List[Any]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\r\n').writerow(values)
+    return buffer.getvalue()
+
+
+_BIBTEX_SPECIAL = re.compile(r'([\\{}&%$#_])')
+_BIBTEX_KEY_CHARS = re.compile(r'[^A-Za-z0-9]')
+
+
+def _bibtex_escape(text: str) -> str:
+    return _BIBTEX_SPECIAL.sub(r'\\\1', text or '')
+
+
+def _bibtex_header(meta: Dict[str, Any]) -> str:
+    return f"% ResearchForge AI export: {meta.get('query', '')}\n\n"
+
+
+def _bibtex_row(paper: Paper) -> str:
+    arxiv_id = paper.get('arxiv_id', 'unknown')
+    authors = paper.get('authors') or []
+    year = (paper.get('published') or '')[:4]
+    surname = authors[0].split()[-1] if authors and authors[0].split() else 'arxiv'
+    key = _BIBTEX_KEY_CHARS.sub('', surname) + year + _BIBTEX_KEY_CHARS.sub('', arxiv_id.rsplit('v', 1)[0])
+
+    fields = [
+        ('title', _bibtex_escape(paper.get('title', ''))),
+        ('author', ' and '.join(_bibtex_escape(a) for a in authors)),
+        ('year', year),
+        ('eprint', arxiv_id),
+        ('archivePrefix', 'arXiv'),
+        ('url', paper.get('web_url', '')),
+        ('abstract', _bibtex_escape(paper.get('abstract', ''))),
+    ]
+    body = ',\n'.join(f"  {name} = {{{value}}}" for name, value in fields if value)
+    return f"@article{{{key},\n{body}\n}}\n\n"
+
+
+# name -> (mimetype, file extension, header(meta), row(paper))
+FORMATS: Dict[str, tuple] = {
+    'jsonl': ('application/x-ndjson', 'jsonl', _jsonl_header, _jsonl_row),
+    'csv': ('text/csv', 'csv', _csv_header, _csv_row),
+    'bibtex': ('application/x-bibtex', 'bib', _bibtex_header, _bibtex_row),
+}
+
+
+def export_error_trailer(fmt: str, error: Exception) -> str:
+    """
+    Final line marking an export cut short by an upstream error.
+
+    A JSON object for jsonl, a comment line for csv and bibtex, so the
+    output still parses in its format.
+    """
+    message = f"Export incomplete: {str(error)}"
+    if fmt == 'jsonl':
+        return dumps_json({"status": "error", "message": message}).decode('utf-8') + "\n"
+    return ('# ' if fmt == 'csv' else '% ') + message + "\n"
+
+
+# ============================================================================
+# STREAMING
+# ============================================================================
+
+def prefetch(pages: Iterable[List[Paper]], max_pages: int = 1) -> Iterator[List[Paper]]:
+    """
+    Fetch pages on a background thread, at most `max_pages` ahead.
+
+    This overlaps the next upstream request with sending the current page,
+    while the bounded queue applies backpressure: when the client reads
+    slowly, the producer blocks instead of buffering more pages. Closing
+    the returned generator (client disconnect) stops the producer.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=max_pages)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for page in pages:
+                while not stop.is_set():
+                    try:
+                        buffer.put(page, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            item = done
+        except Exception as e:
+            item = e
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    thread = threading.Thread(target=produce, name="export-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_export(
+    pages: Iterable[List[Paper]],
+    fmt: str,
+    meta: Optional[Dict[str, Any]] = None,
+    on_error: Optional[Callable[[Exception], str]] = None
+) -> Iterator[str]:
+    """
+    Serialize pages of papers in the given format, yielding text chunks.
+
+    The format header is yielded immediately (before any page is fetched);
+    rows are buffered up to CHUNK_BYTES per chunk.
+
+    Args:
+        pages: Iterable of paper lists (e.g. iter_arxiv_papers)
+        fmt: One of FORMATS
+        meta: Export metadata (query, ...) for format headers
+        on_error: Called with an upstream error mid-stream; its return value
+            is written as the final chunk (the HTTP status is already sent)
+
+    Raises:
+        ValueError: If fmt is unknown (raised on creation, not mid-stream)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+    _, _, header, row = FORMATS[fmt]
+    return _stream(pages, header(meta or {}), row, on_error)
+
+
+def _stream(pages, header, row, on_error):
+    # Yield something right away so the client sees first bytes immediately
+    yield header
+
+    parts: List[str] = []
+    size = 0
+    count = 0
+    try:
+        for page in prefetch(pages):
+            for paper in page:
+                text = row(paper)
+                parts.append(text)
+                size += len(text)
+                count += 1
+                if size >= CHUNK_BYTES:
+                    yield ''.join(parts)
+                    parts, size = [], 0
+            if parts:
+                yield ''.join(parts)
+                parts, size = [], 0
+    except Exception as e:
+        logger.error(f"Export aborted after {count} papers: {str(e)}")
+        if parts:
+            yield ''.join(parts)
+        if on_error is not None:
+            yield on_error(e)
+        return
+    logger.info(f"Export finished: {count} papers")
@@ -0,0 +1,243 @@
+"""
+ResearchForge AI - HTTP Caching & Compression
+Strong ETags with If-None-Match -> 304 handling, gzip/brotli compression of
+dynamic responses, and precompressed, long-lived static assets.
+
+Run `python http_cache.py` at build time to write .gz/.br variants next to
+the compressible files under static/.
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import sys
+from typing import Optional
+
+from flask import Flask, Request, Response, abort, request, send_file
+from werkzeug.security import safe_join
+
+from cache import LocalCache
+
+try:
+    import brotli
+except ImportError:  # optional dependency, gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+
+# Cache-Control for versioned (?v=<hash>) and unversioned static URLs
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+STATIC_DEFAULT_MAX_AGE = 3600
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/',
+    'image/svg+xml',
+)
+
+# Already-compressed formats are served as-is
+PRECOMPRESS_EXTENSIONS = ('.js', '.css', '.html', '.svg', '.json', '.txt', '.map')
+
+# Encoding -> (file suffix, ETag suffix)
+ENCODINGS = {
+    'br': ('.br', '-br'),
+    'gzip': ('.gz', '-gz'),
+}
+
+# Compressed bodies of recent responses, keyed by (etag, encoding), so that
+# repeat responses (e.g. cached search results) are compressed only once
+_compressed = LocalCache(max_entries=256, ttl_seconds=3600)
+
+# Content hashes for static_url(), keyed by (path, mtime)
+_static_versions = {}
+
+
+def _is_compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding(req: Request) -> Optional[str]:
+    """Pick the best supported content-coding from Accept-Encoding."""
+    accept = req.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _etag_matches(req: Request, etag: str) -> bool:
+    """If-None-Match check that treats our per-encoding ETag suffixes as equal."""
+    if_none_match = req.if_none_match
+    if not if_none_match:
+        return False
+    if if_none_match.star_tag:
+        return True
+    return any(
+        if_none_match.contains(etag + suffix)
+        for suffix in ('', *(etag_suffix for _, etag_suffix in ENCODINGS.values()))
+    )
+
+
+def finalize_response(response: Response) -> Response:
+    """
+    after_request hook: ETag, conditional 304 and compression.
+
+    Applies to complete (non-streamed) 200 responses of GET/HEAD requests
+    with a compressible mimetype. Streams and send_file() responses are
+    left alone (send_file handles its own validators).
+    """
+    if (
+        request.method not in ('GET', 'HEAD')
+        or response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or not _is_compressible(response.mimetype)
+    ):
+        return response
+
+    data = response.get_data()
+    etag, _ = response.get_etag()
+    if etag is None:
+        etag = hashlib.sha256(data).hexdigest()[:32]
+    encoding = negotiate_encoding(request) if len(data) >= COMPRESS_MIN_BYTES else None
+    # Strong ETags must differ per content-coding
+    representation_etag = etag + (ENCODINGS[encoding][1] if encoding else '')
+
+    if 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+
+    if _etag_matches(request, etag):
+        not_modified = Response(status=304)
+        for header in ('Cache-Control', 'Vary'):
+            not_modified.headers[header] = response.headers[header]
+        not_modified.set_etag(representation_etag)
+        return not_modified
+
+    response.set_etag(representation_etag)
+    if encoding is None:
+        return response
+
+    key = f"{etag}:{encoding}"
+    body = _compressed.get(key)
+    if body is None:
+        body = _compress(data, encoding)
+        _compressed.set(key, body)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# ============================================================================
+# STATIC FILES
+# ============================================================================
+
+def serve_static(app: Flask, filename: str) -> Response:
+    """
+    Serve a static file, preferring a precompressed .br/.gz variant.
+
+    Versioned URLs (`?v=...`, see static_url) get a one-year immutable
+    Cache-Control; others a short max-age. Validators and 304s come from
+    send_file.
+    """
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    served_path = path
+    encoding = negotiate_encoding(request)
+    if encoding is not None:
+        variant = path + ENCODINGS[encoding][0]
+        if os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+            served_path = variant
+        else:
+            encoding = None
+
+    max_age = STATIC_IMMUTABLE_MAX_AGE if request.args.get('v') else STATIC_DEFAULT_MAX_AGE
+    response = send_file(served_path, mimetype=mimetype, conditional=True, max_age=max_age)
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    if request.args.get('v'):
+        response.cache_control.immutable = True
+    response.cache_control.public = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def static_url(app: Flask, filename: str) -> str:
+    """
+    URL for a static file with a content-hash version for cache busting.
+
+    The hash is recomputed only when the file's mtime changes.
+    """
+    path = os.path.join(app.static_folder, filename)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return f"{app.static_url_path}/{filename}"
+    cached = _static_versions.get(path)
+    if cached is None or cached[0] != mtime:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+        cached = _static_versions[path] = (mtime, digest.hexdigest()[:12])
+    return f"{app.static_url_path}/{filename}?v={cached[1]}"
+
+
+def init_app(app: Flask) -> None:
+    """Install the static route, static_url() template helper and response hook."""
+    app.view_functions['static'] = lambda filename: serve_static(app, filename)
+    app.jinja_env.globals['static_url'] = lambda filename: static_url(app, filename)
+    app.after_request(finalize_response)
+
+
+def precompress_static(root: str) -> int:
+    """
+    Write .gz (and .br when brotli is installed) variants of static files.
+
+    Returns:
+        Number of variants written
+    """
+    written = 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if not name.endswith(PRECOMPRESS_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for encoding, (file_suffix, _) in ENCODINGS.items():
+                if encoding == 'br' and brotli is None:
+                    continue
+                if encoding == 'br':
+                    body = brotli.compress(data, quality=11)
+                else:
+                    body = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(body) >= len(data):
+                    continue
+                with open(path + file_suffix, 'wb') as f:
+                    f.write(body)
+                written += 1
+                print(f"{path}{file_suffix}: {len(data)} -> {len(body)} bytes")
+    return written
+
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+    print(f"Precompressed {precompress_static(root)} static variants")
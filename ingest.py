@@ -0,0 +1,780 @@
+"""
+ResearchForge AI - Full-Text Ingestion
+Background pipeline that downloads paper PDFs, extracts and chunks their text,
+and stores the chunks in an append-only, memory-mapped store for passage
+retrieval.
+
+Run `python ingest.py papers.jsonl` to ingest the papers of an /api/export
+JSONL file (re-running resumes where the last run stopped). With
+`--allow-local-files`, each line's pdf_url may point at a local PDF.
+"""
+
+import json
+import logging
+import mmap
+import os
+import queue
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the single-writer lock is skipped
+    fcntl = None
+
+from pools import ReplaceablePool, is_broken_pool, spawn_pool
+from resilience import call_with_retries, is_retryable
+
+logger = logging.getLogger(__name__)
+
+# Chunk size and overlap, in characters (about 350 / 50 tokens)
+CHUNK_CHARS = 1500
+CHUNK_OVERLAP = 200
+
+# PDFs larger than this are skipped rather than downloaded
+PDF_MAX_BYTES = 50 * 1024 * 1024
+
+# How often a non-writer process tries to take over the store, and how
+# often the writer picks up papers spooled by other processes (seconds)
+WRITER_RETRY_SECONDS = 30.0
+SPOOL_POLL_SECONDS = 2.0
+
+# chunks.idx record: byte offset and length of one chunk in chunks.dat
+_INDEX_RECORD = struct.Struct('<QI')
+
+_VERSION_SUFFIX = re.compile(r'v\d+$')
+# New-style (2401.12345) and old-style (hep-th/9901001) arXiv identifiers
+_ARXIV_ID = re.compile(r'^(?:\d{4}\.\d{4,5}|[a-z][a-z-]*(?:\.[A-Z]{2})?/\d{7})$')
+_WORD = re.compile(r'[a-z0-9]{3,}')
+
+
+def paper_key(arxiv_id: str) -> str:
+    """Store key for a paper: its arXiv ID without the version suffix."""
+    return _VERSION_SUFFIX.sub('', arxiv_id.strip())
+
+
+def is_arxiv_id(key: str) -> bool:
+    """Whether a paper key is a well-formed arXiv identifier."""
+    return bool(_ARXIV_ID.match(key))
+
+
+# ============================================================================
+# TEXT EXTRACTION & CHUNKING
+# ============================================================================
+
+def clean_text(text: str) -> str:
+    """Join words hyphenated across line breaks and collapse whitespace."""
+    text = re.sub(r'(\w)-\n(\w)', r'\1\2', text)
+    return ' '.join(text.split())
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into chunks of about `chunk_chars`, each overlapping the
+    previous one by about `overlap` characters.
+
+    Chunk boundaries are moved back to the nearest space, so words are
+    never split.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_chars, length)
+        if end < length:
+            space = text.rfind(' ', start + overlap + 1, end)
+            if space != -1:
+                end = space
+        chunks.append(text[start:end].strip())
+        if end >= length:
+            break
+        next_start = end - overlap
+        space = text.find(' ', next_start, end)
+        start = space + 1 if space != -1 else next_start
+    return [chunk for chunk in chunks if chunk]
+
+
+def extract_chunks(path: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Extract a PDF's text and chunk it. Runs in a worker process.
+
+    The downloaded file is removed afterwards, whatever the outcome.
+    """
+    try:
+        import pypdf
+        reader = pypdf.PdfReader(path)
+        pages = []
+        for page in reader.pages:
+            try:
+                pages.append(page.extract_text() or '')
+            except Exception:
+                # One malformed page should not lose the whole paper
+                pages.append('')
+        return chunk_text(clean_text('\n'.join(pages)), chunk_chars, overlap)
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ============================================================================
+# CHUNK STORE
+# ============================================================================
+
+class ChunkStore:
+    """
+    Append-only chunk store in three files under `directory`:
+
+    - chunks.dat: UTF-8 chunk texts, back to back
+    - chunks.idx: fixed-size (offset, length) records, one per chunk
+    - docs.jsonl: one line per finished paper (its first chunk and count)
+
+    A docs.jsonl line is written only after the paper's chunks and index
+    records are on disk, so it acts as the commit record: on open, anything
+    past the last complete line (a crash mid-paper) is truncated away.
+    Reads go through read-only mmaps of chunks.dat and chunks.idx, remapped
+    when the files grow. Only the process holding the writer lock appends;
+    other processes see new papers on their next lookup. Papers to ingest
+    are handed to the writer through small JSON files in `requests/` (the
+    spool), which the writer removes only once their papers are committed,
+    so a crashed writer's successor picks up the same work.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, 'chunks.dat')
+        self.index_path = os.path.join(directory, 'chunks.idx')
+        self.docs_path = os.path.join(directory, 'docs.jsonl')
+        self.spool_dir = os.path.join(directory, 'requests')
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for path in (self.data_path, self.index_path, self.docs_path):
+            open(path, 'ab').close()
+
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._docs_read = 0
+        self._n_chunks = 0
+        self._data_map: Optional[mmap.mmap] = None
+        self._index_map: Optional[mmap.mmap] = None
+        self._lock_file = None
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def open_for_writing(self) -> bool:
+        """
+        Take the single-writer lock and recover from an interrupted write.
+
+        Returns:
+            False if another process is already writing to this store
+        """
+        lock_file = open(os.path.join(self.directory, 'writer.lock'), 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._lock_file = lock_file
+        self._recover()
+        return True
+
+    def spool(self, papers: List[Dict[str, str]]) -> str:
+        """
+        Leave papers for the writer process to ingest (any process).
+
+        Returns:
+            Name of the spool file
+        """
+        name = f"{time.time():.6f}-{os.getpid()}-{uuid.uuid4().hex[:8]}.json"
+        temp_path = os.path.join(self.spool_dir, f".{name}")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(papers, f)
+            f.flush()
+            os.fsync(f.fileno())
+        # Atomic rename, so the writer never reads a half-written file
+        os.replace(temp_path, os.path.join(self.spool_dir, name))
+        return name
+
+    def spooled(self, limit: int = 100, skip: Iterable[str] = ()) -> List[Tuple[str, List[Dict[str, str]]]]:
+        """
+        Read spool files, oldest first, without removing them (writer only).
+
+        Args:
+            limit: Maximum number of files to read
+            skip: Names of files already being worked on
+
+        Returns:
+            List of (file name, papers)
+        """
+        skip = set(skip)
+        names = sorted(
+            name for name in os.listdir(self.spool_dir)
+            if not name.startswith('.') and name not in skip
+        )
+        batches = []
+        for name in names[:limit]:
+            try:
+                with open(os.path.join(self.spool_dir, name), encoding='utf-8') as f:
+                    batches.append((name, json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable spool file {name}: {e}")
+                self.remove_spooled(name)
+        return batches
+
+    def remove_spooled(self, name: str) -> None:
+        """Delete a spool file once all of its papers are committed (writer only)."""
+        try:
+            os.remove(os.path.join(self.spool_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def _recover(self) -> None:
+        with self._lock:
+            # Drop a torn last line of docs.jsonl
+            with open(self.docs_path, 'rb+') as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - 65536))
+                tail = f.read()
+                good = size - len(tail) + tail.rfind(b'\n') + 1
+                if good < size:
+                    logger.warning(f"Discarding incomplete record at the end of {self.docs_path}")
+                    f.truncate(good)
+            self._refresh_docs()
+
+            # Drop chunks written after the last committed paper
+            n_chunks = max((d['first_chunk'] + d['n_chunks'] for d in self._docs.values()), default=0)
+            data_end = 0
+            with open(self.index_path, 'rb+') as f:
+                if n_chunks:
+                    f.seek((n_chunks - 1) * _INDEX_RECORD.size)
+                    offset, length = _INDEX_RECORD.unpack(f.read(_INDEX_RECORD.size))
+                    data_end = offset + length
+                f.truncate(n_chunks * _INDEX_RECORD.size)
+            with open(self.data_path, 'rb+') as f:
+                f.truncate(data_end)
+            self._n_chunks = n_chunks
+            self._close_maps()
+
+    def append(self, paper_id: str, title: str, chunks: List[str], status: str = 'ok') -> None:
+        """Append one paper's chunks and commit it (status "failed" records a skip)."""
+        if self._lock_file is None:
+            raise RuntimeError("ChunkStore is not open for writing")
+        with self._lock:
+            first_chunk = self._n_chunks
+            with open(self.data_path, 'ab') as data, open(self.index_path, 'ab') as index:
+                offset = data.tell()
+                records = []
+                for chunk in chunks:
+                    encoded = chunk.encode('utf-8')
+                    data.write(encoded)
+                    records.append(_INDEX_RECORD.pack(offset, len(encoded)))
+                    offset += len(encoded)
+                index.write(b''.join(records))
+                for f in (data, index):
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            doc = {
+                "id": paper_key(paper_id),
+                "title": title,
+                "first_chunk": first_chunk,
+                "n_chunks": len(chunks),
+                "status": status,
+            }
+            with open(self.docs_path, 'ab') as f:
+                f.write(json.dumps(doc).encode('utf-8') + b'\n')
+                f.flush()
+                os.fsync(f.fileno())
+                self._docs_read = f.tell()
+            self._docs[doc["id"]] = doc
+            self._n_chunks = first_chunk + len(chunks)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _refresh_docs(self) -> None:
+        """Read docs.jsonl lines appended since the last call (lock held)."""
+        if os.path.getsize(self.docs_path) <= self._docs_read:
+            return
+        with open(self.docs_path, 'rb') as f:
+            f.seek(self._docs_read)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # being written right now
+                self._docs_read += len(line)
+                doc = json.loads(line)
+                self._docs[doc['id']] = doc
+                self._n_chunks = max(self._n_chunks, doc['first_chunk'] + doc['n_chunks'])
+
+    def _close_maps(self) -> None:
+        for view in (self._data_map, self._index_map):
+            if view is not None:
+                view.close()
+        self._data_map = self._index_map = None
+
+    def _maps(self, n_chunks: int) -> Tuple[mmap.mmap, mmap.mmap]:
+        """mmaps covering at least the first n_chunks chunks (lock held)."""
+        index_map = self._index_map
+        if index_map is None or len(index_map) < n_chunks * _INDEX_RECORD.size:
+            self._close_maps()
+            with open(self.index_path, 'rb') as f:
+                self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(self.data_path, 'rb') as f:
+                self._data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data_map, self._index_map
+
+    def document(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """The commit record for a paper, or None if it was never ingested."""
+        key = paper_key(paper_id)
+        with self._lock:
+            doc = self._docs.get(key)
+            if doc is None:
+                self._refresh_docs()
+                doc = self._docs.get(key)
+            return doc
+
+    def chunks(self, paper_id: str) -> List[str]:
+        """All chunks of an ingested paper, in document order."""
+        doc = self.document(paper_id)
+        if doc is None or not doc['n_chunks']:
+            return []
+        first, n = doc['first_chunk'], doc['n_chunks']
+        with self._lock:
+            data_map, index_map = self._maps(first + n)
+            texts = []
+            for i in range(first, first + n):
+                offset, length = _INDEX_RECORD.unpack_from(index_map, i * _INDEX_RECORD.size)
+                texts.append(data_map[offset:offset + length].decode('utf-8'))
+            return texts
+
+    def passages(self, paper_id: str, query: str = '', k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Best-matching passages of a paper for a query.
+
+        Chunks are ranked by how often they contain the query's words (3+
+        characters); with an empty query the first k chunks are returned.
+
+        Returns:
+            List of {"arxiv_id", "chunk", "text"} in document order
+        """
+        texts = self.chunks(paper_id)
+        terms = set(_WORD.findall(query.lower()))
+        ranked = list(range(len(texts)))
+        if terms:
+            def score(i):
+                counts = Counter(_WORD.findall(texts[i].lower()))
+                return sum(min(counts[term], 3) for term in terms)
+            ranked.sort(key=lambda i: (-score(i), i))
+        return [
+            {"arxiv_id": paper_key(paper_id), "chunk": i, "text": texts[i]}
+            for i in sorted(ranked[:k])
+        ]
+
+    def __contains__(self, paper_id: str) -> bool:
+        return self.document(paper_id) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh_docs()
+            failed = sum(1 for d in self._docs.values() if d['status'] != 'ok')
+            return {
+                "papers": len(self._docs) - failed,
+                "failed": failed,
+                "chunks": self._n_chunks,
+                "bytes": os.path.getsize(self.data_path),
+            }
+
+
+# ============================================================================
+# PIPELINE
+# ============================================================================
+
+class IngestPipeline:
+    """
+    Download -> extract -> store, as a background pipeline.
+
+    - `download_concurrency` threads stream PDFs to temporary files (never
+      held in memory), with retries under the "arxiv_pdf" retry budget.
+      PDFs are always fetched from https://arxiv.org/pdf/<id>, built from a
+      validated arXiv ID; a paper's own `pdf_url` (including file:// URLs
+      and local paths) is only honored with `allow_local_files`, which is
+      meant for the command line, never for request data.
+    - A process pool of `extract_workers` extracts and chunks the text, so
+      CPU-bound parsing runs on all cores without holding the GIL.
+    - A single writer thread appends results to the store.
+
+    Every stage hands over through a bounded queue, so a slow stage
+    throttles the one before it and memory stays bounded however many
+    papers are queued. Papers already in the store are skipped, which
+    makes re-submitting after a crash resume rather than restart.
+
+    Only one process (the store's writer) runs the pipeline. `request()`
+    works in any gunicorn worker: it spools the papers in the store for
+    the writer to pick up (the writer's own requests included), and
+    non-writers retry becoming the writer every WRITER_RETRY_SECONDS in
+    case it went away. A spool file is removed once all of its papers are
+    committed, so whatever a crashed writer had queued is picked up again
+    by the next one.
+    """
+
+    def __init__(
+        self,
+        store: ChunkStore,
+        download_concurrency: int = 4,
+        extract_workers: Optional[int] = None,
+        max_pending: int = 10000,
+        download_timeout: float = 60.0,
+        max_bytes: int = PDF_MAX_BYTES,
+        allow_local_files: bool = False
+    ):
+        self.store = store
+        self.download_concurrency = download_concurrency
+        self.extract_workers = extract_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.download_timeout = download_timeout
+        self.max_bytes = max_bytes
+        self.allow_local_files = allow_local_files
+
+        self._todo: queue.Queue = queue.Queue(maxsize=max_pending)
+        # Downloaded files waiting for extraction; bounds temp disk use too
+        self._downloaded: queue.Queue = queue.Queue(maxsize=self.extract_workers * 2)
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+        # Spool files being worked on -> their uncommitted keys, and back
+        self._spool_files: Dict[str, set] = {}
+        self._spool_keys: Dict[str, set] = {}
+        self._spool_ready = threading.Event()
+        self._started = False
+        self._unavailable = False
+        self._next_writer_attempt = 0.0
+        self._start_lock = threading.Lock()
+        self._pool = ReplaceablePool(lambda: spawn_pool(self.extract_workers), 'extraction')
+        self._counts = Counter()
+
+    def start(self) -> bool:
+        """
+        Start the pipeline threads (idempotent).
+
+        Returns:
+            False if pypdf is missing or another process owns the store
+        """
+        with self._start_lock:
+            if self._started or self._unavailable:
+                return self._started
+            if time.monotonic() < self._next_writer_attempt:
+                return False
+            try:
+                import pypdf  # noqa: F401 - only checked here, used in the workers
+            except ImportError:
+                logger.warning("pypdf is not installed; PDF ingestion is disabled")
+                self._unavailable = True
+                return False
+            if not self.store.open_for_writing():
+                if not self._next_writer_attempt:
+                    logger.info("Another process is ingesting into this store; forwarding papers to it")
+                self._next_writer_attempt = time.monotonic() + WRITER_RETRY_SECONDS
+                return False
+            self._pool.executor  # create the pool up front, not on the first paper
+            for i in range(self.download_concurrency):
+                threading.Thread(target=self._download_loop, name=f"ingest-download-{i}", daemon=True).start()
+            threading.Thread(target=self._extract_loop, name="ingest-extract", daemon=True).start()
+            threading.Thread(target=self._spool_loop, name="ingest-spool", daemon=True).start()
+            self._started = True
+            logger.info(
+                f"Ingestion started: {self.download_concurrency} downloads, "
+                f"{self.extract_workers} extract workers"
+            )
+            return True
+
+    def request(self, papers: Iterable[Any]) -> Optional[int]:
+        """
+        Queue papers from any process, through the store's spool.
+
+        Returns:
+            Number of papers spooled, None if ingestion is unavailable
+        """
+        started = self.start()
+        if self._unavailable:
+            return None
+        spooled = []
+        for paper in papers:
+            key = self._valid_key(paper)
+            if key is not None and key not in self.store:
+                spooled.append({"arxiv_id": key, "title": str(paper.get('title') or '')})
+        if spooled:
+            self.store.spool(spooled)
+            self._counts['spooled'] += len(spooled)
+            if started:
+                self._spool_ready.set()
+        return len(spooled)
+
+    def _valid_key(self, paper: Any) -> Optional[str]:
+        key = paper_key(str(paper.get('arxiv_id') or ''))
+        if not is_arxiv_id(key):
+            self._counts['invalid'] += 1
+            return None
+        return key
+
+    def submit(self, papers: Iterable[Any], block: bool = False) -> int:
+        """
+        Queue papers (dicts or PaperRecords with arxiv_id and title).
+
+        Args:
+            papers: Papers to ingest
+            block: Wait for queue space instead of dropping overflow
+
+        Returns:
+            Number of papers queued (already stored or queued ones are skipped)
+        """
+        queued = 0
+        for paper in papers:
+            key = self._valid_key(paper)
+            if key is None or key in self.store:
+                continue
+            with self._queued_lock:
+                if key in self._queued:
+                    continue
+                self._queued.add(key)
+            url = f"https://arxiv.org/pdf/{key}"
+            if self.allow_local_files and paper.get('pdf_url'):
+                url = paper.get('pdf_url')
+            item = (key, str(paper.get('title') or ''), url)
+            try:
+                self._todo.put(item, block=block)
+            except queue.Full:
+                with self._queued_lock:
+                    self._queued.discard(key)
+                self._counts['dropped'] += 1
+                continue
+            queued += 1
+        return queued
+
+    def join(self) -> None:
+        """Block until every submitted paper has been stored."""
+        self._todo.join()
+        self._downloaded.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._started,
+            "queued": self._todo.qsize(),
+            "pending": len(self._queued),
+            **dict(self._counts),
+        }
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _spool_loop(self) -> None:
+        # The first pass replays whatever a previous writer left unfinished
+        while True:
+            try:
+                self._take_spooled()
+            except OSError as e:
+                logger.warning(f"Could not read the ingest spool: {e}")
+            self._spool_ready.wait(SPOOL_POLL_SECONDS)
+            self._spool_ready.clear()
+
+    def _take_spooled(self) -> None:
+        """Queue the papers of spool files not yet being worked on."""
+        with self._queued_lock:
+            claimed = list(self._spool_files)
+        for name, papers in self.store.spooled(skip=claimed):
+            keys = set()
+            for paper in papers:
+                key = self._valid_key(paper)
+                if key is not None and key not in self.store:
+                    keys.add(key)
+            if not keys:
+                self.store.remove_spooled(name)
+                continue
+            # Registered before queueing, so no paper can finish unnoticed
+            with self._queued_lock:
+                self._spool_files[name] = keys
+                for key in keys:
+                    self._spool_keys.setdefault(key, set()).add(name)
+            self.submit(papers, block=True)
+
+    def _release(self, key: str, committed: bool = True) -> None:
+        """
+        Forget a paper that left the pipeline, and remove the spool files
+        it was the last uncommitted paper of. A paper that was not committed
+        keeps its spool files for the next writer.
+        """
+        done = []
+        with self._queued_lock:
+            self._queued.discard(key)
+            if not committed:
+                return
+            for name in self._spool_keys.pop(key, ()):
+                pending = self._spool_files[name]
+                pending.discard(key)
+                if not pending:
+                    del self._spool_files[name]
+                    done.append(name)
+        for name in done:
+            self.store.remove_spooled(name)
+
+    def _download_loop(self) -> None:
+        while True:
+            key, title, url = self._todo.get()
+            try:
+                path = self._download(url)
+                self._downloaded.put((key, title, path))
+                self._counts['downloaded'] += 1
+            except Exception as e:
+                logger.warning(f"Could not download {url}: {e}")
+                if is_retryable(e):
+                    # Not recorded, so requesting the paper again (or the next
+                    # writer, from the spool) retries it
+                    self._counts['download_errors'] += 1
+                    self._release(key, committed=False)
+                else:
+                    self._finish(key, title, [], 'failed')
+            finally:
+                self._todo.task_done()
+
+    def _download(self, url: str) -> str:
+        """Stream a PDF (http(s), or file:// / a local path if allowed) to a temp file."""
+        if not (self.allow_local_files or url.startswith('https://arxiv.org/pdf/')):
+            raise ValueError(f"Refusing to download {url}")
+        fd, path = tempfile.mkstemp(suffix='.pdf', prefix='researchforge-')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if url.startswith(('http://', 'https://')):
+                    import requests
+
+                    def fetch(timeout):
+                        out.seek(0)
+                        out.truncate()
+                        with requests.get(url, stream=True, timeout=timeout) as response:
+                            response.raise_for_status()
+                            self._copy(response.iter_content(65536), out)
+
+                    call_with_retries(fetch, 'arxiv_pdf', attempt_timeout=self.download_timeout)
+                else:
+                    source = url[len('file://'):] if url.startswith('file://') else url
+                    with open(source, 'rb') as f:
+                        self._copy(iter(lambda: f.read(65536), b''), out)
+            return path
+        except BaseException:
+            os.remove(path)
+            raise
+
+    def _copy(self, blocks, out) -> None:
+        size = 0
+        for block in blocks:
+            size += len(block)
+            if size > self.max_bytes:
+                raise ValueError(f"PDF larger than {self.max_bytes} bytes")
+            out.write(block)
+
+    def _extract_loop(self) -> None:
+        # At most extract_workers * 2 extractions in flight
+        slots = threading.BoundedSemaphore(self.extract_workers * 2)
+        while True:
+            key, title, path = self._downloaded.get()
+            slots.acquire()
+            self._extract(key, title, path, slots)
+
+    def _extract(self, key: str, title: str, path: str, slots, attempt: int = 1) -> None:
+        """Run extract_chunks in the pool; the paper's slot is released once it is stored."""
+        from concurrent.futures import Future
+
+        pool = self._pool.executor
+
+        def done(future):
+            retried = False
+            try:
+                chunks = future.result()
+                self._finish(key, title, chunks, 'ok' if chunks else 'failed')
+            except Exception as e:
+                if is_broken_pool(e):
+                    # E.g. killed for using too much memory
+                    if self._pool.replace(pool):
+                        self._counts['pool_restarts'] += 1
+                    if attempt < 2:
+                        # A crash takes down every extraction in the pool; the
+                        # culprit is unknown, so each affected paper gets one retry
+                        logger.warning(f"Extraction of {key} lost to a crashed worker, retrying")
+                        self._counts['extract_retries'] += 1
+                        retried = True
+                        self._extract(key, title, path, slots, attempt + 1)
+                        return
+                    # The worker never got to remove the file
+                    if os.path.exists(path):
+                        os.remove(path)
+                logger.warning(f"Could not extract text of {key}: {e!r}")
+                self._finish(key, title, [], 'failed')
+            finally:
+                if not retried:
+                    slots.release()
+                    self._downloaded.task_done()
+
+        try:
+            future = pool.submit(extract_chunks, path)
+        except Exception as e:
+            # A broken pool refuses new work; handle it like a crash mid-extraction
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(done)
+
+    def _finish(self, key: str, title: str, chunks: List[str], status: str) -> None:
+        committed = False
+        try:
+            self.store.append(key, title, chunks, status)
+            committed = True
+            self._counts['stored' if status == 'ok' else 'failed'] += 1
+        except Exception as e:
+            logger.error(f"Could not store {key}: {e}")
+        finally:
+            self._release(key, committed)
+
+
+def create_ingest_pipeline(allow_local_files: bool = False) -> IngestPipeline:
+    """
+    Build the ingestion pipeline configured by environment variables.
+
+    Args:
+        allow_local_files: Honor papers' pdf_url, including local files
+            (command line only)
+
+    INGEST_DIR: store directory (default /tmp/researchforge_fulltext)
+    INGEST_DOWNLOAD_CONCURRENCY (default 4), INGEST_EXTRACT_WORKERS
+    (default: cores - 1)
+    """
+    workers = os.environ.get('INGEST_EXTRACT_WORKERS')
+    return IngestPipeline(
+        ChunkStore(os.environ.get('INGEST_DIR', '/tmp/researchforge_fulltext')),
+        download_concurrency=int(os.environ.get('INGEST_DOWNLOAD_CONCURRENCY', 4)),
+        extract_workers=int(workers) if workers else None,
+        allow_local_files=allow_local_files,
+    )
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = [arg for arg in sys.argv[1:] if arg != '--allow-local-files']
+    if len(args) != 1:
+        print("Usage: python ingest.py [--allow-local-files] papers.jsonl")
+        sys.exit(2)
+    pipeline = create_ingest_pipeline(allow_local_files='--allow-local-files' in sys.argv)
+    if not pipeline.start():
+        sys.exit(1)
+    with open(args[0], encoding='utf-8') as f:
+        papers = (json.loads(line) for line in f if line.strip())
+        print(f"Queued {pipeline.submit(papers, block=True)} papers")
+    pipeline.join()
+    print(pipeline.store.stats())
@@ -0,0 +1,526 @@
+"""
+ResearchForge AI - Background Jobs
+Local, dependency-free job queue that runs slow work (proposals, bulk
+drafts, large exports) in a separate process pool, with priorities and
+per-queue concurrency limits, so it never ties up request threads.
+"""
+
+import heapq
+import importlib
+import itertools
+import json
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from cache import CacheBackend
+from pools import ReplaceablePool, is_broken_pool, spawn_context, spawn_pool
+
+logger = logging.getLogger(__name__)
+
+# Named priorities; lower runs first. Integers 0-9 are accepted as well.
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+TERMINAL_STATUSES = ('succeeded', 'partial', 'failed', 'cancelled')
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already waiting."""
+
+
+class _JobTimeout(BaseException):
+    """Raised in a job's worker when its queue timeout expires."""
+
+
+# ============================================================================
+# WORKER SIDE
+# ============================================================================
+
+# Set in each pool process by _init_worker()
+_progress_queue = None
+
+
+def _init_worker(progress_queue) -> None:
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+class JobContext:
+    """
+    Handed to a job handler in the worker process.
+
+    Handlers report progress with `progress(...)` (any JSON-serializable
+    fields, merged into the job's "progress") and write large results to
+    `output_path(...)` instead of returning them. A result with
+    "status": "partial" finishes the job as partial instead of succeeded.
+    """
+
+    def __init__(self, job_id: str, directory: str):
+        self.job_id = job_id
+        self.directory = directory
+        self.output = None
+        self._last_report = 0.0
+
+    def progress(self, force: bool = False, **fields) -> None:
+        """Report progress; calls closer than 0.25 s apart are dropped unless forced."""
+        now = time.monotonic()
+        if not force and now - self._last_report < 0.25:
+            return
+        self._last_report = now
+        if _progress_queue is not None:
+            _progress_queue.put((self.job_id, fields))
+
+    def output_path(self, extension: str) -> str:
+        """Path of this job's downloadable output file."""
+        self.output = f"{self.job_id}.{extension}"
+        return os.path.join(self.directory, self.output)
+
+
+def _alarm(signum, frame):
+    raise _JobTimeout()
+
+
+def _run_job(
+    job_id: str,
+    target: str,
+    params: Dict[str, Any],
+    directory: str,
+    timeout: Optional[float] = None
+) -> Tuple[Any, Optional[str]]:
+    """
+    Pool entry point: import the handler and run it.
+
+    The timeout is a SIGALRM in the worker (pool calls run on its main
+    thread), so the job fails with TimeoutError while the worker process
+    and the other jobs keep running. A BaseException, so handlers' own
+    `except Exception` blocks cannot swallow it. Not enforced on platforms
+    without SIGALRM (Windows).
+    """
+    module_name, function_name = target.split(':')
+    handler = getattr(importlib.import_module(module_name), function_name)
+    context = JobContext(job_id, directory)
+    timed = bool(timeout) and hasattr(signal, 'setitimer')
+    if timed:
+        signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        result = handler(params, context)
+    except _JobTimeout:
+        raise TimeoutError(f"Job timed out after {timeout:g}s") from None
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return result, context.output
+
+
+# ============================================================================
+# MANAGER
+# ============================================================================
+
+class JobManager:
+    """
+    Schedules jobs onto a process pool.
+
+    Each job kind belongs to a queue; a queue runs at most its configured
+    number of jobs at once, and the pool as a whole at most `max_workers`.
+    Whenever a slot frees up, the highest-priority (then oldest) waiting
+    job whose queue has capacity is started. Jobs are started in spawned
+    processes, so they share no threads, locks or sockets with the web
+    worker, and a crashing job cannot take it down.
+
+    A queue can also have a timeout in seconds (`timeouts`); its jobs fail
+    once they run longer than that.
+
+    Job state lives in this process; with a `shared` cache backend it is
+    also published there so any worker can answer status polls. Finished
+    jobs are forgotten after `ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        queues: Dict[str, int],
+        max_workers: int = 2,
+        directory: str = '/tmp/researchforge_jobs',
+        ttl_seconds: float = 3600,
+        max_waiting: int = 1000,
+        timeouts: Optional[Dict[str, float]] = None,
+        shared: Optional[CacheBackend] = None
+    ):
+        unknown = set(timeouts or ()) - set(queues)
+        if unknown:
+            raise ValueError(f"Timeouts for unknown job queues: {', '.join(sorted(unknown))}")
+        self.queues = dict(queues)
+        self.timeouts = dict(timeouts or {})
+        self.max_workers = max_workers
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_waiting = max_waiting
+        self.shared = shared
+
+        self._kinds: Dict[str, Tuple[str, str, int]] = {}  # kind -> (target, queue, priority)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._params: Dict[str, Dict[str, Any]] = {}
+        self._waiting = []                                 # heap of (priority, seq, job_id)
+        self._running = {name: 0 for name in self.queues}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._started = False
+        self._next_purge = 0.0
+        # Progress queue and listener thread of each pool, and those of
+        # replaced pools still to be shut down (outside the lock)
+        self._listeners: Dict[Any, Tuple[Any, threading.Thread]] = {}
+        self._retired = []
+        self._pool = ReplaceablePool(self._new_pool, 'job')
+
+    def register(self, kind: str, target: str, queue: str, priority: str = 'normal') -> None:
+        """
+        Register a job kind.
+
+        Args:
+            kind: Public job kind name
+            target: "module:function" taking (params, JobContext), run in the pool
+            queue: Queue name (its concurrency limit applies)
+            priority: Default priority for jobs of this kind
+        """
+        if queue not in self.queues:
+            raise ValueError(f"Unknown job queue '{queue}'")
+        self._kinds[kind] = (target, queue, PRIORITIES[priority])
+
+    @property
+    def kinds(self):
+        return list(self._kinds)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, params: Dict[str, Any], priority: Any = None) -> Dict[str, Any]:
+        """
+        Queue a job.
+
+        Returns:
+            The job's status snapshot
+
+        Raises:
+            ValueError: Unknown kind or priority
+            QueueFull: Too many jobs are already waiting
+        """
+        if kind not in self._kinds:
+            raise ValueError(f"Unknown job kind '{kind}' (expected one of: {', '.join(self._kinds)})")
+        target, queue, default_priority = self._kinds[kind]
+        priority = default_priority if priority is None else _parse_priority(priority)
+        # Params cross a process boundary; reject what would not survive it
+        json.dumps(params)
+
+        self._start()
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "queue": queue,
+            "priority": priority,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "output": None,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "attempts": 0,
+            "version": 0,
+        }
+        with self._cond:
+            self._purge_expired()
+            if len(self._waiting) >= self.max_waiting:
+                raise QueueFull(f"{len(self._waiting)} jobs are already waiting")
+            self._jobs[job_id] = job
+            self._params[job_id] = params
+            heapq.heappush(self._waiting, (priority, next(self._seq), job_id))
+            self._changed(job)
+            self._dispatch()
+            logger.info(f"Job {job_id} ({kind}) queued on {queue} with priority {priority}")
+            snapshot = _snapshot(job)
+        self._stop_retired_listeners()
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status snapshot of a job (from this process or the shared cache)."""
+        with self._cond:
+            self._purge_expired()
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return _snapshot(job)
+        if self.shared is not None:
+            data = self.shared.get(f"job:{job_id}")
+            if data is not None:
+                return json.loads(data)
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] != 'queued':
+                return False
+            self._waiting = [entry for entry in self._waiting if entry[2] != job_id]
+            heapq.heapify(self._waiting)
+            self._params.pop(job_id, None)
+            job['status'] = 'cancelled'
+            job['finished_at'] = time.time()
+            self._changed(job)
+            return True
+
+    def watch(self, job_id: str, timeout: float = 300.0, poll_seconds: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """
+        Yield a snapshot whenever the job changes, until it finishes or `timeout`.
+
+        Jobs owned by another worker are followed through the shared cache,
+        polling every `poll_seconds`.
+        """
+        give_up = time.monotonic() + timeout
+        version = -1
+        while True:
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is not None and job['version'] == version:
+                    self._cond.wait(max(0.0, give_up - time.monotonic()))
+            snapshot = self.get(job_id)
+            if snapshot is None:
+                return
+            if snapshot['version'] != version:
+                version = snapshot['version']
+                yield snapshot
+            if snapshot['status'] in TERMINAL_STATUSES or time.monotonic() >= give_up:
+                return
+            if job is None:
+                time.sleep(poll_seconds)
+
+    def output_file(self, job: Dict[str, Any]) -> Optional[str]:
+        """Path of a finished job's output file, if it has one."""
+        if not job.get('output'):
+            return None
+        path = os.path.join(self.directory, job['output'])
+        return path if os.path.isfile(path) else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            statuses = {}
+            for job in self._jobs.values():
+                statuses[job['status']] = statuses.get(job['status'], 0) + 1
+            return {
+                "running": dict(self._running),
+                "limits": dict(self.queues),
+                "waiting": len(self._waiting),
+                "jobs": statuses,
+            }
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _start(self) -> None:
+        """Create the pool and progress listener on first use."""
+        if self._started:
+            return
+        with self._cond:
+            if self._started:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._pool.executor  # creates the pool and its progress listener
+            self._started = True
+            logger.info(f"Job pool started with {self.max_workers} processes, queues {self.queues}")
+
+    def _new_pool(self):
+        """A pool whose workers report progress to a new listener thread."""
+        context = spawn_context()
+        progress_queue = context.Queue()
+        pool = spawn_pool(self.max_workers, _init_worker, (progress_queue,), context)
+        listener = threading.Thread(
+            target=self._listen, args=(progress_queue,), name="jobs-progress", daemon=True
+        )
+        listener.start()
+        self._listeners[pool] = (progress_queue, listener)
+        return pool
+
+    def _replace_pool(self, pool) -> None:
+        """Replace a broken pool and retire its listener (lock held)."""
+        if not self._pool.replace(pool):
+            return
+        progress_queue, listener = self._listeners.pop(pool)
+        progress_queue.put(None)
+        self._retired.append((progress_queue, listener))
+
+    def _stop_retired_listeners(self) -> None:
+        """Join the listeners of replaced pools and close their queues (lock not held)."""
+        with self._cond:
+            retired, self._retired = self._retired, []
+        for progress_queue, listener in retired:
+            listener.join(timeout=5)
+            progress_queue.close()
+            progress_queue.join_thread()
+
+    def _dispatch(self) -> None:
+        """Start waiting jobs while slots are free (lock held)."""
+        skipped = []
+        while self._waiting and sum(self._running.values()) < self.max_workers:
+            entry = heapq.heappop(self._waiting)
+            job = self._jobs[entry[2]]
+            if self._running[job['queue']] >= self.queues[job['queue']]:
+                skipped.append(entry)
+                continue
+            self._launch(job)
+        for entry in skipped:
+            heapq.heappush(self._waiting, entry)
+
+    def _launch(self, job: Dict[str, Any]) -> None:
+        target = self._kinds[job['kind']][0]
+        params = self._params[job['id']]
+        pool = self._pool.executor
+        timeout = self.timeouts.get(job['queue'])
+        try:
+            future = pool.submit(_run_job, job['id'], target, params, self.directory, timeout)
+        except Exception as e:
+            # A crashed worker breaks the pool: replace it and fail this job
+            logger.error(f"Could not start job {job['id']}: {e}")
+            self._replace_pool(pool)
+            self._finish(job, error=f"Could not start job: {e}")
+            return
+        self._running[job['queue']] += 1
+        job['attempts'] += 1
+        job['status'] = 'running'
+        job['started_at'] = time.time()
+        self._changed(job)
+        future.add_done_callback(lambda f, job_id=job['id']: self._done(job_id, f, pool))
+
+    def _done(self, job_id: str, future, pool) -> None:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._running[job['queue']] -= 1
+            try:
+                result, output = future.result()
+                self._finish(job, result=result, output=output)
+            except Exception as e:
+                broken = is_broken_pool(e)
+                if broken:
+                    self._replace_pool(pool)
+                if broken and job['attempts'] < 2:
+                    # A crash anywhere takes down every job in the pool; the
+                    # culprit is unknown, so each affected job gets one retry
+                    logger.warning(f"Job {job_id} ({job['kind']}) lost to a crashed worker, retrying")
+                    job['status'] = 'queued'
+                    heapq.heappush(self._waiting, (job['priority'], next(self._seq), job_id))
+                    self._changed(job)
+                else:
+                    logger.warning(f"Job {job_id} ({job['kind']}) failed: {e}")
+                    self._finish(job, error=str(e) or type(e).__name__)
+            self._dispatch()
+        self._stop_retired_listeners()
+
+    def _finish(self, job, result=None, output=None, error=None) -> None:
+        self._params.pop(job['id'], None)
+        if error is not None:
+            job['status'] = 'failed'
+        elif isinstance(result, dict) and result.get('status') == 'partial':
+            # The handler finished but its output is incomplete
+            job['status'] = 'partial'
+        else:
+            job['status'] = 'succeeded'
+        job['result'] = result
+        job['output'] = output
+        job['error'] = error
+        job['finished_at'] = time.time()
+        self._changed(job)
+        logger.info(f"Job {job['id']} ({job['kind']}) {job['status']}")
+
+    def _listen(self, progress_queue) -> None:
+        """Apply progress reports from the pool processes, until a None sentinel."""
+        while True:
+            item = progress_queue.get()
+            if item is None:
+                return
+            job_id, fields = item
+            with self._cond:
+                job = self._jobs.get(job_id)
+                if job is not None and job['status'] == 'running':
+                    job['progress'].update(fields)
+                    self._changed(job)
+
+    def _changed(self, job: Dict[str, Any]) -> None:
+        """Bump the version, wake watchers and publish (lock held)."""
+        job['version'] += 1
+        self._cond.notify_all()
+        if self.shared is not None:
+            self.shared.set(f"job:{job['id']}", json.dumps(job).encode('utf-8'), ttl_seconds=self.ttl_seconds)
+
+    def _purge_expired(self) -> None:
+        """
+        Forget finished jobs (and their output files) after ttl_seconds
+        (lock held). Runs on submit and status polls, at most once per
+        minute (or per ttl_seconds, if shorter).
+        """
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + min(60.0, self.ttl_seconds)
+        cutoff = time.time() - self.ttl_seconds
+        for job_id, job in list(self._jobs.items()):
+            if job['status'] in TERMINAL_STATUSES and job['finished_at'] < cutoff:
+                del self._jobs[job_id]
+                path = self.output_file(job)
+                if path is not None:
+                    os.remove(path)
+
+
+def _snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {**job, "progress": dict(job['progress'])}
+
+
+def _parse_priority(value: Any) -> int:
+    if isinstance(value, str) and value in PRIORITIES:
+        return PRIORITIES[value]
+    if isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= 9:
+        return value
+    raise ValueError(f"Invalid priority {value!r} (use high/normal/low or 0-9)")
+
+
+def parse_queue_limits(spec: str, convert: Callable[[str], Any] = int) -> Dict[str, Any]:
+    """Parse "name=value,name=value" into a dict (values converted with `convert`)."""
+    limits = {}
+    for item in spec.split(','):
+        if item.strip():
+            name, _, limit = item.partition('=')
+            limits[name.strip()] = convert(limit)
+    return limits
+
+
+def create_job_manager(shared: Optional[CacheBackend] = None) -> JobManager:
+    """
+    Build the job manager configured by environment variables.
+
+    JOBS_MAX_WORKERS: pool processes (default 2)
+    JOBS_QUEUE_LIMITS: per-queue concurrency (default "llm=2,export=1")
+    JOBS_DIR: output files (default /tmp/researchforge_jobs)
+    JOBS_TTL_SECONDS: how long finished jobs are kept (default 3600)
+    JOBS_MAX_WAITING: queued-job limit before submissions get 429 (default 1000)
+    JOBS_QUEUE_TIMEOUTS: per-queue job timeout in seconds (default
+    "llm=600,export=3600")
+
+    Args:
+        shared: Cross-worker cache for job status (see cache.create_cache)
+    """
+    return JobManager(
+        parse_queue_limits(os.environ.get('JOBS_QUEUE_LIMITS', 'llm=2,export=1')),
+        max_workers=int(os.environ.get('JOBS_MAX_WORKERS', 2)),
+        directory=os.environ.get('JOBS_DIR', '/tmp/researchforge_jobs'),
+        ttl_seconds=float(os.environ.get('JOBS_TTL_SECONDS', 3600)),
+        max_waiting=int(os.environ.get('JOBS_MAX_WAITING', 1000)),
+        timeouts=parse_queue_limits(os.environ.get('JOBS_QUEUE_TIMEOUTS', 'llm=600,export=3600'), float),
+        shared=shared,
+    )
@@ -5,19 +5,37 @@ A beautiful, modern web interface for AI-powered research collaboration.
 
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, session
+import json
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from dotenv import load_dotenv
+from sessions import conversation_turns, create_session_store, is_valid_session_id
+from context_cache import create_context_cache
+from mailmerge import iter_merge, prepare_renderer, render_email, render_proposal
+from exporters import FORMATS as EXPORT_FORMATS, export_error_trailer, stream_export
+from papers import PaperRecord, dumps_json, json_default
+from cache import create_cache
+from ingest import create_ingest_pipeline
+from jobs import QueueFull, create_job_manager
+import http_cache
+from suggest import TITLE_WEIGHT, QueryGate, create_suggest_index
+from resilience import (
+    RETRY_BUDGETS, Deadline, DeadlineExceeded, call_with_retries, deadline_scope,
+    error_status, retry_after_seconds
+)
 # google-adk imports removed to fix deployment
 # from google.adk.agents import Agent
 # from google.adk.tools import FunctionTool
 # from google.adk.runners import Runner
 # from google.adk.sessions import InMemorySessionService
-from google.genai import types
-import requests
-import xml.etree.ElementTree as ET
-from typing import Dict, Any, List
+# google.genai, requests and ElementTree are imported lazily (see _genai()
+# and advanced_arxiv_search) to keep worker boot and cold starts fast.
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional
 import uuid
+import re
 
 # Load environment variables
 load_dotenv()
@@ -29,10 +47,36 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class ResearchForgeJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider for jsonify(): understands PaperRecord and uses the fast
+    encoder from papers.py (orjson when installed). Everything else is
+    encoded exactly as Flask's default provider would (HTTP dates, Decimal,
+    UUID, dataclasses).
+    """
+    
+    @staticmethod
+    def default(o: Any) -> Any:
+        if isinstance(o, (PaperRecord, set, frozenset)):
+            return json_default(o)
+        return DefaultJSONProvider.default(o)
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # response() (and so jsonify) only passes separators or indent=2
+        if set(kwargs) - {'separators', 'indent'}:
+            return super().dumps(obj, **kwargs)
+        return dumps_json(
+            obj, sort_keys=self.sort_keys, indent=kwargs.get('indent'), default=self.default
+        ).decode('utf-8')
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ResearchForgeJSONProvider(app)
 app.secret_key = os.environ.get('SECRET_KEY', os.urandom(24))
 CORS(app)
+# ETags / 304s, gzip+brotli compression and precompressed static files
+http_cache.init_app(app)
 
 # Set API key
 # Set API key - ensure it's loaded
@@ -43,14 +87,231 @@ else:
     # Ensure it's in os.environ for libraries that might look for it implicitly
     os.environ['GOOGLE_API_KEY'] = api_key
 
-# Session service removed
-# session_service = InMemorySessionService()
+# Encoded /api/search responses, keyed by normalized query (see search_papers).
+# Per process by default; CACHE_BACKEND=sqlite/redis shares it across workers.
+search_cache = create_cache(
+    'search',
+    max_entries=int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 512)),
+    ttl_seconds=float(os.environ.get('SEARCH_CACHE_TTL_SECONDS', 300))
+)
+
+# Cross-worker state for the chat layer: context cache handles and model health
+shared_cache = create_cache('shared', max_entries=1024, ttl_seconds=3600)
+
+# How long a throttled / overloaded model is skipped when no Retry-After is given
+MODEL_COOLDOWN_SECONDS = float(os.environ.get('MODEL_COOLDOWN_SECONDS', 60))
+
+# Typeahead index over past queries, paper titles and arXiv categories.
+# Typed queries only appear once this many distinct clients searched them.
+suggest_index = create_suggest_index()
+query_gate = QueryGate(suggest_index, min_sources=int(os.environ.get('SUGGEST_MIN_QUERY_SOURCES', 3)))
+
+# End-to-end deadlines for upstream (arXiv / Gemini) work, in seconds
+SEARCH_DEADLINE_SECONDS = float(os.environ.get('SEARCH_DEADLINE_SECONDS', 15))
+CHAT_DEADLINE_SECONDS = float(os.environ.get('CHAT_DEADLINE_SECONDS', 45))
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = float(os.environ.get('GEMINI_ATTEMPT_TIMEOUT_SECONDS', 20))
+PERSONALIZE_DEADLINE_SECONDS = float(os.environ.get('PERSONALIZE_DEADLINE_SECONDS', 30))
+EXPORT_PAGE_DEADLINE_SECONDS = float(os.environ.get('EXPORT_PAGE_DEADLINE_SECONDS', 30))
+
+# Upper bound on papers per /api/search request (one arXiv page)
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 100))
+
+# Upper bound on papers per /api/export request
+EXPORT_MAX_RESULTS = int(os.environ.get('EXPORT_MAX_RESULTS', 100000))
+
+# Server-side chat history, keyed by session_id (see sessions.py)
+session_store = create_session_store()
+
+# Provider-side caching of the system instruction / session prefixes
+context_cache = create_context_cache(shared=shared_cache, max_history_tokens=session_store.token_budget)
+
+# Full-text PDF ingestion and passage retrieval (see ingest.py). The
+# pipeline starts on first use; INGEST_ON_SEARCH queues every search result.
+ingest_pipeline = create_ingest_pipeline()
+INGEST_ON_SEARCH = os.environ.get('INGEST_ON_SEARCH', 'false').lower() in ('1', 'true', 'yes')
+
+# New-style arXiv IDs mentioned in chat messages, e.g. 2401.12345v2
+ARXIV_ID_PATTERN = re.compile(r'\b(\d{4}\.\d{4,5})(?:v\d+)?\b')
+
+# Slow work runs in a separate process pool (see jobs.py and /api/jobs).
+# Handlers are "module:function" names, imported in the pool processes.
+job_manager = create_job_manager(shared=shared_cache)
+job_manager.register('proposal', 'main:run_proposal_job', queue='llm', priority='high')
+job_manager.register('bulk_drafts', 'main:run_bulk_drafts_job', queue='llm', priority='normal')
+job_manager.register('export', 'main:run_export_job', queue='export', priority='low')
+# /api/jobs/<id>/events ends after this long (well below the gunicorn
+# timeout); clients reconnect, or poll GET /api/jobs/<id> instead
+JOBS_STREAM_TIMEOUT_SECONDS = float(os.environ.get('JOBS_STREAM_TIMEOUT_SECONDS', 25))
+
+# Lazily-initialized Gemini SDK state (see _genai() / warm_up())
+_genai_lock = threading.Lock()
+_genai_client = None
+_genai_types = None
+
+
+def _genai():
+    """
+    Return the shared (client, types) pair for the Gemini SDK.
+    
+    The google.genai import and client construction happen on first use and
+    only once per process; later calls are a cheap attribute check.
+    """
+    global _genai_client, _genai_types
+    if _genai_client is None:
+        with _genai_lock:
+            if _genai_client is None:
+                from google.genai import types
+                from google.genai.client import Client
+                
+                _genai_types = types
+                _genai_client = Client(api_key=os.environ.get('GOOGLE_API_KEY'))
+    return _genai_client, _genai_types
+
+
+def warm_up() -> None:
+    """
+    Pay the one-time SDK import and client setup cost ahead of traffic.
+    
+    Called from the App Engine warmup request; safe to call more than once.
+    """
+    import requests  # noqa: F401
+    
+    if os.environ.get('GOOGLE_API_KEY'):
+        _genai()
 
 
 # ============================================================================
 # TOOL FUNCTIONS
 # ============================================================================
 
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+ARXIV_NAMESPACES = {
+    'atom': 'http://www.w3.org/2005/Atom',
+    'arxiv': 'http://arxiv.org/schemas/atom'
+}
+
+
+def build_arxiv_query(query: str, category: str = "all") -> str:
+    """Build the arXiv `search_query` expression for a query and category."""
+    if category != "all":
+        return f"cat:{category} AND all:{query}"
+    return f"all:{query}"
+
+
+def fetch_arxiv_page(
+    search_query: str,
+    start: int = 0,
+    max_results: int = 10,
+    abstract_chars: Optional[int] = 500,
+    deadline: Optional[Deadline] = None
+) -> List[PaperRecord]:
+    """
+    Fetch and parse one page of arXiv API results.
+    
+    Args:
+        search_query: arXiv search_query expression (see build_arxiv_query)
+        start: Offset of the first result
+        max_results: Page size
+        abstract_chars: Truncate abstracts to this length (None for full text)
+        deadline: Request deadline (defaults to the ambient deadline_scope)
+        
+    Returns:
+        List of PaperRecord (empty past the last result)
+        
+    Raises:
+        requests.RequestException / ET.ParseError on upstream failures
+    """
+    import requests
+    import xml.etree.ElementTree as ET
+    
+    params = {
+        'search_query': search_query,
+        'start': start,
+        'max_results': max_results,
+        'sortBy': 'submittedDate',
+        'sortOrder': 'descending'
+    }
+    
+    def attempt(timeout: float):
+        response = requests.get(ARXIV_API_URL, params=params, timeout=timeout)
+        response.raise_for_status()
+        return response
+    
+    # Retries with backoff while the deadline and retry budget allow
+    response = call_with_retries(attempt, 'arxiv', deadline=deadline, attempt_timeout=10)
+    
+    # Parse XML response
+    root = ET.fromstring(response.content)
+    namespaces = ARXIV_NAMESPACES
+    
+    papers = []
+    for entry in root.findall('atom:entry', namespaces):
+        # Extract paper details
+        title_elem = entry.find('atom:title', namespaces)
+        title = title_elem.text.strip().replace('\n', ' ') if title_elem is not None else "No title"
+        
+        authors = []
+        for author in entry.findall('atom:author', namespaces):
+            name_elem = author.find('atom:name', namespaces)
+            if name_elem is not None:
+                authors.append(name_elem.text.strip())
+        
+        id_elem = entry.find('atom:id', namespaces)
+        arxiv_id = id_elem.text.split('/abs/')[-1] if id_elem is not None else "unknown"
+        
+        summary_elem = entry.find('atom:summary', namespaces)
+        abstract = summary_elem.text.strip().replace('\n', ' ')[:abstract_chars] if summary_elem is not None else ""
+        
+        published_elem = entry.find('atom:published', namespaces)
+        published = published_elem.text[:10] if published_elem is not None else "Unknown"
+        
+        papers.append(PaperRecord(title, authors, arxiv_id, published, abstract))
+    
+    return papers
+
+
+def iter_arxiv_papers(
+    query: str,
+    category: str = "all",
+    limit: int = 1000,
+    page_size: int = 200,
+    first_page_size: int = 25,
+    page_delay: float = 3.0,
+    abstract_chars: Optional[int] = None
+) -> Iterator[List[PaperRecord]]:
+    """
+    Page through arXiv results, yielding one page (list of papers) at a time.
+    
+    The first page is kept small so callers can start streaming quickly;
+    later pages use `page_size`. Pages are spaced by `page_delay` seconds as
+    requested by the arXiv API terms of use.
+    
+    Args:
+        query: Search query string
+        category: arXiv category filter
+        limit: Maximum total number of papers
+        page_size: Papers per request after the first page
+        first_page_size: Papers in the first request
+        page_delay: Seconds to wait between requests
+        abstract_chars: Truncate abstracts (None keeps the full abstract)
+    """
+    search_query = build_arxiv_query(query, category)
+    start = 0
+    size = min(first_page_size, limit)
+    while start < limit:
+        if start:
+            time.sleep(page_delay)
+        page = fetch_arxiv_page(
+            search_query, start, min(size, limit - start), abstract_chars,
+            deadline=Deadline(EXPORT_PAGE_DEADLINE_SECONDS)
+        )
+        if not page:
+            return
+        yield page
+        start += len(page)
+        size = page_size
+
+
 def advanced_arxiv_search(
     query: str, 
     category: str = "all", 
@@ -68,68 +329,8 @@ def advanced_arxiv_search(
         Dictionary containing search results with status and papers list
     """
     try:
-        base_url = "http://export.arxiv.org/api/query"
-        
-        # Build search query
-        if category != "all":
-            search_query = f"cat:{category} AND all:{query}"
-        else:
-            search_query = f"all:{query}"
-        
-        params = {
-            'search_query': search_query,
-            'start': 0,
-            'max_results': max_results,
-            'sortBy': 'submittedDate',
-            'sortOrder': 'descending'
-        }
-        
         logger.info(f"Searching arXiv for: {query} (category: {category})")
-        response = requests.get(base_url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        # Parse XML response
-        root = ET.fromstring(response.content)
-        namespaces = {
-            'atom': 'http://www.w3.org/2005/Atom',
-            'arxiv': 'http://arxiv.org/schemas/atom'
-        }
-        
-        papers = []
-        entries = root.findall('atom:entry', namespaces)
-        
-        for entry in entries:
-            # Extract paper details
-            title_elem = entry.find('atom:title', namespaces)
-            title = title_elem.text.strip().replace('\n', ' ') if title_elem is not None else "No title"
-            
-            authors = []
-            for author in entry.findall('atom:author', namespaces):
-                name_elem = author.find('atom:name', namespaces)
-                if name_elem is not None:
-                    authors.append(name_elem.text.strip())
-            
-            id_elem = entry.find('atom:id', namespaces)
-            arxiv_id = id_elem.text.split('/abs/')[-1] if id_elem is not None else "unknown"
-            
-            summary_elem = entry.find('atom:summary', namespaces)
-            abstract = summary_elem.text.strip().replace('\n', ' ')[:500] if summary_elem is not None else ""
-            
-            published_elem = entry.find('atom:published', namespaces)
-            published = published_elem.text[:10] if published_elem is not None else "Unknown"
-            
-            pdf_link = f"https://arxiv.org/pdf/{arxiv_id}"
-            web_link = f"https://arxiv.org/abs/{arxiv_id}"
-            
-            papers.append({
-                'title': title,
-                'authors': authors,
-                'arxiv_id': arxiv_id,
-                'published': published,
-                'abstract': abstract,
-                'pdf_url': pdf_link,
-                'web_url': web_link
-            })
+        papers = fetch_arxiv_page(build_arxiv_query(query, category), 0, max_results)
         
         logger.info(f"Found {len(papers)} papers")
         return {
@@ -168,26 +369,15 @@ def generate_research_proposal(
     """
     logger.info(f"Generating proposal for: {project_title}")
     
-    proposal = {
-        "title": f"Collaborative Research: {project_title}",
-        "lead_researcher": researcher_name,
-        "abstract": f"This proposal outlines an innovative collaborative research project led by "
-                   f"{researcher_name} to advance {collaboration_focus}. The research addresses "
-                   f"critical gaps in current knowledge and proposes novel methodologies.",
-        "research_question": f"How can we leverage advanced AI techniques to solve key challenges "
-                           f"in {collaboration_focus}?",
-        "methodology": "Mixed-methods approach combining quantitative ML analysis with qualitative "
-                      "domain expertise. We will use state-of-the-art deep learning models and "
-                      "rigorous experimental validation.",
-        "timeline": "24 months with quarterly milestones: Q1-2 (Setup), Q3-4 (Development), "
-                   "Q5-6 (Validation), Q7-8 (Dissemination)",
-        "budget": "$600K over 24 months",
-        "expected_outcomes": "High-impact publications, open-source tools, and field advancement"
-    }
+    result = render_proposal({
+        "researcher_name": researcher_name,
+        "project_title": project_title,
+        "collaboration_focus": collaboration_focus,
+    })
     
     return {
         "status": "success",
-        "proposal": proposal
+        "proposal": result["proposal"]
     }
 
 
@@ -211,25 +401,17 @@ def draft_collaboration_email(
     """
     logger.info(f"Drafting email for: {project_title}")
     
-    email = f"""Subject: Research Collaboration Opportunity: {project_title}
-
-Dear {recipient_name},
-
-I hope this message finds you well. I'm reaching out to propose a research collaboration 
-opportunity that aligns with your expertise in {match_insights}.
-
-I believe our work shows remarkable synergy with the project "{project_title}". 
-Our preliminary assessment indicates strong alignment in research interests and methodologies.
-
-I would be delighted to schedule a brief call to discuss potential collaboration.
-
-Best regards,
-{researcher_name}"""
+    result = render_email({
+        "researcher_name": researcher_name,
+        "recipient_name": recipient_name,
+        "project_title": project_title,
+        "match_insights": match_insights,
+    })
     
     return {
         "status": "success",
-        "email_draft": email,
-        "subject": f"Research Collaboration: {project_title}"
+        "email_draft": result["email_draft"],
+        "subject": result["subject"]
     }
 
 
@@ -264,6 +446,209 @@ Best regards,
 # )
 
 
+# ============================================================================
+# BULK PERSONALIZATION
+# ============================================================================
+
+# Model and limits for the optional LLM step of /api/bulk/drafts
+PERSONALIZE_MODEL = os.environ.get('PERSONALIZE_MODEL', 'gemini-2.0-flash-lite')
+PERSONALIZE_BATCH_SIZE = int(os.environ.get('PERSONALIZE_BATCH_SIZE', 16))
+PERSONALIZE_CONCURRENCY = int(os.environ.get('PERSONALIZE_CONCURRENCY', 4))
+
+
+def personalize_draft(kind: str, record: Dict[str, Any], rendered: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rewrite a rendered draft with Gemini using the record's details.
+    
+    Emails get their body rewritten; proposals get their abstract rewritten.
+    Raises on model errors (the caller keeps the unpersonalized draft).
+    """
+    client, types = _genai()
+    field = 'email_draft' if kind == 'email' else 'abstract'
+    target = rendered if kind == 'email' else rendered['proposal']
+    
+    prompt = (
+        f"Personalize the following {'email' if kind == 'email' else 'proposal abstract'} "
+        f"using the recipient/project details. Keep the structure, tone and length. "
+        f"Return only the rewritten text.\n\n"
+        f"Details: {json.dumps(record, ensure_ascii=False)}\n\n{target[field]}"
+    )
+    response = call_with_retries(
+        lambda timeout: client.models.generate_content(
+            model=PERSONALIZE_MODEL,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                temperature=0.7,
+                http_options=types.HttpOptions(timeout=int(timeout * 1000))
+            )
+        ),
+        'gemini',
+        deadline=Deadline(PERSONALIZE_DEADLINE_SECONDS),
+        attempt_timeout=GEMINI_ATTEMPT_TIMEOUT_SECONDS
+    )
+    if response.text:
+        target[field] = response.text.strip()
+    return rendered
+
+
+# ============================================================================
+# BACKGROUND JOB HANDLERS
+# ============================================================================
+# Each runs in a job pool process as handler(params, job) and returns a small
+# JSON-serializable result; large output goes to job.output_path().
+
+def run_proposal_job(params: Dict[str, Any], job) -> Dict[str, Any]:
+    """
+    Render a research proposal, optionally personalized with Gemini.
+    
+    Params: proposal fields (researcher_name, project_title,
+    collaboration_focus, ...), plus optional "template" and "personalize".
+    """
+    record = {k: v for k, v in params.items() if k not in ('template', 'personalize')}
+    job.progress(stage='rendering', force=True)
+    rendered = prepare_renderer('proposal', params.get('template'))(record)
+    if params.get('personalize'):
+        job.progress(stage='personalizing', force=True)
+        rendered = personalize_draft('proposal', record, rendered)
+    return {"status": "success", "proposal": rendered["proposal"]}
+
+
+def run_bulk_drafts_job(params: Dict[str, Any], job) -> Dict[str, Any]:
+    """
+    Bulk mail merge (same params as /api/bulk/drafts), written as NDJSON.
+    """
+    records = params.get('records') or []
+    results = iter_merge(
+        params.get('kind', 'email'),
+        records,
+        template=params.get('template'),
+        personalize=personalize_draft if params.get('personalize') else None,
+        batch_size=PERSONALIZE_BATCH_SIZE,
+        concurrency=PERSONALIZE_CONCURRENCY
+    )
+    done = errors = 0
+    with open(job.output_path('ndjson'), 'w', encoding='utf-8') as out:
+        for result in results:
+            done += 1
+            if result["status"] != "success":
+                errors += 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            job.progress(done=done, total=len(records), errors=errors)
+    job.progress(done=done, total=len(records), errors=errors, force=True)
+    return {"status": "success", "total": done, "errors": errors}
+
+
+def run_export_job(params: Dict[str, Any], job) -> Dict[str, Any]:
+    """
+    Export search results (same params as /api/export) to a file.
+    """
+    query = params['query']
+    fmt = params.get('format', 'jsonl')
+    limit = max(1, min(int(params.get('limit', 1000)), EXPORT_MAX_RESULTS))
+    papers = 0
+    failure = []
+    
+    def counted(pages):
+        nonlocal papers
+        for page in pages:
+            papers += len(page)
+            job.progress(papers=papers, limit=limit)
+            yield page
+    
+    def on_error(error):
+        failure.append(str(error))
+        return export_error_trailer(fmt, error)
+    
+    pages = counted(iter_arxiv_papers(query, params.get('category', 'all'), limit=limit))
+    extension = EXPORT_FORMATS[fmt][1]
+    with open(job.output_path(extension), 'w', encoding='utf-8') as out:
+        for chunk in stream_export(pages, fmt, {"query": query}, on_error=on_error):
+            out.write(chunk)
+    job.progress(papers=papers, limit=limit, force=True)
+    if failure:
+        return {"status": "partial", "papers": papers, "message": failure[0]}
+    return {"status": "success", "papers": papers}
+
+
+def validate_job_params(kind: str, params: Dict[str, Any]) -> None:
+    """
+    Cheap request-time checks, so bad jobs fail with a 400 instead of later.
+    
+    Raises:
+        ValueError: If the params cannot work for this kind
+    """
+    if kind == 'export':
+        if not str(params.get('query', '')).strip():
+            raise ValueError("Export jobs need a 'query'")
+        if params.get('format', 'jsonl') not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported format (use one of: {', '.join(EXPORT_FORMATS)})")
+        int(params.get('limit', 1000))
+    elif kind == 'bulk_drafts':
+        prepare_renderer(params.get('kind', 'email'), params.get('template'))
+        if not isinstance(params.get('records') or [], list):
+            raise ValueError("'records' must be a list")
+    elif kind == 'proposal':
+        prepare_renderer('proposal', params.get('template'))
+
+
+# ============================================================================
+# CHAT CONFIGURATION
+# ============================================================================
+
+# Static system prompt for /api/chat. Kept constant so it can be served from
+# a provider-side context cache (see context_cache.py).
+CHAT_SYSTEM_INSTRUCTION = """You are ResearchForge AI, a PROACTIVE research assistant.
+
+CRITICAL: When users ask questions, provide IMMEDIATE, COMPLETE answers. DO NOT ask clarifying questions first.
+
+Your capabilities:
+1. Search arXiv for research papers
+2. Generate research proposals
+3. Draft collaboration emails
+
+BEHAVIOR RULES:
+
+When user asks "Find papers about X":
+- Assume they want recent papers (last 2 years)
+- Use their exact query terms
+- Return 5-10 papers with titles, authors, links
+- Format clearly with bullet points
+
+When user asks "Generate a proposal for X":
+- Use X as the project focus
+- Create COMPLETE proposal immediately
+- Include: title, abstract, methodology, timeline, budget
+- Use defaults: researcher="Dr. Sarah Chen", timeline="24 months", budget="$600K"
+
+When user asks "Draft an email for X":
+- Create COMPLETE email immediately
+- Use X as the project topic
+- Include: subject line, greeting, body, closing
+- Use defaults: sender="Dr. Sarah Chen", recipient="Dr. Colleague"
+
+FORMATTING:
+- Use markdown: **bold**, *italic*, ## headers
+- Use bullet points for lists
+- Keep responses clear and organized
+- Always include specific details and numbers
+
+NEVER say:
+- "Could you specify..."
+- "What area are you interested in..."
+- "To make this better..."
+- "Please provide more details..."
+
+ALWAYS:
+- Provide complete, actionable information immediately
+- Use reasonable defaults when details are missing
+- Format responses professionally with markdown
+- Be specific and detailed in your answers"""
+
+# What the context cache can ever hold with this prompt and history budget
+_chat_cache_eligibility = context_cache.eligibility(CHAT_SYSTEM_INSTRUCTION, session_store.token_budget)
+logger.info(f"Chat context caching: {_chat_cache_eligibility}")
+
+
 # ============================================================================
 # ROUTES
 # ============================================================================
@@ -274,12 +659,12 @@ def index():
     return render_template('index.html')
 
 
-@app.route('/api/search', methods=['POST'])
+@app.route('/api/search', methods=['GET', 'POST'])
 def search_papers():
     """
     API endpoint for searching research papers.
     
-    Request JSON:
+    Request JSON (POST) or query string (GET):
         {
             "query": "machine learning",
             "category": "cs.AI",
@@ -287,22 +672,54 @@ def search_papers():
         }
     
     Returns:
-        JSON response with search results
+        JSON response with search results. Successful results are cached
+        as encoded JSON, and GET responses carry a strong ETag so repeat
+        searches revalidate with If-None-Match -> 304.
     """
     try:
-        data = request.get_json()
+        data = request.get_json() if request.method == 'POST' else request.args
         query = data.get('query', '')
         category = data.get('category', 'all')
-        max_results = data.get('max_results', 10)
         
         if not query:
             return jsonify({
                 "status": "error",
                 "message": "Query parameter is required"
             }), 400
+        try:
+            max_results = max(1, min(int(data.get('max_results', 10)), SEARCH_MAX_RESULTS))
+        except (TypeError, ValueError):
+            return jsonify({
+                "status": "error",
+                "message": "max_results must be an integer"
+            }), 400
+        
+        failed = []
+        
+        def run_search():
+            with deadline_scope(SEARCH_DEADLINE_SECONDS):
+                result = advanced_arxiv_search(query, category, max_results)
+            encoded = dumps_json(result, sort_keys=True) + b"\n"
+            if result["status"] != "success":
+                failed.append(encoded)
+                return None  # returned below, but never cached
+            for paper in result["papers"]:
+                suggest_index.add(paper.title, TITLE_WEIGHT, 'title')
+            if INGEST_ON_SEARCH:
+                ingest_pipeline.request(result["papers"])
+            return encoded
+        
+        # Concurrent identical searches (in any worker) hit arXiv only once
+        cache_key = f"{category}:{max_results}:{' '.join(query.lower().split())}"
+        body = search_cache.get_or_compute(cache_key, run_search, wait_seconds=SEARCH_DEADLINE_SECONDS)
+        if body is None:
+            body = failed[0]
         
-        result = advanced_arxiv_search(query, category, max_results)
-        return jsonify(result)
+        # First X-Forwarded-For hop behind App Engine / Cloud Run proxies
+        client = request.access_route[0] if request.access_route else ''
+        query_gate.observe(query, client)
+        
+        return app.response_class(body, mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
@@ -312,6 +729,59 @@ def search_papers():
         }), 500
 
 
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """
+    API endpoint for search-box typeahead.
+    
+    Query parameters:
+        q: Prefix typed so far
+        k: Maximum number of suggestions (default 8)
+    
+    Returns:
+        JSON response with frequency-ranked completions
+    """
+    prefix = request.args.get('q', '')
+    try:
+        k = int(request.args.get('k', 8))
+    except ValueError:
+        k = 8
+    
+    response = jsonify({
+        "status": "success",
+        "query": prefix,
+        "suggestions": suggest_index.suggest(prefix[:200], k)
+    })
+    response.headers['Cache-Control'] = 'public, max-age=60'
+    return response
+
+
+def fulltext_passages(message: str, max_papers: int = 3, per_paper: int = 2) -> List[Dict[str, Any]]:
+    """
+    Full-text passages of the ingested papers a message mentions by arXiv ID.
+    
+    Args:
+        message: Chat message
+        max_papers: Most papers to look up
+        per_paper: Passages per paper
+    
+    Returns:
+        Passages ranked by overlap with the message (see ChunkStore.passages)
+    """
+    passages = []
+    for arxiv_id in list(dict.fromkeys(ARXIV_ID_PATTERN.findall(message)))[:max_papers]:
+        passages.extend(ingest_pipeline.store.passages(arxiv_id, message, k=per_paper))
+    return passages
+
+
+def format_passages(passages: List[Dict[str, Any]]) -> str:
+    """Render passages as a context block appended to a chat message."""
+    if not passages:
+        return ""
+    blocks = [f"[arXiv:{p['arxiv_id']}, part {p['chunk'] + 1}] {p['text']}" for p in passages]
+    return "\n\nRelevant passages from the papers' full text:\n\n" + "\n\n".join(blocks)
+
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """
@@ -327,8 +797,6 @@ def chat():
         JSON response with agent's reply
     """
     try:
-        from google.genai.client import Client
-        
         data = request.get_json()
         user_message = data.get('message', '')
         user_session_id = data.get('session_id') or str(uuid.uuid4())
@@ -339,56 +807,23 @@ def chat():
                 "message": "Message parameter is required"
             }), 400
         
+        if not is_valid_session_id(user_session_id):
+            return jsonify({
+                "status": "error",
+                "message": "session_id must be 1-64 letters, digits, '-' or '_'"
+            }), 400
+        
         # Use Gemini client directly for simple chat
-        client = Client(api_key=os.environ.get('GOOGLE_API_KEY'))
+        client, types = _genai()
         
-        # Create system instruction
-        system_instruction = """You are ResearchForge AI, a PROACTIVE research assistant.
-
-CRITICAL: When users ask questions, provide IMMEDIATE, COMPLETE answers. DO NOT ask clarifying questions first.
-
-Your capabilities:
-1. Search arXiv for research papers
-2. Generate research proposals
-3. Draft collaboration emails
-
-BEHAVIOR RULES:
-
-When user asks "Find papers about X":
-- Assume they want recent papers (last 2 years)
-- Use their exact query terms
-- Return 5-10 papers with titles, authors, links
-- Format clearly with bullet points
-
-When user asks "Generate a proposal for X":
-- Use X as the project focus
-- Create COMPLETE proposal immediately
-- Include: title, abstract, methodology, timeline, budget
-- Use defaults: researcher="Dr. Sarah Chen", timeline="24 months", budget="$600K"
-
-When user asks "Draft an email for X":
-- Create COMPLETE email immediately
-- Use X as the project topic
-- Include: subject line, greeting, body, closing
-- Use defaults: sender="Dr. Sarah Chen", recipient="Dr. Colleague"
-
-FORMATTING:
-- Use markdown: **bold**, *italic*, ## headers
-- Use bullet points for lists
-- Keep responses clear and organized
-- Always include specific details and numbers
-
-NEVER say:
-- "Could you specify..."
-- "What area are you interested in..."
-- "To make this better..."
-- "Please provide more details..."
-
-ALWAYS:
-- Provide complete, actionable information immediately
-- Use reasonable defaults when details are missing
-- Format responses professionally with markdown
-- Be specific and detailed in your answers"""
+        # Replay the (budget-trimmed) session history before the new message
+        summary, history = session_store.get(user_session_id)
+        # Passages are sent with this message only, not kept in the history
+        message_text = user_message + format_passages(fulltext_passages(user_message))
+        contents = [
+            types.Content(role=turn['role'], parts=[types.Part(text=turn['text'])])
+            for turn in conversation_turns(summary, history, message_text)
+        ]
         
         # Fallback models in priority order (based on your available quota)
         models_to_try = [
@@ -401,37 +836,70 @@ ALWAYS:
         response_text = None
         last_error = None
         
-        # Try each model until one succeeds
-        for model_name in models_to_try:
-            try:
-                logger.info(f"Trying model: {model_name}")
-                
-                response = client.models.generate_content(
-                    model=model_name,
-                    contents=user_message,
-                    config=types.GenerateContentConfig(
-                        system_instruction=system_instruction,
-                        temperature=0.7
+        # One deadline for the whole request, shared by every model attempt
+        with deadline_scope(CHAT_DEADLINE_SECONDS) as deadline:
+            # Try each model until one succeeds
+            for model_name in models_to_try:
+                if deadline.expired():
+                    last_error = last_error or "request deadline exceeded"
+                    break
+                # Skip models another worker just saw throttled (the last one is always tried)
+                if model_name != models_to_try[-1] and shared_cache.get(f"model-cooldown:{model_name}"):
+                    logger.info(f"Skipping model {model_name}: cooling down")
+                    continue
+                try:
+                    logger.info(f"Trying model: {model_name}")
+                    
+                    # Retry transient errors once on the same model, then fall back
+                    response = call_with_retries(
+                        lambda timeout: context_cache.generate(
+                            client,
+                            types,
+                            model_name,
+                            CHAT_SYSTEM_INSTRUCTION,
+                            contents,
+                            session_id=user_session_id,
+                            temperature=0.7,
+                            http_options=types.HttpOptions(timeout=int(timeout * 1000))
+                        ),
+                        'gemini',
+                        attempt_timeout=GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+                        max_attempts=2
                     )
-                )
-                
-                response_text = response.text if hasattr(response, 'text') else str(response)
-                logger.info(f"✅ Success with model: {model_name}")
-                break  # Success! Exit the loop
-                
-            except Exception as model_error:
-                last_error = str(model_error)
-                logger.warning(f"❌ Model {model_name} failed: {last_error}")
-                # Continue to next model
-                continue
+                    
+                    response_text = response.text if hasattr(response, 'text') else str(response)
+                    logger.info(f"✅ Success with model: {model_name}")
+                    break  # Success! Exit the loop
+                    
+                except DeadlineExceeded as deadline_error:
+                    last_error = str(deadline_error)
+                    break
+                    
+                except Exception as model_error:
+                    last_error = str(model_error)
+                    logger.warning(f"❌ Model {model_name} failed: {last_error}")
+                    if error_status(model_error) in (429, 503):
+                        shared_cache.set(
+                            f"model-cooldown:{model_name}", b"1",
+                            ttl_seconds=retry_after_seconds(model_error) or MODEL_COOLDOWN_SECONDS
+                        )
+                    # Continue to next model
+                    continue
         
         # If all models failed
         if response_text is None:
+            if deadline.expired():
+                return jsonify({
+                    "status": "error",
+                    "message": f"The AI assistant did not respond in time ({last_error}). Please try again."
+                }), 504
             return jsonify({
                 "status": "error",
                 "message": f"All models failed. Last error: {last_error}. Please try again in a few moments."
             }), 503
         
+        session_store.append(user_session_id, user_message, response_text)
+        
         return jsonify({
             "status": "success",
             "response": response_text,
@@ -448,6 +916,349 @@ ALWAYS:
         }), 500
 
 
+@app.route('/_ah/warmup', methods=['GET'])
+def warmup():
+    """App Engine warmup request: initialize SDKs before live traffic."""
+    warm_up()
+    return '', 200
+
+
+@app.route('/api/export', methods=['GET'])
+def export_papers():
+    """
+    API endpoint for streaming large search result exports.
+    
+    Query parameters:
+        query: Search query (required)
+        category: arXiv category filter (default "all")
+        format: "jsonl" (default), "csv" or "bibtex"
+        limit: Maximum number of papers (default 1000)
+    
+    Returns:
+        Chunked download in the requested format. Pages are fetched from
+        arXiv while earlier pages are being sent, so memory stays flat and
+        the first bytes go out before the first upstream request finishes.
+    """
+    query = request.args.get('query', '').strip()
+    category = request.args.get('category', 'all')
+    fmt = request.args.get('format', 'jsonl').lower()
+    
+    if not query:
+        return jsonify({
+            "status": "error",
+            "message": "Query parameter is required"
+        }), 400
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({
+            "status": "error",
+            "message": f"Unsupported format '{fmt}' (use one of: {', '.join(EXPORT_FORMATS)})"
+        }), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 1000)), EXPORT_MAX_RESULTS))
+    except ValueError:
+        return jsonify({
+            "status": "error",
+            "message": "limit must be an integer"
+        }), 400
+    
+    def on_error(error):
+        return export_error_trailer(fmt, error)
+    
+    logger.info(f"Exporting up to {limit} papers for: {query} ({fmt})")
+    pages = iter_arxiv_papers(query, category, limit=limit)
+    mimetype, extension, _, _ = EXPORT_FORMATS[fmt]
+    filename = re.sub(r'[^A-Za-z0-9_-]+', '_', query)[:50] or 'export'
+    
+    return Response(
+        stream_with_context(stream_export(pages, fmt, {"query": query}, on_error=on_error)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename="researchforge_{filename}.{extension}"',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
+
+@app.route('/api/bulk/drafts', methods=['POST'])
+def bulk_drafts():
+    """
+    API endpoint for bulk mail merge of emails or proposals.
+    
+    Request JSON:
+        {
+            "kind": "email",              # or "proposal"
+            "template": "optional template with {field} placeholders",
+            "personalize": false,
+            "records": [{"recipient_name": "Dr. Lee", "project_title": "..."}, ...]
+        }
+    
+    Or, for constant memory on very large batches, an application/x-ndjson
+    body whose first line is the header object (kind/template/personalize)
+    and every following line is one record.
+    
+    Returns:
+        Streamed NDJSON: one result per record, in input order, then a final
+        {"status": "done", ...} summary line
+    """
+    try:
+        if request.mimetype == 'application/x-ndjson':
+            lines = iter(request.stream.readline, b'')
+            header = json.loads(next(lines, b'{}') or b'{}')
+            records = _iter_ndjson_records(lines)
+        else:
+            header = request.get_json() or {}
+            records = header.get('records') or []
+        
+        kind = header.get('kind', 'email')
+        template = header.get('template')
+        personalize = personalize_draft if header.get('personalize') else None
+        
+        # Templates are compiled here, so bad kind/template is a proper 400
+        results = iter_merge(
+            kind,
+            records,
+            template=template,
+            personalize=personalize,
+            batch_size=PERSONALIZE_BATCH_SIZE,
+            concurrency=PERSONALIZE_CONCURRENCY
+        )
+        
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid bulk request: {str(e)}"
+        }), 400
+    
+    def generate():
+        total = errors = 0
+        for result in results:
+            total += 1
+            if result["status"] != "success":
+                errors += 1
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        yield json.dumps({"status": "done", "total": total, "errors": errors}) + "\n"
+    
+    logger.info(f"Bulk {kind} merge started (personalize={bool(personalize)})")
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no'}
+    )
+
+
+def _iter_ndjson_records(lines):
+    """Parse NDJSON record lines lazily; bad lines become error records."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Submit a background job.
+    
+    Request JSON:
+        {
+            "kind": "proposal",           # or "bulk_drafts", "export"
+            "params": {...},              # as for the matching endpoint
+            "priority": "high"            # optional: high/normal/low or 0-9
+        }
+    
+    Returns:
+        202 with the job snapshot; poll /api/jobs/<id>, follow
+        /api/jobs/<id>/events, then fetch /api/jobs/<id>/result
+    """
+    data = request.get_json(silent=True) or {}
+    kind = data.get('kind', '')
+    params = data.get('params') or {}
+    try:
+        if not isinstance(params, dict):
+            raise ValueError("'params' must be an object")
+        validate_job_params(kind, params)
+        job = job_manager.submit(kind, params, priority=data.get('priority'))
+    except (ValueError, TypeError) as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Invalid job: {str(e)}"
+        }), 400
+    except QueueFull as e:
+        return jsonify({
+            "status": "error",
+            "message": f"Job queue is full ({str(e)}). Please try again later."
+        }), 429
+    
+    response = jsonify({"status": "success", "job": job})
+    response.status_code = 202
+    response.headers['Location'] = f"/api/jobs/{job['id']}"
+    return response
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status, progress and (once finished) its small result."""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Job not found"
+        }), 404
+    response = jsonify({"status": "success", "job": job})
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job that has not started yet."""
+    if not job_manager.cancel(job_id):
+        return jsonify({
+            "status": "error",
+            "message": "Job not found or already started"
+        }), 409
+    return jsonify({"status": "success", "job": job_manager.get(job_id)})
+
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream job snapshots as NDJSON, one line per change, until it finishes
+    or JOBS_STREAM_TIMEOUT_SECONDS pass. If the last snapshot is not in a
+    finished status, reconnect (or poll GET /api/jobs/<id>, the simpler
+    option for most clients).
+    """
+    if job_manager.get(job_id) is None:
+        return jsonify({
+            "status": "error",
+            "message": "Job not found"
+        }), 404
+    
+    def generate():
+        for snapshot in job_manager.watch(job_id, timeout=JOBS_STREAM_TIMEOUT_SECONDS):
+            yield json.dumps(snapshot) + "\n"
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-store'}
+    )
+
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    The finished job's output file, or its JSON result. Partial jobs (an
+    export cut short upstream) serve what they wrote, flagged by an
+    X-Job-Status: partial header.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            "status": "error",
+            "message": "Job not found"
+        }), 404
+    if job['status'] not in ('succeeded', 'partial'):
+        return jsonify({
+            "status": "error",
+            "message": f"Job is {job['status']}" + (f": {job['error']}" if job['error'] else ""),
+            "job": job
+        }), 409
+    
+    path = job_manager.output_file(job)
+    if path is not None:
+        response = send_file(path, as_attachment=True, download_name=f"researchforge_{job['kind']}_{job['output']}")
+    else:
+        response = jsonify({"status": "success", "result": job['result']})
+    response.headers['X-Job-Status'] = job['status']
+    return response
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest_papers():
+    """
+    Queue papers for full-text ingestion.
+    
+    Request JSON:
+        {
+            "papers": [{"arxiv_id": "2401.12345", "title": "..."}],
+            "arxiv_ids": ["2401.12345"]
+        }
+    
+    PDFs are always fetched from arxiv.org by ID; any pdf_url is ignored.
+    
+    Returns:
+        202 with the number of papers queued (already ingested ones are skipped)
+    """
+    data = request.get_json(silent=True) or {}
+    papers = list(data.get('papers') or [])
+    papers.extend({"arxiv_id": arxiv_id} for arxiv_id in data.get('arxiv_ids') or [])
+    if not papers or not all(isinstance(p, dict) for p in papers):
+        return jsonify({
+            "status": "error",
+            "message": "Provide 'papers' (objects with arxiv_id) or 'arxiv_ids'"
+        }), 400
+    
+    # Workers that do not own the store hand the papers to the one that does
+    queued = ingest_pipeline.request(papers)
+    if queued is None:
+        return jsonify({
+            "status": "error",
+            "message": "Full-text ingestion is not available on this server"
+        }), 503
+    
+    return jsonify({
+        "status": "success",
+        "queued": queued,
+        "pipeline": ingest_pipeline.stats()
+    }), 202
+
+
+@app.route('/api/papers/<path:arxiv_id>/passages', methods=['GET'])
+def paper_passages(arxiv_id):
+    """
+    Full-text passages of an ingested paper.
+    
+    Query parameters:
+        q: Optional text to rank passages against
+        k: Number of passages (default 3, max 20)
+    """
+    document = ingest_pipeline.store.document(arxiv_id)
+    if document is None or document['status'] != 'ok':
+        return jsonify({
+            "status": "error",
+            "message": f"Paper {arxiv_id} has not been ingested"
+        }), 404
+    try:
+        k = min(max(int(request.args.get('k', 3)), 1), 20)
+    except ValueError:
+        k = 3
+    
+    return jsonify({
+        "status": "success",
+        "arxiv_id": arxiv_id,
+        "passages": ingest_pipeline.store.passages(arxiv_id, request.args.get('q', ''), k)
+    })
+
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Runtime metrics (context cache usage and savings)."""
+    return jsonify({
+        "status": "success",
+        "context_cache": context_cache.metrics(),
+        "search_cache": search_cache.stats(),
+        "shared_cache": shared_cache.stats(),
+        "ingest": {**ingest_pipeline.stats(), "store": ingest_pipeline.store.stats()},
+        "jobs": job_manager.stats(),
+        "retry_budgets": {name: budget.stats() for name, budget in RETRY_BUDGETS.items()}
+    })
+
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint."""
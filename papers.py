@@ -0,0 +1,146 @@
+"""
+ResearchForge AI - Paper Records
+Compact, slots-based paper records and a fast JSON encoder for API responses.
+"""
+
+import json
+import sys
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional dependency, falls back to the stdlib encoder
+    orjson = None
+
+_intern = sys.intern
+
+
+class PaperRecord:
+    """
+    One arXiv paper.
+
+    Uses __slots__ instead of a per-instance dict, stores authors as a tuple
+    of interned strings (the same names recur across many results), and
+    derives pdf_url / web_url from arxiv_id on access instead of storing
+    them. Supports read-only mapping access (`paper['title']`,
+    `paper.get(...)`) so code written against the old paper dicts keeps
+    working.
+    """
+
+    __slots__ = ('title', 'authors', 'arxiv_id', 'published', 'abstract')
+
+    FIELDS = ('title', 'authors', 'arxiv_id', 'published', 'abstract', 'pdf_url', 'web_url')
+
+    def __init__(
+        self,
+        title: str,
+        authors: Iterable[str],
+        arxiv_id: str,
+        published: str,
+        abstract: str
+    ):
+        self.title = title
+        self.authors: Tuple[str, ...] = tuple(_intern(name) for name in authors)
+        self.arxiv_id = arxiv_id
+        self.published = _intern(published)
+        self.abstract = abstract
+
+    @property
+    def pdf_url(self) -> str:
+        return f"https://arxiv.org/pdf/{self.arxiv_id}"
+
+    @property
+    def web_url(self) -> str:
+        return f"https://arxiv.org/abs/{self.arxiv_id}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict in the public API shape."""
+        return {
+            'title': self.title,
+            'authors': list(self.authors),
+            'arxiv_id': self.arxiv_id,
+            'published': self.published,
+            'abstract': self.abstract,
+            'pdf_url': self.pdf_url,
+            'web_url': self.web_url,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PaperRecord':
+        return cls(
+            data.get('title', ''),
+            data.get('authors') or (),
+            data.get('arxiv_id', 'unknown'),
+            data.get('published', 'Unknown'),
+            data.get('abstract', ''),
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        return list(value) if key == 'authors' else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.FIELDS
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, PaperRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"PaperRecord(arxiv_id={self.arxiv_id!r}, title={self.title[:40]!r})"
+
+
+# ============================================================================
+# JSON
+# ============================================================================
+
+def json_default(obj: Any) -> Any:
+    """JSON fallback for types the encoders do not know natively."""
+    if isinstance(obj, PaperRecord):
+        return obj.to_dict()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(
+    obj: Any,
+    sort_keys: bool = False,
+    indent: Optional[int] = None,
+    default: Optional[Callable[[Any], Any]] = None
+) -> bytes:
+    """
+    Serialize to compact UTF-8 JSON bytes.
+
+    Uses orjson when installed (several times faster on large result sets),
+    otherwise the stdlib encoder. Both understand PaperRecord. A custom
+    `default` replaces json_default and also receives date/datetime values,
+    which orjson would otherwise write as ISO strings itself.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        return orjson.dumps(obj, default=default or json_default, option=option)
+    separators = None if indent else (',', ':')
+    return json.dumps(
+        obj,
+        default=default or json_default,
+        sort_keys=sort_keys,
+        indent=indent,
+        separators=separators,
+        ensure_ascii=False
+    ).encode('utf-8')
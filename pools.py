@@ -0,0 +1,103 @@
+"""
+ResearchForge AI - Process Pools
+Spawned process pools for CPU-bound and crash-prone work (PDF extraction,
+background jobs), replaced in place when one of their workers dies.
+"""
+
+import logging
+import threading
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional, Tuple
+
+# multiprocessing and concurrent.futures.process are imported on first use:
+# most web workers never start a pool, and they are slow to import.
+
+logger = logging.getLogger(__name__)
+
+
+def spawn_context():
+    """
+    Multiprocessing context for pools started from the web worker.
+
+    spawn, not fork: the parent is a multi-threaded web worker, and a
+    forked child would inherit its locks and sockets in whatever state
+    the other threads left them.
+    """
+    import multiprocessing
+    return multiprocessing.get_context('spawn')
+
+
+def spawn_pool(
+    max_workers: int,
+    initializer: Optional[Callable] = None,
+    initargs: Tuple[Any, ...] = (),
+    context=None
+) -> Executor:
+    """ProcessPoolExecutor whose workers are spawned (see spawn_context)."""
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=context or spawn_context(),
+        initializer=initializer,
+        initargs=initargs
+    )
+
+
+def is_broken_pool(error: BaseException) -> bool:
+    """True if a pool worker died (crash, os._exit, OOM kill) under this call."""
+    from concurrent.futures.process import BrokenProcessPool
+    return isinstance(error, BrokenProcessPool)
+
+
+class ReplaceablePool:
+    """
+    A process pool that is swapped for a fresh one when a worker dies.
+
+    A dead worker breaks a ProcessPoolExecutor for good: every pending and
+    future call fails with BrokenProcessPool. Callers remember which
+    executor ran a call and pass it to `replace()` when the call failed;
+    only the first failure per executor replaces it, so the burst of
+    failures from one crash costs one new pool.
+    """
+
+    def __init__(self, create: Callable[[], Executor], name: str = 'process'):
+        """
+        Args:
+            create: Builds a new executor (e.g. a spawn_pool() call)
+            name: Used in log messages
+        """
+        self.name = name
+        self.restarts = 0
+        self._create = create
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> Executor:
+        """The current executor, created on first use."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._create()
+            return self._executor
+
+    def replace(self, broken: Executor) -> bool:
+        """
+        Replace `broken` if it is still the current executor.
+
+        Returns:
+            True if this call replaced it, False if it was already replaced
+        """
+        with self._lock:
+            if self._executor is not broken:
+                return False
+            self._executor = self._create()
+            self.restarts += 1
+        broken.shutdown(wait=False)
+        logger.warning(f"A {self.name} pool worker died; replaced the process pool")
+        return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
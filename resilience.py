@@ -0,0 +1,247 @@
+"""
+ResearchForge AI - Upstream Resilience
+End-to-end request deadlines, retries with jittered exponential backoff,
+Retry-After handling and a global retry budget for arXiv and Gemini calls.
+"""
+
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# HTTP statuses worth retrying (throttling and transient server errors)
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's deadline leaves no time for an upstream call."""
+
+
+class Deadline:
+    """
+    Absolute point in time by which a request must finish.
+
+    Upstream calls use `timeout()` to size their own timeouts from what is
+    left, so one slow call cannot push the request past its deadline.
+    """
+
+    __slots__ = ('expires_at',)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, minimum: float = 0.05) -> float:
+        """
+        Timeout for the next upstream call: time remaining, capped at `cap`.
+
+        Raises:
+            DeadlineExceeded: If less than `minimum` seconds are left
+        """
+        remaining = self.remaining()
+        if remaining < minimum:
+            raise DeadlineExceeded("Request deadline exceeded")
+        return remaining if cap is None else min(cap, remaining)
+
+
+_current_deadline: contextvars.ContextVar = contextvars.ContextVar('deadline', default=None)
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """
+    Set the ambient deadline for the current request.
+
+    Nested scopes can only shorten the deadline, never extend it.
+    """
+    deadline = Deadline(seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """The ambient deadline set by deadline_scope(), if any."""
+    return _current_deadline.get()
+
+
+class RetryBudget:
+    """
+    Global cap on retries so they cannot amplify an upstream outage.
+
+    Every first attempt deposits `ratio` tokens and every retry spends one,
+    so retries stay below roughly `ratio` of traffic. `min_per_second`
+    tokens trickle in regardless, so low-traffic processes can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.rejected = 0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.requests += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take one retry token; False when the budget is exhausted."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "retries_rejected": self.rejected,
+                "tokens": round(self._tokens, 2),
+            }
+
+
+# One budget per upstream, shared by every request in the process. PDF
+# downloads by the ingest pipeline get their own so a burst of them cannot
+# use up the retries left for interactive arXiv searches.
+RETRY_BUDGETS = {
+    "arxiv": RetryBudget(),
+    "arxiv_pdf": RetryBudget(),
+    "gemini": RetryBudget(),
+}
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status carried by a requests or google.genai error, if any."""
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None)
+    return status if isinstance(status, int) else None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) from an error's response."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient network errors and throttling / 5xx responses."""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    status = error_status(error)
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+    # requests.ConnectionError / Timeout and httpx transport errors
+    name = type(error).__name__
+    return isinstance(error, (ConnectionError, TimeoutError)) or name in (
+        'ConnectionError', 'Timeout', 'ReadTimeout', 'ConnectTimeout',
+        'ChunkedEncodingError', 'ReadError', 'ConnectError', 'RemoteProtocolError',
+    )
+
+
+def call_with_retries(
+    fn: Callable[[float], T],
+    upstream: str,
+    deadline: Optional[Deadline] = None,
+    attempt_timeout: float = 10.0,
+    max_attempts: int = 4,
+    base_delay: float = 0.5,
+    max_delay: float = 8.0,
+    max_retry_after: float = 30.0,
+    retryable: Callable[[Exception], bool] = is_retryable
+) -> T:
+    """
+    Call `fn(timeout)` with retries, within the deadline and retry budget.
+
+    Each attempt gets a timeout of at most `attempt_timeout`, shortened to
+    the time left before the deadline (explicit or ambient). Failed
+    attempts are retried with full-jitter exponential backoff, or after the
+    upstream's Retry-After when given, but only if the sleep still fits
+    before the deadline and the upstream's retry budget has a token.
+    Without any deadline, a Retry-After longer than `max_retry_after`
+    fails the call instead of parking the thread.
+
+    Args:
+        fn: Callable taking the per-attempt timeout in seconds
+        upstream: Key into RETRY_BUDGETS ("arxiv", "arxiv_pdf", "gemini")
+        deadline: Request deadline (defaults to current_deadline())
+        max_retry_after: Longest Retry-After honored when there is no deadline
+
+    Raises:
+        The last upstream error, or DeadlineExceeded
+    """
+    deadline = deadline or current_deadline()
+    budget = RETRY_BUDGETS[upstream]
+    budget.record_request()
+
+    attempt = 0
+    while True:
+        timeout = deadline.timeout(attempt_timeout) if deadline else attempt_timeout
+        try:
+            return fn(timeout)
+        except Exception as error:
+            attempt += 1
+            if attempt >= max_attempts or not retryable(error):
+                raise
+
+            delay = retry_after_seconds(error)
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+            if deadline is not None and delay >= deadline.remaining() - 0.05:
+                logger.warning(f"{upstream}: no time left to retry after {error}")
+                raise
+            if deadline is None and delay > max_retry_after:
+                logger.warning(f"{upstream}: Retry-After {delay:.0f}s is too long, failing after {error}")
+                raise
+            if not budget.try_spend():
+                logger.warning(f"{upstream}: retry budget exhausted, failing fast")
+                raise
+
+            logger.info(f"{upstream}: attempt {attempt} failed ({error}), retrying in {delay:.2f}s")
+            time.sleep(delay)
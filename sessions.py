@@ -0,0 +1,362 @@
+"""
+ResearchForge AI - Chat Sessions
+Server-side conversation history keyed by session_id, bounded per session
+by a token budget and globally by LRU/TTL eviction.
+"""
+
+import itertools
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# A turn is {"role": "user" | "model", "text": "..."}
+Turn = Dict[str, str]
+
+# Rough chars-per-token ratio for Gemini models on English text
+CHARS_PER_TOKEN = 4
+
+# Share of the token budget reserved for the summary of dropped turns
+SUMMARY_BUDGET_RATIO = 0.1
+
+# Client-supplied session ids: UUIDs and similar opaque tokens only
+SESSION_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+
+def is_valid_session_id(value) -> bool:
+    """Check that a client-supplied session_id is a short opaque token."""
+    return isinstance(value, str) and SESSION_ID_PATTERN.fullmatch(value) is not None
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for history budgeting."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def summarize_turns(previous_summary: str, dropped: List[Turn], token_budget: int) -> str:
+    """
+    Fold dropped turns into a short extractive summary.
+
+    Keeps the first sentence of every dropped user message (what the user was
+    asking about), newest last, within the given token budget.
+
+    Args:
+        previous_summary: Summary produced by earlier truncations
+        dropped: Turns removed from the history, oldest first
+        token_budget: Maximum size of the resulting summary
+
+    Returns:
+        Summary text (may be empty)
+    """
+    topics = [t for t in previous_summary.split('\n- ')[1:]] if previous_summary else []
+    for turn in dropped:
+        if turn.get('role') != 'user':
+            continue
+        text = turn.get('text', '').strip().replace('\n', ' ')
+        topic = text.split('. ')[0][:200]
+        if topic:
+            topics.append(topic)
+
+    header = "Earlier in this conversation the user asked about:"
+    max_chars = token_budget * CHARS_PER_TOKEN
+    # Drop the oldest topics first until the summary fits
+    while topics:
+        summary = header + ''.join(f"\n- {topic}" for topic in topics)
+        if len(summary) <= max_chars:
+            return summary
+        topics.pop(0)
+    return ""
+
+
+def trim_history(
+    summary: str,
+    turns: List[Turn],
+    token_budget: int,
+    max_turns: int
+) -> Tuple[str, List[Turn]]:
+    """
+    Truncate a history to fit the turn limit and token budget.
+
+    Oldest turns are dropped first (in user/model pairs so the history never
+    starts with a model reply) and folded into the summary.
+
+    Returns:
+        Tuple of (summary, turns) within budget
+    """
+    summary_budget = int(token_budget * SUMMARY_BUDGET_RATIO)
+    history_budget = token_budget - summary_budget
+
+    total = sum(estimate_tokens(t['text']) for t in turns)
+    cut = 0
+    while cut < len(turns) and (len(turns) - cut > max_turns or total > history_budget):
+        # Always keep the newest exchange, even if it alone exceeds the budget
+        if len(turns) - cut <= 2:
+            break
+        step = 2 if cut + 1 < len(turns) and turns[cut + 1]['role'] == 'model' else 1
+        for turn in turns[cut:cut + step]:
+            total -= estimate_tokens(turn['text'])
+        cut += step
+
+    if cut == 0:
+        return summary, turns
+    return summarize_turns(summary, turns[:cut], summary_budget), turns[cut:]
+
+
+def conversation_turns(summary: str, turns: List[Turn], message: str) -> List[Turn]:
+    """
+    Turns to send to the model for a new message, strictly alternating.
+
+    The summary of dropped turns is not a turn of its own (that would put two
+    user turns in a row and read as something the user said); it is prefixed
+    to the first user turn as bracketed context.
+
+    Args:
+        summary: Summary of dropped turns (may be empty)
+        turns: Stored history, starting with a user turn
+        message: The new user message
+
+    Returns:
+        List of turns ending with the new user message
+    """
+    result = [dict(turn) for turn in turns] + [{"role": "user", "text": message}]
+    if summary:
+        first = result[0]
+        first["text"] = f"[Context from earlier in this conversation]\n{summary}\n\n{first['text']}"
+    return result
+
+
+# ============================================================================
+# STORES
+# ============================================================================
+
+class SessionStore:
+    """
+    Base class for chat session backends.
+
+    Subclasses implement _load/_save/delete; history trimming and the
+    read-modify-write of append() live here.
+    """
+
+    def __init__(
+        self,
+        token_budget: int = 4000,
+        max_turns: int = 20,
+        ttl_seconds: float = 3600,
+        max_sessions: int = 5000
+    ):
+        self.token_budget = token_budget
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+
+    def get(self, session_id: str) -> Tuple[str, List[Turn]]:
+        """
+        Return the (summary, turns) history for a session.
+
+        Unknown or expired sessions return an empty history.
+        """
+        return self._load(session_id) or ("", [])
+
+    def append(self, session_id: str, user_text: str, model_text: str) -> None:
+        """Record one user/model exchange and trim the session to budget."""
+        with self._transaction(session_id):
+            summary, turns = self._load(session_id) or ("", [])
+            turns = turns + [
+                {"role": "user", "text": user_text},
+                {"role": "model", "text": model_text},
+            ]
+            summary, turns = trim_history(summary, turns, self.token_budget, self.max_turns)
+            self._save(session_id, summary, turns)
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def _load(self, session_id: str) -> Optional[Tuple[str, List[Turn]]]:
+        raise NotImplementedError
+
+    def _save(self, session_id: str, summary: str, turns: List[Turn]) -> None:
+        raise NotImplementedError
+
+    def _transaction(self, session_id: str):
+        raise NotImplementedError
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local session store.
+
+    Sessions live in an OrderedDict kept in least-recently-used order, so
+    both LRU eviction and TTL expiry only ever look at the front of it.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.RLock()
+        self._sessions = OrderedDict()  # session_id -> (expires_at, summary, turns)
+
+    def _transaction(self, session_id: str):
+        return self._lock
+
+    def _load(self, session_id: str) -> Optional[Tuple[str, List[Turn]]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            expires_at, summary, turns = entry
+            if expires_at < time.monotonic():
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            return summary, turns
+
+    def _save(self, session_id: str, summary: str, turns: List[Turn]) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._sessions[session_id] = (now + self.ttl_seconds, summary, turns)
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            oldest_id, (expires_at, _, _) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and expires_at >= now:
+                break
+            del self._sessions[oldest_id]
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    On-disk session store shared by every worker on the same host.
+
+    Uses one connection per thread (and per process, so it is safe after
+    fork) with WAL journaling. Eviction runs every `evict_every` writes.
+    """
+
+    def __init__(self, path: str, evict_every: int = 100, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.evict_every = evict_every
+        self._local = threading.local()
+        # next() on a count is atomic, so concurrent saves never share a tick
+        self._writes = itertools.count(1)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                " session_id TEXT PRIMARY KEY,"
+                " summary TEXT NOT NULL,"
+                " turns TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS chat_sessions_updated_at"
+                " ON chat_sessions (updated_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _transaction(self, session_id: str):
+        return _ImmediateTransaction(self._connect())
+
+    def _load(self, session_id: str) -> Optional[Tuple[str, List[Turn]]]:
+        row = self._connect().execute(
+            "SELECT summary, turns, updated_at FROM chat_sessions WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+        if row is None or row[2] < time.time() - self.ttl_seconds:
+            return None
+        return row[0], json.loads(row[1])
+
+    def _save(self, session_id: str, summary: str, turns: List[Turn]) -> None:
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO chat_sessions (session_id, summary, turns, updated_at)"
+            " VALUES (?, ?, ?, ?)",
+            (session_id, summary, json.dumps(turns), time.time())
+        )
+        if next(self._writes) % self.evict_every == 0:
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "DELETE FROM chat_sessions WHERE updated_at < ?",
+            (time.time() - self.ttl_seconds,)
+        )
+        conn.execute(
+            "DELETE FROM chat_sessions WHERE session_id IN ("
+            " SELECT session_id FROM chat_sessions"
+            " ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+
+    def delete(self, session_id: str) -> None:
+        self._connect().execute(
+            "DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)
+        )
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+
+class _ImmediateTransaction:
+    """Context manager wrapping BEGIN IMMEDIATE ... COMMIT/ROLLBACK."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def create_session_store() -> SessionStore:
+    """
+    Build the session store configured by environment variables.
+
+    CHAT_SESSION_BACKEND: "memory" (default) or "sqlite"
+    CHAT_SESSION_DB: SQLite file path (default /tmp/researchforge_sessions.db)
+    CHAT_HISTORY_TOKEN_BUDGET, CHAT_HISTORY_MAX_TURNS,
+    CHAT_SESSION_TTL_SECONDS, CHAT_MAX_SESSIONS: limits
+    """
+    options = dict(
+        token_budget=int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', 4000)),
+        max_turns=int(os.environ.get('CHAT_HISTORY_MAX_TURNS', 20)),
+        ttl_seconds=float(os.environ.get('CHAT_SESSION_TTL_SECONDS', 3600)),
+        max_sessions=int(os.environ.get('CHAT_MAX_SESSIONS', 5000)),
+    )
+    backend = os.environ.get('CHAT_SESSION_BACKEND', 'memory').lower()
+    if backend == 'sqlite':
+        path = os.environ.get('CHAT_SESSION_DB', '/tmp/researchforge_sessions.db')
+        logger.info(f"Using SQLite chat session store at {path}")
+        return SQLiteSessionStore(path, **options)
+    if backend != 'memory':
+        logger.warning(f"Unknown CHAT_SESSION_BACKEND '{backend}', using in-memory store")
+    return InMemorySessionStore(**options)
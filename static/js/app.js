@@ -289,17 +289,13 @@ async function searchPapers() {
   resultsDiv.innerHTML = "";
 
   try {
-    const response = await fetch("/api/search", {
-      method: "POST",
-      headers: {
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
-        query: query,
-        category: category,
-        max_results: 10,
-      }),
+    // GET so the browser cache can revalidate repeat searches (ETag -> 304)
+    const params = new URLSearchParams({
+      query: query,
+      category: category,
+      max_results: 10,
     });
+    const response = await fetch(`/api/search?${params}`);
 
     const data = await response.json();
     loadingDiv.classList.add("hidden");
@@ -438,6 +434,36 @@ function showNotification(message, type = "info") {
   }, 5000);
 }
 
+// Search suggestions (typeahead)
+let suggestTimer = null;
+let suggestController = null;
+
+function fetchSuggestions(prefix) {
+  clearTimeout(suggestTimer);
+  if (prefix.trim().length < 2) return;
+
+  // Debounce keystrokes and cancel any in-flight request
+  suggestTimer = setTimeout(async () => {
+    if (suggestController) suggestController.abort();
+    suggestController = new AbortController();
+    try {
+      const response = await fetch(
+        `/api/suggest?${new URLSearchParams({ q: prefix })}`,
+        { signal: suggestController.signal }
+      );
+      const data = await response.json();
+      const datalist = document.getElementById("searchSuggestions");
+      datalist.innerHTML = (data.suggestions || [])
+        .map((s) => `<option value="${escapeHtml(s.text)}"></option>`)
+        .join("");
+    } catch (error) {
+      if (error.name !== "AbortError") {
+        console.error("Suggest error:", error);
+      }
+    }
+  }, 120);
+}
+
 // Initialize
 document.addEventListener("DOMContentLoaded", () => {
   console.log("✅ ResearchForge AI initialized");
@@ -457,6 +483,11 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   });
 
+  // Typeahead suggestions for search
+  document.getElementById("searchQuery").addEventListener("input", (e) => {
+    fetchSuggestions(e.target.value);
+  });
+
   // Smooth scroll
   document.documentElement.style.scrollBehavior = "smooth";
 });
@@ -0,0 +1,349 @@
+"""
+ResearchForge AI - Search Suggestions
+In-memory prefix index (sorted array + bisect) for typeahead, fed by past
+queries, paper titles and arXiv category names.
+"""
+
+import heapq
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Suggestion weights per source: a query someone typed counts for more than
+# a title that merely appeared in results
+QUERY_WEIGHT = 3.0
+TITLE_WEIGHT = 1.0
+CATEGORY_WEIGHT = 2.0
+
+ARXIV_CATEGORIES = {
+    'cs.AI': 'Artificial Intelligence',
+    'cs.CL': 'Computation and Language',
+    'cs.CV': 'Computer Vision and Pattern Recognition',
+    'cs.CR': 'Cryptography and Security',
+    'cs.DB': 'Databases',
+    'cs.DC': 'Distributed, Parallel, and Cluster Computing',
+    'cs.DS': 'Data Structures and Algorithms',
+    'cs.HC': 'Human-Computer Interaction',
+    'cs.IR': 'Information Retrieval',
+    'cs.LG': 'Machine Learning',
+    'cs.MA': 'Multiagent Systems',
+    'cs.NE': 'Neural and Evolutionary Computing',
+    'cs.RO': 'Robotics',
+    'cs.SE': 'Software Engineering',
+    'eess.AS': 'Audio and Speech Processing',
+    'eess.IV': 'Image and Video Processing',
+    'eess.SP': 'Signal Processing',
+    'math.OC': 'Optimization and Control',
+    'math.ST': 'Statistics Theory',
+    'physics.comp-ph': 'Computational Physics',
+    'q-bio.BM': 'Biomolecules',
+    'q-bio.NC': 'Neurons and Cognition',
+    'quant-ph': 'Quantum Physics',
+    'stat.ML': 'Machine Learning (Statistics)',
+}
+
+
+# Sorts after any character that appears in a key; key + _HIGH bounds a prefix range
+_HIGH = '\uffff'
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive index key."""
+    return ' '.join(text.lower().split())
+
+
+class _Snapshot(NamedTuple):
+    """Immutable, sorted view of the index; replaced wholesale on rebuild."""
+    keys: List[str]                       # sorted normalized terms
+    displays: List[str]                   # original text, parallel to keys
+    kinds: List[str]                      # "query" / "title" / "category"
+    weights: List[float]                  # parallel to keys
+    top: Dict[str, Tuple[int, ...]]       # broad prefix -> top indices
+
+
+class _Pending(NamedTuple):
+    """Entries added since the last rebuild (small; copied on write)."""
+    increments: Dict[str, float]          # key -> weight added since rebuild
+    entries: Dict[str, Tuple[str, str]]   # key -> (display, kind)
+
+
+class PrefixIndex:
+    """
+    Frequency-ranked prefix completion over a sorted array.
+
+    Readers never lock: they read the current immutable snapshot plus a
+    small pending dict, both swapped by reference. Writers add to the
+    pending dict (copy-on-write); once it reaches `rebuild_threshold`
+    entries, a background thread merges it into a new snapshot. Prefixes
+    matching more than `scan_limit` terms (up to `max_prefix_length`
+    characters) have their top-k precomputed at rebuild time, so lookups
+    stay bounded regardless of index size.
+    """
+
+    def __init__(
+        self,
+        k: int = 8,
+        rebuild_threshold: int = 256,
+        scan_limit: int = 512,
+        max_terms: int = 100000,
+        max_prefix_length: int = 64
+    ):
+        self.k = k
+        self.rebuild_threshold = rebuild_threshold
+        self.scan_limit = scan_limit
+        self.max_terms = max_terms
+        self.max_prefix_length = max_prefix_length
+
+        self._snapshot = _Snapshot([], [], [], [], {})
+        self._pending = _Pending({}, {})
+        self._write_lock = threading.Lock()
+        # Both guarded by _write_lock: at most one rebuild runs at a time, and
+        # a rebuild requested meanwhile is run by it once it finishes
+        self._rebuilding = False
+        self._rebuild_again = False
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add(self, text: str, weight: float = 1.0, kind: str = 'query') -> None:
+        """Record one occurrence of a term (no-op for blank/oversized text)."""
+        key = normalize(text)
+        if not key or len(key) > 200:
+            return
+        with self._write_lock:
+            pending = self._pending
+            increments = dict(pending.increments)
+            entries = dict(pending.entries)
+            increments[key] = increments.get(key, 0.0) + weight
+            if key not in entries or kind == 'query':
+                entries[key] = (' '.join(text.split()), kind)
+            self._pending = _Pending(increments, entries)
+            start = len(increments) >= self.rebuild_threshold and not self._rebuilding
+            if start:
+                self._rebuilding = True
+        if start:
+            threading.Thread(target=self._run_rebuilds, name="suggest-rebuild", daemon=True).start()
+
+    def add_many(self, items: List[Tuple[str, float, str]]) -> None:
+        """
+        Bulk add (text, weight, kind) items and rebuild.
+
+        The rebuild runs synchronously unless one is already running, in
+        which case that one merges these items too before it finishes.
+        """
+        with self._write_lock:
+            increments = dict(self._pending.increments)
+            entries = dict(self._pending.entries)
+            for text, weight, kind in items:
+                key = normalize(text)
+                if not key or len(key) > 200:
+                    continue
+                increments[key] = increments.get(key, 0.0) + weight
+                if key not in entries or kind == 'query':
+                    entries[key] = (' '.join(text.split()), kind)
+            self._pending = _Pending(increments, entries)
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        """Merge pending entries into a new snapshot, or have the running rebuild do it."""
+        with self._write_lock:
+            if self._rebuilding:
+                self._rebuild_again = True
+                return
+            self._rebuilding = True
+        self._run_rebuilds()
+
+    def _run_rebuilds(self) -> None:
+        """Rebuild until no further rebuild was requested; caller set _rebuilding."""
+        try:
+            while self._merge_pending():
+                pass
+        except BaseException:
+            with self._write_lock:
+                self._rebuilding = self._rebuild_again = False
+            raise
+
+    def _merge_pending(self) -> bool:
+        """One rebuild pass. Returns True if another pass was requested meanwhile."""
+        consumed = self._pending
+        snapshot = self._snapshot
+        merged: Dict[str, List] = {
+            key: [snapshot.displays[i], snapshot.kinds[i], snapshot.weights[i]]
+            for i, key in enumerate(snapshot.keys)
+        }
+        for key, increment in consumed.increments.items():
+            display, kind = consumed.entries[key]
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = [display, kind, increment]
+            else:
+                entry[2] += increment
+                if kind == 'query':
+                    entry[0], entry[1] = display, kind
+
+        if len(merged) > self.max_terms:
+            keep = heapq.nlargest(self.max_terms, merged.items(), key=lambda item: item[1][2])
+            merged = dict(keep)
+
+        keys = sorted(merged)
+        displays = [merged[key][0] for key in keys]
+        kinds = [merged[key][1] for key in keys]
+        weights = [merged[key][2] for key in keys]
+        new_snapshot = _Snapshot(keys, displays, kinds, weights, self._precompute(keys, weights))
+
+        with self._write_lock:
+            # Keep only what was added while we were rebuilding
+            current = self._pending
+            increments = {}
+            entries = {}
+            for key, value in current.increments.items():
+                remaining = value - consumed.increments.get(key, 0.0)
+                if remaining > 0:
+                    increments[key] = remaining
+                    entries[key] = current.entries[key]
+            self._snapshot = new_snapshot
+            self._pending = _Pending(increments, entries)
+            again, self._rebuild_again = self._rebuild_again, False
+            if not again:
+                self._rebuilding = False
+        logger.debug(f"Suggestion index rebuilt: {len(keys)} terms")
+        return again
+
+    def _precompute(self, keys: List[str], weights: List[float]) -> Dict[str, Tuple[int, ...]]:
+        """
+        Top-k indices for every prefix that matches more than scan_limit terms.
+
+        Works level by level, only descending into ranges that were still too
+        large at the previous prefix length.
+        """
+        top: Dict[str, Tuple[int, ...]] = {}
+        ranges = [(0, len(keys))]
+        length = 1
+        while ranges and length <= self.max_prefix_length:
+            next_ranges = []
+            for lo, hi in ranges:
+                start = lo
+                while start < hi:
+                    prefix = keys[start][:length]
+                    if len(prefix) < length:
+                        # Key shorter than this level; its extensions follow it
+                        start += 1
+                        continue
+                    end = bisect_left(keys, prefix + _HIGH, start, hi)
+                    if end - start > self.scan_limit:
+                        top[prefix] = tuple(heapq.nlargest(
+                            self.k * 2, range(start, end), key=weights.__getitem__
+                        ))
+                        next_ranges.append((start, end))
+                    start = end
+            ranges = next_ranges
+            length += 1
+        return top
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def suggest(self, prefix: str, k: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Top-k completions for a prefix, highest weight first.
+
+        Returns:
+            List of {"text": ..., "type": ...}
+        """
+        k = min(k or self.k, self.k * 2)
+        key = normalize(prefix)
+        if not key:
+            return []
+        # Keep the trailing space so "graph " only completes whole words
+        if prefix[-1:].isspace():
+            key += ' '
+
+        snapshot = self._snapshot
+        pending = self._pending
+        candidates: Dict[str, Tuple[float, str, str]] = {}
+
+        keys = snapshot.keys
+        start = bisect_left(keys, key)
+        end = bisect_left(keys, key + _HIGH, start)
+        if end - start > self.scan_limit and key in snapshot.top:
+            indices = snapshot.top[key]
+        else:
+            indices = range(start, end)
+        for i in indices:
+            candidates[keys[i]] = (snapshot.weights[i], snapshot.displays[i], snapshot.kinds[i])
+
+        for pkey, increment in pending.increments.items():
+            if not pkey.startswith(key):
+                continue
+            display, kind = pending.entries[pkey]
+            existing = candidates.get(pkey)
+            if existing is None:
+                i = bisect_left(keys, pkey)
+                base = snapshot.weights[i] if i < len(keys) and keys[i] == pkey else 0.0
+                candidates[pkey] = (base + increment, display, kind)
+            else:
+                candidates[pkey] = (existing[0] + increment, existing[1], existing[2])
+
+        best = heapq.nlargest(k, candidates.values(), key=lambda c: c[0])
+        return [{"text": display, "type": kind} for _, display, kind in best]
+
+    def __len__(self) -> int:
+        return len(self._snapshot.keys) + len(self._pending.increments)
+
+
+class QueryGate:
+    """
+    Holds typed queries back from the shared index until they are common.
+
+    A raw query can contain personal data, so it is only published to
+    everyone's typeahead once `min_sources` distinct clients have searched
+    it; from then on every occurrence counts. Sources are kept only as
+    in-process hashes, and at most `max_tracked` pending queries are
+    remembered (oldest forgotten first).
+    """
+
+    def __init__(self, index: PrefixIndex, min_sources: int = 3, max_tracked: int = 50000):
+        self.index = index
+        self.min_sources = max(1, min_sources)
+        self.max_tracked = max_tracked
+        self._lock = threading.Lock()
+        self._pending: Dict[str, set] = {}     # key -> source hashes (insertion-ordered)
+        self._published: Dict[str, None] = {}  # keys already in the index
+
+    def observe(self, text: str, source: str) -> None:
+        """Record that `source` searched `text`; publish once it is common enough."""
+        key = normalize(text)
+        if not key or len(key) > 200:
+            return
+        with self._lock:
+            if key in self._published:
+                occurrences = 1
+            else:
+                sources = self._pending.pop(key, set())
+                sources.add(hash(source))
+                if len(sources) < self.min_sources:
+                    self._pending[key] = sources
+                    while len(self._pending) > self.max_tracked:
+                        del self._pending[next(iter(self._pending))]
+                    return
+                occurrences = len(sources)
+                self._published[key] = None
+                while len(self._published) > self.max_tracked:
+                    del self._published[next(iter(self._published))]
+        self.index.add(text, QUERY_WEIGHT * occurrences, 'query')
+
+
+def create_suggest_index() -> PrefixIndex:
+    """Build an index seeded with arXiv category codes and names."""
+    index = PrefixIndex()
+    seed = []
+    for code, name in ARXIV_CATEGORIES.items():
+        seed.append((name, CATEGORY_WEIGHT, 'category'))
+        seed.append((code, CATEGORY_WEIGHT, 'category'))
+    index.add_many(seed)
+    return index
@@ -0,0 +1,11 @@
+"""
+ResearchForge AI - Test configuration
+The application modules live at the repository root; make them importable.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,18 @@
+"""
+ResearchForge AI - Stand-in extractors for the ingestion pipeline tests
+Imported by name in the extraction pool processes, like ingest.extract_chunks.
+"""
+
+import os
+
+
+def extract(path):
+    """Crash on crash-always-* files, and on the first try of crash-once-* files."""
+    name = os.path.basename(path)
+    if name.startswith('crash-always'):
+        os._exit(1)
+    if name.startswith('crash-once') and not os.path.exists(path + '.crashed'):
+        open(path + '.crashed', 'w').close()
+        os._exit(1)
+    os.remove(path)
+    return [f"text of {name}"]
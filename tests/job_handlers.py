@@ -0,0 +1,33 @@
+"""
+ResearchForge AI - Job handlers for the job manager tests
+Imported by name in the job pool processes, like main.py's handlers.
+"""
+
+import os
+import time
+
+
+def timed(params, job):
+    """Sleep for a while and report when it ran."""
+    started = time.time()
+    time.sleep(params.get('seconds', 0.2))
+    return {"name": params['name'], "started": started, "ended": time.time()}
+
+
+def crash_once(params, job):
+    """Kill the worker process on the first attempt, succeed on the next."""
+    marker = params['marker']
+    if not os.path.exists(marker):
+        open(marker, 'w').close()
+        os._exit(1)
+    return {"name": params['name']}
+
+
+def crash(params, job):
+    os._exit(1)
+
+
+def partial(params, job):
+    with open(job.output_path('jsonl'), 'w', encoding='utf-8') as out:
+        out.write('{"title": "first page only"}\n')
+    return {"status": "partial", "papers": 1, "message": "arXiv went away"}
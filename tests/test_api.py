@@ -0,0 +1,58 @@
+"""
+ResearchForge AI - API input validation tests
+"""
+
+import pytest
+
+import main
+from cache import LocalCache
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Record advanced_arxiv_search calls instead of querying arXiv."""
+    calls = []
+
+    def search(query, category, max_results):
+        calls.append(max_results)
+        return {"status": "success", "query": query, "papers": [], "count": 0}
+
+    monkeypatch.setattr(main, 'advanced_arxiv_search', search)
+    monkeypatch.setattr(main, 'search_cache', LocalCache())
+    return calls
+
+
+@pytest.fixture
+def client():
+    return main.app.test_client()
+
+
+@pytest.mark.parametrize("value", ["ten", "", [5], {"n": 5}])
+def test_search_rejects_non_integer_max_results(client, searches, value):
+    response = client.post('/api/search', json={"query": "graphs", "max_results": value})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    assert searches == []
+
+
+@pytest.mark.parametrize("value,expected", [
+    (None, 10),
+    (25, 25),
+    ("40", 40),
+    (0, 1),
+    (-5, 1),
+    (10 ** 9, main.SEARCH_MAX_RESULTS),
+])
+def test_search_clamps_max_results(client, searches, value, expected):
+    body = {"query": f"graphs {value}"}
+    if value is not None:
+        body["max_results"] = value
+    assert client.post('/api/search', json=body).status_code == 200
+    assert searches == [expected]
+
+
+def test_search_get_uses_query_string(client, searches):
+    assert client.get('/api/search?query=graphs&max_results=500').status_code == 200
+    assert searches == [main.SEARCH_MAX_RESULTS]
+    assert client.get('/api/search?query=graphs&max_results=abc').status_code == 400
+
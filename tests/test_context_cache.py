@@ -0,0 +1,158 @@
+"""
+ResearchForge AI - Context cache tests
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cache import LocalCache
+from context_cache import ContextCacheManager
+
+
+class APIError(Exception):
+    """Stands in for google.genai.errors.APIError (status in `code`)."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class Caches:
+    def __init__(self):
+        self.created = []
+        self.deleted = []
+        self.fail_with = None
+
+    def create(self, model, config):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.created.append(config)
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def update(self, name, config):
+        pass
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+class Models:
+    def __init__(self):
+        self.calls = []
+
+    def generate_content(self, model, contents, config):
+        self.calls.append(config)
+        return SimpleNamespace(usage_metadata=None, text="ok")
+
+
+class Types:
+    CreateCachedContentConfig = staticmethod(dict)
+    GenerateContentConfig = staticmethod(dict)
+    UpdateCachedContentConfig = staticmethod(dict)
+
+
+def content(role, text):
+    return SimpleNamespace(role=role, parts=[SimpleNamespace(text=text)])
+
+
+# ~1100 tokens of history, above min_tokens=1024 with the system prompt
+HISTORY = [content("user", "a" * 2200), content("model", "b" * 2200)]
+SYSTEM = "You are a research assistant. " * 10
+
+
+@pytest.fixture
+def client():
+    return SimpleNamespace(caches=Caches(), models=Models())
+
+
+def chat(manager, client, history, message="next question", session_id="s1"):
+    return manager.generate(
+        client, Types, "gemini-test", SYSTEM, history + [content("user", message)],
+        session_id=session_id
+    )
+
+
+def test_short_prompts_are_not_cached(client):
+    manager = ContextCacheManager(min_tokens=1024)
+    chat(manager, client, [content("user", "hi"), content("model", "hello")])
+    assert client.caches.created == []
+    assert client.models.calls[-1]["system_instruction"] == SYSTEM
+
+
+def test_session_cache_is_created_then_reused(client):
+    manager = ContextCacheManager(min_tokens=1024, session_min_tokens=1024)
+    chat(manager, client, HISTORY)
+    assert len(client.caches.created) == 1
+    assert client.models.calls[-1]["cached_content"] == "cachedContents/1"
+
+    # A short new exchange stays below session_min_tokens: same handle
+    longer = HISTORY + [content("user", "next question"), content("model", "short answer")]
+    chat(manager, client, longer, message="third")
+    assert len(client.caches.created) == 1
+    assert client.models.calls[-1]["cached_content"] == "cachedContents/1"
+    assert manager.metrics()["cache_hits"] == 2
+
+
+def test_expired_session_handle_is_replaced(client):
+    manager = ContextCacheManager(min_tokens=1024)
+    chat(manager, client, HISTORY)
+    manager._sessions[("gemini-test", "s1")]['expires_at'] = 0
+    chat(manager, client, HISTORY)
+    assert len(client.caches.created) == 2
+    assert client.caches.deleted == ["cachedContents/1"]
+    assert client.models.calls[-1]["cached_content"] == "cachedContents/2"
+
+
+def test_static_handle_is_shared_across_workers(client):
+    shared = LocalCache()
+    long_system = "x" * 8000
+    workers = [ContextCacheManager(min_tokens=1024, shared=shared) for _ in range(2)]
+    for manager in workers:
+        manager.generate(client, Types, "gemini-test", long_system, [content("user", "hi")])
+    assert len(client.caches.created) == 1
+    assert [call["cached_content"] for call in client.models.calls] == ["cachedContents/1"] * 2
+
+
+def test_unsupported_model_falls_back_and_backs_off(client):
+    shared = LocalCache()
+    manager = ContextCacheManager(min_tokens=1024, shared=shared)
+    client.caches.fail_with = APIError(400, "Model gemini-test is not supported for caching")
+    chat(manager, client, HISTORY)
+    assert "system_instruction" in client.models.calls[-1]
+    assert manager._is_unsupported("gemini-test", 'session')
+    # Published, so other workers skip caches.create for this model too
+    assert shared.get("unsupported:gemini-test:session") is not None
+
+    client.caches.fail_with = None
+    chat(manager, client, HISTORY)
+    assert client.caches.created == []
+
+
+@pytest.mark.parametrize("error", [
+    APIError(429, "Resource exhausted"),
+    APIError(503, "Service unavailable"),
+    TimeoutError("timed out"),
+    APIError(400, "Cached content is too small"),
+], ids=['429', '503', 'timeout', 'too-small'])
+def test_transient_create_errors_back_off_briefly(client, error):
+    shared = LocalCache()
+    manager = ContextCacheManager(min_tokens=1024, error_backoff_seconds=60, shared=shared)
+    client.caches.fail_with = error
+    chat(manager, client, HISTORY)
+    assert "system_instruction" in client.models.calls[-1]
+    assert 0 < manager._unsupported[("gemini-test", 'session')] - time.monotonic() <= 60
+    assert shared.get("unsupported:gemini-test:session") is None
+
+    # Once the brief backoff is over, caching is tried again
+    manager._unsupported.clear()
+    client.caches.fail_with = None
+    chat(manager, client, HISTORY)
+    assert len(client.caches.created) == 1
+
+
+def test_eligibility_with_default_minimum():
+    manager = ContextCacheManager()
+    report = manager.eligibility(SYSTEM, max_history_tokens=4000)
+    assert report == {"min_tokens": 1024, "system_tokens": 75, "static": False, "session": True}
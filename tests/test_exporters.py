@@ -0,0 +1,134 @@
+"""
+ResearchForge AI - Streaming export tests
+"""
+
+import csv
+import io
+import json
+import threading
+import time
+
+import pytest
+
+from exporters import export_error_trailer, prefetch, stream_export
+from papers import PaperRecord
+
+PAPERS = [
+    {
+        "arxiv_id": "2401.00001v2", "title": "Graphs & {Networks}", "authors": ["Ada Lovelace", "Alan Turing"],
+        "published": "2024-01-02", "abstract": "Costs 5% less", "pdf_url": "https://arxiv.org/pdf/2401.00001v2",
+        "web_url": "https://arxiv.org/abs/2401.00001v2",
+    },
+    {
+        "arxiv_id": "2401.00002", "title": "Commas, \"quotes\"", "authors": ["Grace Hopper"],
+        "published": "2024-01-03", "abstract": "Line one\nline two", "pdf_url": "", "web_url": "",
+    },
+]
+
+
+def export(pages, fmt, **kwargs):
+    return ''.join(stream_export(pages, fmt, meta={"query": "graphs"}, **kwargs))
+
+
+def failing_pages(error):
+    yield PAPERS[:1]
+    raise error
+
+
+# ============================================================================
+# Formats
+# ============================================================================
+
+def test_jsonl_round_trips():
+    text = export([PAPERS[:1], PAPERS[1:]], 'jsonl')
+    assert [json.loads(line) for line in text.splitlines()] == PAPERS
+
+
+def test_csv_has_header_and_quoted_rows():
+    text = export([PAPERS], 'csv')
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert [row['arxiv_id'] for row in rows] == ['2401.00001v2', '2401.00002']
+    assert rows[0]['authors'] == 'Ada Lovelace; Alan Turing'
+    assert rows[1]['title'] == 'Commas, "quotes"'
+    assert rows[1]['abstract'] == 'Line one\nline two'
+
+
+def test_bibtex_escapes_and_keys():
+    text = export([PAPERS], 'bibtex')
+    assert text.startswith("% ResearchForge AI export: graphs\n")
+    assert "@article{Lovelace2024240100001," in text
+    assert "title = {Graphs \\& \\{Networks\\}}" in text
+    assert "abstract = {Costs 5\\% less}" in text
+    assert "author = {Ada Lovelace and Alan Turing}" in text
+    assert text.count("@article{") == 2
+
+
+def test_paper_records_export_like_dicts():
+    records = [PaperRecord.from_dict(PAPERS[0])]
+    assert json.loads(export([records], 'jsonl')) == PAPERS[0]
+    for fmt in ('csv', 'bibtex'):
+        assert export([records], fmt) == export([PAPERS[:1]], fmt)
+
+
+def test_unknown_format_fails_before_streaming():
+    with pytest.raises(ValueError):
+        stream_export([PAPERS], 'xml')
+
+
+# ============================================================================
+# Errors mid-stream
+# ============================================================================
+
+@pytest.mark.parametrize("fmt", ['jsonl', 'csv', 'bibtex'])
+def test_upstream_error_ends_with_trailer(fmt):
+    error = RuntimeError("arXiv returned 503")
+    text = export(failing_pages(error), fmt, on_error=lambda e: export_error_trailer(fmt, e))
+    assert text.endswith(export_error_trailer(fmt, error))
+    assert "2401.00001" in text
+
+
+def test_jsonl_trailer_is_a_json_line():
+    trailer = export_error_trailer('jsonl', RuntimeError("boom"))
+    assert json.loads(trailer) == {"status": "error", "message": "Export incomplete: boom"}
+    assert export_error_trailer('csv', RuntimeError("boom")) == "# Export incomplete: boom\n"
+    assert export_error_trailer('bibtex', RuntimeError("boom")) == "% Export incomplete: boom\n"
+
+
+def test_error_without_handler_just_stops():
+    text = export(failing_pages(RuntimeError("x")), 'jsonl')
+    assert len(text.splitlines()) == 1
+
+
+# ============================================================================
+# prefetch
+# ============================================================================
+
+def test_prefetch_yields_pages_in_order():
+    assert list(prefetch(iter([[1], [2], [3]]))) == [[1], [2], [3]]
+
+
+def test_prefetch_reraises_producer_errors():
+    pages = prefetch(failing_pages(ValueError("bad page")))
+    assert next(pages) == PAPERS[:1]
+    with pytest.raises(ValueError):
+        next(pages)
+
+
+def test_closing_the_generator_stops_the_producer():
+    fetched = []
+
+    def pages():
+        for i in range(1000):
+            fetched.append(i)
+            yield [i]
+
+    stream = prefetch(pages(), max_pages=1)
+    assert next(stream) == [0]
+    stream.close()
+    # The producer notices the stop within its put timeout and exits
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(t.name == "export-prefetch" for t in threading.enumerate()):
+        time.sleep(0.05)
+    assert not any(t.name == "export-prefetch" for t in threading.enumerate())
+    # Bounded read-ahead: only the page in hand, one queued and one blocked
+    assert len(fetched) <= 3
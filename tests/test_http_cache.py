@@ -0,0 +1,147 @@
+"""
+ResearchForge AI - HTTP caching and compression tests
+"""
+
+import gzip
+import os
+
+import pytest
+from flask import Flask, Response, jsonify
+
+import http_cache
+
+BIG = {"papers": [{"title": f"Paper {i}", "abstract": "text " * 20} for i in range(50)]}
+SMALL = {"status": "ok"}
+
+
+@pytest.fixture
+def client(tmp_path):
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "app.js").write_text("console.log('researchforge');\n" * 200)
+    (static / "logo.png").write_bytes(b'\x89PNG' + b'\0' * 100)
+
+    app = Flask(__name__, static_folder=str(static))
+    http_cache.init_app(app)
+
+    @app.route('/big')
+    def big():
+        return jsonify(BIG)
+
+    @app.route('/small')
+    def small():
+        return jsonify(SMALL)
+
+    @app.route('/stream')
+    def stream():
+        return Response((chunk for chunk in ["a" * 2000]), mimetype='text/plain')
+
+    @app.route('/post', methods=['POST'])
+    def post():
+        return jsonify(BIG)
+
+    http_cache._compressed.clear()
+    return app.test_client()
+
+
+# ============================================================================
+# Dynamic responses
+# ============================================================================
+
+def test_etag_and_revalidation_without_compression(client):
+    response = client.get('/big')
+    etag = response.headers['ETag']
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert client.get('/big').headers['ETag'] == etag
+
+    not_modified = client.get('/big', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304
+    assert not_modified.data == b''
+    assert not_modified.headers['ETag'] == etag
+    assert 'Accept-Encoding' in not_modified.headers['Vary']
+
+
+@pytest.mark.parametrize("encoding,suffix", [('gzip', '-gz'), ('br', '-br')])
+def test_compressed_responses_get_their_own_etag(client, encoding, suffix):
+    if encoding == 'br' and http_cache.brotli is None:
+        pytest.skip("brotli not installed")
+    plain = client.get('/big')
+    response = client.get('/big', headers={'Accept-Encoding': encoding})
+    assert response.headers['Content-Encoding'] == encoding
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + suffix + '"'
+    if encoding == 'gzip':
+        assert gzip.decompress(response.data) == plain.data
+    else:
+        assert http_cache.brotli.decompress(response.data) == plain.data
+
+    # The suffixed ETag revalidates, as does the plain one, in any encoding
+    for etag in (response.headers['ETag'], plain.headers['ETag']):
+        for accept in (encoding, 'identity'):
+            revalidated = client.get('/big', headers={'If-None-Match': etag, 'Accept-Encoding': accept})
+            assert revalidated.status_code == 304
+    assert client.get('/big', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+    assert len(response.data) < http_cache.COMPRESS_MIN_BYTES
+    assert 'Content-Encoding' not in response.headers
+    assert not response.headers['ETag'].endswith('-gz"')
+
+
+def test_streams_and_other_methods_are_left_alone(client):
+    streamed = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert 'ETag' not in streamed.headers
+    assert 'Content-Encoding' not in streamed.headers
+    posted = client.post('/post', headers={'Accept-Encoding': 'gzip'})
+    assert 'ETag' not in posted.headers
+    assert 'Content-Encoding' not in posted.headers
+
+
+def test_br_preferred_over_gzip(client):
+    if http_cache.brotli is None:
+        pytest.skip("brotli not installed")
+    response = client.get('/big', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+
+
+# ============================================================================
+# Static files
+# ============================================================================
+
+def test_versioned_static_is_immutable(client):
+    url = http_cache.static_url(client.application, 'app.js')
+    assert '?v=' in url
+    response = client.get(url)
+    cache_control = response.headers['Cache-Control']
+    assert 'immutable' in cache_control and 'public' in cache_control
+    assert f"max-age={http_cache.STATIC_IMMUTABLE_MAX_AGE}" in cache_control
+
+    unversioned = client.get('/static/app.js')
+    assert 'immutable' not in unversioned.headers['Cache-Control']
+    assert f"max-age={http_cache.STATIC_DEFAULT_MAX_AGE}" in unversioned.headers['Cache-Control']
+
+
+def test_precompressed_variant_is_served(client):
+    static = client.application.static_folder
+    assert http_cache.precompress_static(static) >= 1
+    original = open(os.path.join(static, 'app.js'), 'rb').read()
+
+    response = client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert response.mimetype in ('text/javascript', 'application/javascript')
+    assert gzip.decompress(response.data) == original
+
+    plain = client.get('/static/app.js')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.data == original
+    # send_file's validators still give 304s
+    assert client.get('/static/app.js', headers={'If-None-Match': plain.headers['ETag']}).status_code == 304
+
+
+def test_missing_static_and_traversal_are_404(client):
+    assert client.get('/static/missing.js').status_code == 404
+    assert client.get('/static/../secret.txt').status_code == 404
@@ -0,0 +1,267 @@
+"""
+ResearchForge AI - Full-text ingestion tests
+"""
+
+import os
+import struct
+import threading
+
+import pytest
+
+import ingest
+import ingest_workers
+from ingest import ChunkStore, IngestPipeline, chunk_text, is_arxiv_id, paper_key
+
+
+def writer(directory):
+    store = ChunkStore(str(directory))
+    assert store.open_for_writing()
+    return store
+
+
+def crash(store):
+    """Simulate the writer process dying: its flock goes away with it."""
+    store._lock_file.close()
+    store._lock_file = None
+
+
+# ============================================================================
+# ChunkStore
+# ============================================================================
+
+def test_append_and_read_back(tmp_path):
+    store = writer(tmp_path)
+    store.append('2401.00001v2', 'First', ['alpha chunk', 'beta chunk'])
+    store.append('2401.00002', 'Skipped', [], status='failed')
+
+    assert store.chunks('2401.00001') == ['alpha chunk', 'beta chunk']
+    assert store.document('2401.00001v3')['title'] == 'First'
+    assert store.document('2401.00002')['status'] == 'failed'
+    assert '2401.00003' not in store
+    assert store.stats()['papers'] == 1
+    assert store.stats()['failed'] == 1
+
+
+def test_readers_in_other_processes_see_new_papers(tmp_path):
+    store = writer(tmp_path)
+    reader = ChunkStore(str(tmp_path))
+    store.append('2401.00001', 'First', ['one'])
+    assert reader.chunks('2401.00001') == ['one']
+    store.append('2401.00002', 'Second', ['two', 'three'])
+    assert reader.chunks('2401.00002') == ['two', 'three']
+
+
+def test_single_writer(tmp_path):
+    store = writer(tmp_path)
+    assert not ChunkStore(str(tmp_path)).open_for_writing()
+    with pytest.raises(RuntimeError):
+        ChunkStore(str(tmp_path)).append('2401.00001', 'x', ['y'])
+    crash(store)
+    assert ChunkStore(str(tmp_path)).open_for_writing()
+
+
+def test_recovery_truncates_uncommitted_writes(tmp_path):
+    store = writer(tmp_path)
+    store.append('2401.00001', 'First', ['alpha', 'beta'])
+    data_size = os.path.getsize(store.data_path)
+    index_size = os.path.getsize(store.index_path)
+    docs_size = os.path.getsize(store.docs_path)
+
+    # Crash mid-paper: chunks and index records written, commit line torn
+    with open(store.data_path, 'ab') as f:
+        f.write(b'orphan chunk text')
+    with open(store.index_path, 'ab') as f:
+        f.write(struct.pack('<QI', data_size, 17))
+    with open(store.docs_path, 'ab') as f:
+        f.write(b'{"id": "2401.00002", "title": "Sec')
+    crash(store)
+
+    recovered = writer(tmp_path)
+    assert os.path.getsize(recovered.data_path) == data_size
+    assert os.path.getsize(recovered.index_path) == index_size
+    assert os.path.getsize(recovered.docs_path) == docs_size
+    assert '2401.00002' not in recovered
+    assert recovered.chunks('2401.00001') == ['alpha', 'beta']
+
+    # Appends continue cleanly after recovery
+    recovered.append('2401.00002', 'Second', ['gamma'])
+    assert ChunkStore(str(tmp_path)).chunks('2401.00002') == ['gamma']
+
+
+def test_recovery_drops_chunks_without_commit_record(tmp_path):
+    store = writer(tmp_path)
+    store.append('2401.00001', 'First', ['alpha'])
+    committed = os.path.getsize(store.index_path)
+    # Crash after the chunk data but before the docs.jsonl line
+    with open(store.data_path, 'ab') as f:
+        f.write(b'lost')
+    with open(store.index_path, 'ab') as f:
+        f.write(struct.pack('<QI', 5, 4))
+    crash(store)
+
+    recovered = writer(tmp_path)
+    assert os.path.getsize(recovered.index_path) == committed
+    recovered.append('2401.00002', 'Second', ['beta'])
+    assert recovered.chunks('2401.00002') == ['beta']
+
+
+def test_passages_rank_matching_chunks(tmp_path):
+    store = writer(tmp_path)
+    store.append('2401.00001', 'Paper', ['intro text', 'loss function details', 'more loss loss', 'end'])
+    passages = store.passages('2401.00001', 'loss function', k=2)
+    assert [p['chunk'] for p in passages] == [1, 2]
+    assert passages[0]['arxiv_id'] == '2401.00001'
+
+
+def test_spool_round_trip(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    first = store.spool([{"arxiv_id": "2401.00001", "title": "a"}])
+    second = store.spool([{"arxiv_id": "2401.00002", "title": "b"}])
+    batches = store.spooled()
+    assert [name for name, _ in batches] == [first, second]
+    assert batches[1][1] == [{"arxiv_id": "2401.00002", "title": "b"}]
+    # Reading does not consume; files go once removed (or skipped when claimed)
+    assert [name for name, _ in store.spooled(skip=[first])] == [second]
+    store.remove_spooled(first)
+    store.remove_spooled(first)
+    assert [name for name, _ in store.spooled()] == [second]
+
+
+# ============================================================================
+# Helpers and pipeline
+# ============================================================================
+
+def test_chunk_text_overlaps():
+    text = ' '.join(f"word{i}" for i in range(500))
+    chunks = chunk_text(text, chunk_chars=200, overlap=50)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert chunks[0].split()[-1] in chunks[1]
+
+
+@pytest.mark.parametrize("key,valid", [
+    ('2401.12345', True),
+    ('0704.0001', True),
+    ('hep-th/9901001', True),
+    ('math.GT/0309136', True),
+    ('math/0309136', True),
+    ('../../etc/passwd', False),
+    ('2401.12345/../x', False),
+    ('http://example.com/x.pdf', False),
+    ('', False),
+])
+def test_is_arxiv_id(key, valid):
+    assert is_arxiv_id(paper_key(key)) is valid
+
+
+def test_submit_ignores_client_pdf_urls(tmp_path):
+    pipeline = IngestPipeline(ChunkStore(str(tmp_path)))
+    queued = pipeline.submit([
+        {"arxiv_id": "2401.00001v2", "pdf_url": "file:///etc/passwd"},
+        {"arxiv_id": "2401.00002", "pdf_url": "http://169.254.169.254/latest/meta-data"},
+        {"arxiv_id": "../secrets"},
+    ])
+    assert queued == 2
+    urls = [url for _, _, url in pipeline._todo.queue]
+    assert urls == ["https://arxiv.org/pdf/2401.00001", "https://arxiv.org/pdf/2401.00002"]
+    assert pipeline.stats()['invalid'] == 1
+    with pytest.raises(ValueError):
+        pipeline._download("file:///etc/passwd")
+
+
+def test_local_files_only_when_allowed(tmp_path):
+    pdf = tmp_path / "paper.pdf"
+    pdf.write_bytes(b'%PDF-1.4 test')
+    pipeline = IngestPipeline(ChunkStore(str(tmp_path / "store")), allow_local_files=True)
+    assert pipeline.submit([{"arxiv_id": "2401.00001", "pdf_url": str(pdf)}]) == 1
+    path = pipeline._download(str(pdf))
+    try:
+        with open(path, 'rb') as f:
+            assert f.read() == b'%PDF-1.4 test'
+    finally:
+        os.remove(path)
+
+
+def test_non_writer_spools_requests_for_the_writer(tmp_path):
+    pytest.importorskip('pypdf')
+    owner = ChunkStore(str(tmp_path))
+    assert owner.open_for_writing()
+    pipeline = IngestPipeline(ChunkStore(str(tmp_path)))
+    assert pipeline.request([{"arxiv_id": "2401.00001", "title": "t"}, {"arxiv_id": "bad id"}]) == 1
+    assert not pipeline.stats()['running']
+    assert [papers for _, papers in owner.spooled()] == [[{"arxiv_id": "2401.00001", "title": "t"}]]
+
+
+def test_spooled_papers_survive_a_writer_crash(tmp_path):
+    papers = [{"arxiv_id": f"2401.0000{i}", "title": str(i)} for i in range(3)]
+    first = IngestPipeline(writer(tmp_path))
+    first.store.spool(papers)
+    first._take_spooled()
+    assert first._todo.qsize() == 3
+    first._finish('2401.00000', '0', ['zero'], 'ok')
+    # The writer dies with two papers still queued in memory
+    crash(first.store)
+
+    second = IngestPipeline(writer(tmp_path))
+    second._take_spooled()
+    assert [key for key, _, _ in second._todo.queue] == ['2401.00001', '2401.00002']
+    # A file being worked on is not queued twice
+    second._take_spooled()
+    assert second._todo.qsize() == 2
+
+    second._finish('2401.00001', '1', ['one'], 'ok')
+    assert len(second.store.spooled()) == 1
+    second._finish('2401.00002', '2', [], 'failed')
+    assert second.store.spooled() == []
+
+
+def test_uncommitted_papers_keep_their_spool_file(tmp_path):
+    pipeline = IngestPipeline(writer(tmp_path))
+    pipeline.store.spool([{"arxiv_id": "2401.00001", "title": "a"}, {"arxiv_id": "2401.00002", "title": "b"}])
+    pipeline._take_spooled()
+    pipeline._finish('2401.00001', 'a', ['alpha'], 'ok')
+    # E.g. a download that failed with a transient error
+    pipeline._release('2401.00002', committed=False)
+    assert len(pipeline.store.spooled()) == 1
+    assert pipeline.stats()['pending'] == 0
+
+
+def extract_in_pool(tmp_path, names, monkeypatch):
+    """Run papers through the extract stage with the stand-in extractor."""
+    monkeypatch.setattr(ingest, 'extract_chunks', ingest_workers.extract)
+    pipeline = IngestPipeline(writer(tmp_path / "store"), extract_workers=1)
+    threading.Thread(target=pipeline._extract_loop, daemon=True).start()
+    paths = []
+    for i, name in enumerate(names):
+        path = tmp_path / f"{name}-{i}.pdf"
+        path.write_bytes(b'%PDF')
+        paths.append(path)
+        pipeline._downloaded.put((f"2401.0000{i}", name, str(path)))
+    pipeline._downloaded.join()
+    return pipeline, paths
+
+
+def test_papers_lost_to_a_crashed_worker_are_retried(tmp_path, monkeypatch):
+    pipeline, paths = extract_in_pool(tmp_path, ['crash-once', 'bystander'], monkeypatch)
+    stats = pipeline.stats()
+    # The crash broke the pool under both papers; both succeed on the new one
+    assert stats['pool_restarts'] == 1
+    assert stats['extract_retries'] == 2
+    assert stats['stored'] == 2
+    assert 'failed' not in stats
+    assert pipeline.store.chunks('2401.00001') == ["text of bystander-1.pdf"]
+    assert not any(path.exists() for path in paths)
+    pipeline._pool.shutdown()
+
+
+def test_paper_that_crashes_again_fails_and_is_not_retried_twice(tmp_path, monkeypatch):
+    pipeline, paths = extract_in_pool(tmp_path, ['crash-always'], monkeypatch)
+    stats = pipeline.stats()
+    assert stats['extract_retries'] == 1
+    assert stats['pool_restarts'] == 2
+    assert stats['failed'] == 1
+    assert pipeline.store.document('2401.00000')['status'] == 'failed'
+    assert not paths[0].exists()
+    # The replacement pool keeps working
+    assert pipeline._pool.executor.submit(abs, -3).result() == 3
+    pipeline._pool.shutdown()
@@ -0,0 +1,156 @@
+"""
+ResearchForge AI - Background job tests
+"""
+
+import threading
+import os
+import time
+
+import time
+
+import pytest
+
+from jobs import JobManager, QueueFull, parse_queue_limits
+
+TIMEOUT = 60
+
+
+def manager(tmp_path, queues, max_workers, **kwargs):
+    jobs = JobManager(queues, max_workers=max_workers, directory=str(tmp_path / "jobs"), **kwargs)
+    for queue in queues:
+        jobs.register(f'timed_{queue}', 'job_handlers:timed', queue)
+        jobs.register(f'crash_once_{queue}', 'job_handlers:crash_once', queue)
+        jobs.register(f'crash_{queue}', 'job_handlers:crash', queue)
+        jobs.register(f'partial_{queue}', 'job_handlers:partial', queue)
+    return jobs
+
+
+def wait(jobs, job_id):
+    snapshots = list(jobs.watch(job_id, timeout=TIMEOUT))
+    return snapshots[-1]
+
+
+def test_higher_priority_runs_first(tmp_path):
+    jobs = manager(tmp_path, {"q": 1}, max_workers=1)
+    blocker = jobs.submit('timed_q', {"name": "blocker", "seconds": 1.0})
+    low_1 = jobs.submit('timed_q', {"name": "low-1"}, priority='low')
+    low_2 = jobs.submit('timed_q', {"name": "low-2"}, priority='low')
+    high = jobs.submit('timed_q', {"name": "high"}, priority='high')
+    assert jobs.get(high['id'])['status'] == 'queued'
+
+    finished = [wait(jobs, job['id']) for job in (blocker, low_1, low_2, high)]
+    assert all(job['status'] == 'succeeded' for job in finished)
+    order = sorted(finished, key=lambda job: job['result']['started'])
+    assert [job['result']['name'] for job in order] == ['blocker', 'high', 'low-1', 'low-2']
+
+
+def test_per_queue_limits(tmp_path):
+    jobs = manager(tmp_path, {"one": 1, "two": 2}, max_workers=3)
+    ones = [jobs.submit('timed_one', {"name": f"one-{i}", "seconds": 0.5}) for i in range(3)]
+    twos = [jobs.submit('timed_two', {"name": f"two-{i}", "seconds": 1.5}) for i in range(2)]
+    ones = [wait(jobs, job['id'])['result'] for job in ones]
+    twos = [wait(jobs, job['id'])['result'] for job in twos]
+
+    def overlap(a, b):
+        return a['started'] < b['ended'] and b['started'] < a['ended']
+
+    # Queue "one" never runs two jobs at once; queue "two" runs both together
+    assert not any(overlap(a, b) for i, a in enumerate(ones) for b in ones[i + 1:])
+    assert overlap(twos[0], twos[1])
+
+
+def test_crashed_worker_retries_affected_jobs_once(tmp_path):
+    jobs = manager(tmp_path, {"q": 2}, max_workers=2)
+    marker = str(tmp_path / "crashed")
+    bystander = jobs.submit('timed_q', {"name": "bystander", "seconds": 2.0})
+    culprit = jobs.submit('crash_once_q', {"name": "culprit", "marker": marker})
+
+    culprit = wait(jobs, culprit['id'])
+    bystander = wait(jobs, bystander['id'])
+    assert culprit['status'] == 'succeeded'
+    assert culprit['attempts'] == 2
+    # The job sharing the pool with the crash is retried, not failed
+    assert bystander['status'] == 'succeeded'
+    assert bystander['result']['name'] == 'bystander'
+
+    # The replacement pool keeps working
+    assert wait(jobs, jobs.submit('timed_q', {"name": "after"})['id'])['status'] == 'succeeded'
+
+
+def test_job_that_always_crashes_fails_after_retry(tmp_path):
+    jobs = manager(tmp_path, {"q": 1}, max_workers=1)
+    submitted = jobs.submit('crash_q', {})
+    (first_listener,) = [listener for _, listener in jobs._listeners.values()]
+    job = wait(jobs, submitted['id'])
+    assert job['status'] == 'failed'
+    assert job['attempts'] == 2
+    assert job['error']
+
+    # Replaced pools' progress listeners are stopped; only the current pool's runs
+    first_listener.join(timeout=5)
+    assert not first_listener.is_alive()
+    assert len(jobs._listeners) == 1
+
+
+def test_queue_timeout_fails_the_job(tmp_path):
+    jobs = manager(tmp_path, {"slow": 1, "fast": 1}, max_workers=2, timeouts={"fast": 0.5})
+    slow = jobs.submit('timed_slow', {"name": "slow", "seconds": 1.0})
+    started = time.monotonic()
+    job = wait(jobs, jobs.submit('timed_fast', {"name": "fast", "seconds": 30})['id'])
+    assert time.monotonic() - started < 10
+    assert job['status'] == 'failed'
+    assert job['attempts'] == 1
+    assert 'timed out after 0.5s' in job['error']
+    # Only the "fast" queue has a timeout, and the pool is not replaced
+    assert wait(jobs, slow['id'])['status'] == 'succeeded'
+    assert jobs._pool.restarts == 0
+
+    with pytest.raises(ValueError):
+        manager(tmp_path, {"q": 1}, max_workers=1, timeouts={"other": 1})
+
+
+def test_finished_jobs_expire_on_status_polls(tmp_path):
+    jobs = manager(tmp_path, {"q": 1}, max_workers=1, ttl_seconds=0.5)
+    job = wait(jobs, jobs.submit('partial_q', {})['id'])
+    output = jobs.output_file(job)
+    assert output is not None
+    time.sleep(1.0)
+    assert jobs.get(job['id']) is None
+    assert not os.path.exists(output)
+
+
+def test_partial_result_is_its_own_status(tmp_path):
+    jobs = manager(tmp_path, {"q": 1}, max_workers=1)
+    job = wait(jobs, jobs.submit('partial_q', {})['id'])
+    assert job['status'] == 'partial'
+    assert job['result']['message'] == "arXiv went away"
+    assert jobs.output_file(job) is not None
+
+
+def test_cancel_and_queue_full(tmp_path):
+    jobs = manager(tmp_path, {"q": 1}, max_workers=1, max_waiting=2)
+    running = jobs.submit('timed_q', {"name": "running", "seconds": 1.0})
+    waiting = jobs.submit('timed_q', {"name": "waiting"})
+    jobs.submit('timed_q', {"name": "waiting-2"})
+    with pytest.raises(QueueFull):
+        jobs.submit('timed_q', {"name": "one too many"})
+
+    assert jobs.cancel(waiting['id'])
+    assert jobs.get(waiting['id'])['status'] == 'cancelled'
+    assert not jobs.cancel(waiting['id'])
+    assert wait(jobs, running['id'])['status'] == 'succeeded'
+
+
+def test_submit_validation(tmp_path):
+    jobs = manager(tmp_path, {"q": 1}, max_workers=1)
+    with pytest.raises(ValueError):
+        jobs.submit('unknown', {})
+    with pytest.raises(ValueError):
+        jobs.submit('timed_q', {"name": "x"}, priority='urgent')
+    with pytest.raises(TypeError):
+        jobs.submit('timed_q', {"name": object()})
+
+
+def test_parse_queue_limits():
+    assert parse_queue_limits("llm=2, export=1") == {"llm": 2, "export": 1}
+    assert parse_queue_limits("llm=600,export=0.5", float) == {"llm": 600.0, "export": 0.5}
@@ -0,0 +1,91 @@
+"""
+ResearchForge AI - Mail merge tests
+"""
+
+import pytest
+
+from mailmerge import CompiledTemplate, iter_merge, prepare_renderer
+
+
+# ============================================================================
+# CompiledTemplate
+# ============================================================================
+
+def test_template_renders_fields_and_defaults():
+    template = CompiledTemplate("Dear {name}, about {topic}.")
+    assert template.fields == frozenset({"name", "topic"})
+    assert template.render({"name": "Ada"}, {"topic": "GNNs"}) == "Dear Ada, about GNNs."
+
+
+def test_template_missing_field_raises_key_error():
+    with pytest.raises(KeyError):
+        CompiledTemplate("Dear {name}").render({})
+
+
+@pytest.mark.parametrize("source", [
+    "{name!r}",             # conversion
+    "{name:d}",             # format spec that fails on strings
+    "{name:>999999999}",    # format spec that allocates ~1 GB
+    "{name.attr}",          # attribute access
+    "{items[0]}",           # indexing
+])
+def test_template_rejects_anything_but_bare_fields(source):
+    with pytest.raises(ValueError):
+        CompiledTemplate(source)
+
+
+def test_prepare_renderer_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        prepare_renderer("letter")
+    with pytest.raises(ValueError):
+        prepare_renderer("email", {"body": "x"})
+    with pytest.raises(ValueError):
+        prepare_renderer("proposal", "not a dict")
+
+
+# ============================================================================
+# iter_merge
+# ============================================================================
+
+class Unprintable:
+    def __str__(self):
+        raise ValueError("cannot render")
+
+
+def test_merge_reports_errors_per_record_and_keeps_going():
+    records = [
+        {"name": "Ada", "id": "r1"},
+        "not an object",
+        {},
+        {"name": Unprintable()},
+        {"name": "Grace"},
+    ]
+    results = list(iter_merge("email", records, template="Hi {name}"))
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert [r["status"] for r in results] == ["success", "error", "error", "error", "success"]
+    assert results[0]["email_draft"] == "Hi Ada"
+    assert results[0]["id"] == "r1"
+    assert "JSON object" in results[1]["message"]
+    assert results[2]["message"] == "Missing field: name"
+    assert "cannot render" in results[3]["message"]
+
+
+def test_merge_validates_template_before_reading_records():
+    def records():
+        raise AssertionError("records must not be read")
+        yield  # pragma: no cover
+
+    with pytest.raises(ValueError):
+        iter_merge("email", records(), template="{name:d}")
+
+
+def test_merge_personalization_failure_keeps_rendered_draft():
+    def personalize(kind, record, result):
+        raise RuntimeError("model unavailable")
+
+    records = [{"name": f"R{i}"} for i in range(5)]
+    results = list(iter_merge(
+        "email", records, template="Hi {name}", personalize=personalize, batch_size=2, concurrency=2
+    ))
+    assert [r["email_draft"] for r in results] == [f"Hi R{i}" for i in range(5)]
+    assert all(r["status"] == "success" and r["personalized"] is False for r in results)
@@ -0,0 +1,137 @@
+"""
+ResearchForge AI - Paper record and JSON encoder tests
+"""
+
+import datetime
+import json
+
+import pytest
+
+import papers
+from papers import PaperRecord, dumps_json
+
+DATA = {
+    "title": "Attention Is All You Need",
+    "authors": ["Ashish Vaswani", "Noam Shazeer"],
+    "arxiv_id": "1706.03762v7",
+    "published": "2017-06-12",
+    "abstract": "The dominant sequence transduction models...",
+}
+
+
+@pytest.fixture
+def record():
+    return PaperRecord.from_dict(DATA)
+
+
+# ============================================================================
+# PaperRecord
+# ============================================================================
+
+def test_mapping_access(record):
+    assert record['title'] == DATA['title']
+    assert record['authors'] == DATA['authors']
+    assert record.get('published') == '2017-06-12'
+    assert record.get('missing', 'fallback') == 'fallback'
+    with pytest.raises(KeyError):
+        record['missing']
+    # Slots hold the fields; nothing else can be set or looked up
+    with pytest.raises(AttributeError):
+        record.extra = 1
+    assert dict((key, record[key]) for key in record.keys())['arxiv_id'] == '1706.03762v7'
+
+
+def test_urls_are_derived_from_the_id(record):
+    assert record['pdf_url'] == "https://arxiv.org/pdf/1706.03762v7"
+    assert record.web_url == "https://arxiv.org/abs/1706.03762v7"
+    assert 'pdf_url' not in PaperRecord.__slots__
+    record.arxiv_id = '2401.00001'
+    assert record.pdf_url == "https://arxiv.org/pdf/2401.00001"
+
+
+def test_from_dict_defaults_and_equality(record):
+    empty = PaperRecord.from_dict({})
+    assert empty.arxiv_id == 'unknown'
+    assert empty.authors == ()
+    assert PaperRecord.from_dict(dict(DATA)) == record
+    assert PaperRecord.from_dict(dict(DATA, title="Other")) != record
+
+
+def test_to_dict_is_the_public_api_shape(record):
+    assert record.to_dict() == dict(
+        DATA, pdf_url="https://arxiv.org/pdf/1706.03762v7", web_url="https://arxiv.org/abs/1706.03762v7"
+    )
+
+
+# ============================================================================
+# dumps_json
+# ============================================================================
+
+def encoders():
+    if papers.orjson is None:
+        return [_without_orjson]
+    return [dumps_json, _without_orjson]
+
+
+def _without_orjson(*args, **kwargs):
+    saved, papers.orjson = papers.orjson, None
+    try:
+        return dumps_json(*args, **kwargs)
+    finally:
+        papers.orjson = saved
+
+
+@pytest.mark.parametrize("sort_keys", [False, True])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_orjson_and_stdlib_agree(record, sort_keys, indent):
+    payload = {
+        "papers": [record, record.to_dict()],
+        "tags": frozenset(["x"]),
+        "pair": (1, 2),
+        "unicode": "Schrödinger — π",
+        "count": 2,
+        "none": None,
+    }
+    outputs = [encode(payload, sort_keys=sort_keys, indent=indent) for encode in encoders()]
+    assert all(output == outputs[0] for output in outputs)
+    decoded = json.loads(outputs[0])
+    assert decoded["papers"][0] == decoded["papers"][1] == record.to_dict()
+    # Compact output and raw UTF-8, like orjson
+    assert "Schrödinger".encode('utf-8') in outputs[0]
+    if indent is None:
+        assert b", " not in outputs[0] and b": " not in outputs[0]
+
+
+def test_unknown_types_raise():
+    for encode in encoders():
+        with pytest.raises(TypeError):
+            encode({"obj": object()})
+
+
+def test_custom_default_also_sees_dates():
+    def default(obj):
+        if isinstance(obj, datetime.date):
+            return "DATE"
+        return papers.json_default(obj)
+
+    day = datetime.date(2024, 1, 2)
+    for encode in encoders():
+        assert json.loads(encode({"d": day}, default=default)) == {"d": "DATE"}
+
+
+# ============================================================================
+# Flask JSON provider
+# ============================================================================
+
+def test_jsonify_uses_the_provider(record):
+    import main
+    with main.app.test_request_context():
+        response = main.jsonify({"papers": [record], "when": datetime.datetime(2024, 1, 2, 3, 4, 5)})
+        assert response.mimetype == 'application/json'
+        body = json.loads(response.get_data())
+        assert body["papers"] == [record.to_dict()]
+        # HTTP dates, as with Flask's default provider
+        assert body["when"] == "Tue, 02 Jan 2024 03:04:05 GMT"
+        assert main.jsonify(1, 2).get_json() == [1, 2]
+        assert main.jsonify(a=1).get_json() == {"a": 1}
+        assert main.jsonify().get_json() is None
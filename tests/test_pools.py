@@ -0,0 +1,40 @@
+"""
+ResearchForge AI - Process pool tests
+"""
+
+import os
+
+import pytest
+
+from pools import ReplaceablePool, is_broken_pool, spawn_pool
+
+
+def test_replaces_a_broken_pool_once():
+    pool = ReplaceablePool(lambda: spawn_pool(1), 'test')
+    broken = pool.executor
+    with pytest.raises(Exception) as info:
+        broken.submit(os._exit, 1).result()
+    assert is_broken_pool(info.value)
+    assert not is_broken_pool(RuntimeError("BrokenProcessPool"))
+
+    assert pool.replace(broken)
+    # Later failures from the same crash do not replace the new pool again
+    assert not pool.replace(broken)
+    assert pool.restarts == 1
+    assert pool.executor is not broken
+    assert pool.executor.submit(abs, -3).result() == 3
+    pool.shutdown()
+
+
+def test_executor_is_created_lazily_and_kept():
+    created = []
+
+    def create():
+        created.append(spawn_pool(1))
+        return created[-1]
+
+    pool = ReplaceablePool(create)
+    assert created == []
+    assert pool.executor is pool.executor
+    assert len(created) == 1
+    pool.shutdown()
@@ -0,0 +1,177 @@
+"""
+ResearchForge AI - Upstream resilience tests
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import resilience
+from resilience import (
+    Deadline, DeadlineExceeded, RetryBudget, call_with_retries, deadline_scope,
+    is_retryable, retry_after_seconds
+)
+
+
+class HTTPError(Exception):
+    """Stands in for requests.HTTPError (status and headers on `response`)."""
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(f"HTTP {status}")
+        headers = {'Retry-After': retry_after} if retry_after is not None else {}
+        self.response = SimpleNamespace(status_code=status, headers=headers)
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    budget = RetryBudget(ratio=0.1, min_per_second=0.0, max_tokens=20.0)
+    monkeypatch.setitem(resilience.RETRY_BUDGETS, "test", budget)
+    return budget
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(resilience.time, 'sleep', recorded.append)
+    return recorded
+
+
+def failing(errors, result="ok"):
+    """fn(timeout) that raises the given errors in turn, then returns result."""
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    fn.calls = calls
+    return fn
+
+
+# ============================================================================
+# Backoff and Retry-After
+# ============================================================================
+
+def test_retries_until_success_with_bounded_full_jitter(budget, sleeps):
+    fn = failing([HTTPError(503)] * 3)
+    assert call_with_retries(fn, "test", max_attempts=4, base_delay=0.5, max_delay=1.5) == "ok"
+    assert len(fn.calls) == 4
+    # Full jitter: attempt n sleeps in [0, min(max_delay, base * 2^(n-1))]
+    for sleep, cap in zip(sleeps, (0.5, 1.0, 1.5)):
+        assert 0 <= sleep <= cap
+    assert budget.retries == 3
+
+
+def test_gives_up_after_max_attempts(budget, sleeps):
+    fn = failing([HTTPError(503)] * 5)
+    with pytest.raises(HTTPError):
+        call_with_retries(fn, "test", max_attempts=3)
+    assert len(fn.calls) == 3
+
+
+def test_honors_retry_after(budget, sleeps):
+    fn = failing([HTTPError(429, retry_after="7")])
+    assert call_with_retries(fn, "test", max_retry_after=30) == "ok"
+    assert sleeps == [7.0]
+
+
+def test_retry_after_above_the_cap_fails_without_deadline(budget, sleeps):
+    fn = failing([HTTPError(429, retry_after="120")])
+    with pytest.raises(HTTPError):
+        call_with_retries(fn, "test", max_retry_after=30)
+    assert sleeps == []
+    assert len(fn.calls) == 1
+
+
+def test_retry_after_parsing():
+    assert retry_after_seconds(HTTPError(429, retry_after="2.5")) == 2.5
+    assert retry_after_seconds(HTTPError(429, retry_after="-3")) == 0.0
+    assert retry_after_seconds(HTTPError(429, retry_after="soon")) is None
+    assert retry_after_seconds(HTTPError(429)) is None
+    http_date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(time.time() + 60))
+    assert 55 <= retry_after_seconds(HTTPError(503, retry_after=http_date)) <= 61
+
+
+# ============================================================================
+# Budget and non-retryable errors
+# ============================================================================
+
+def test_exhausted_budget_stops_retries(budget, sleeps):
+    budget._tokens = 1.0
+    first = failing([HTTPError(503)])
+    assert call_with_retries(first, "test") == "ok"
+    # 1 - 1 spent + 2 * 0.1 deposited: below one token
+    second = failing([HTTPError(503)])
+    with pytest.raises(HTTPError):
+        call_with_retries(second, "test")
+    assert len(second.calls) == 1
+    assert budget.stats()["retries_rejected"] == 1
+
+
+def test_budget_refills_with_traffic():
+    budget = RetryBudget(ratio=0.5, min_per_second=0.0, max_tokens=2.0)
+    budget._tokens = 0.0
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
+    for _ in range(10):
+        budget.record_request()
+    assert budget.stats()["tokens"] == 2.0
+
+
+@pytest.mark.parametrize("error", [HTTPError(400), HTTPError(404), ValueError("bad")])
+def test_non_retryable_errors_fail_fast(budget, sleeps, error):
+    fn = failing([error])
+    with pytest.raises(type(error)):
+        call_with_retries(fn, "test")
+    assert len(fn.calls) == 1
+    assert sleeps == []
+    assert budget.retries == 0
+
+
+def test_is_retryable():
+    assert is_retryable(HTTPError(429))
+    assert is_retryable(HTTPError(503))
+    assert is_retryable(TimeoutError())
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(HTTPError(403))
+    assert not is_retryable(DeadlineExceeded())
+    assert is_retryable(SimpleNamespace(code=500, response=None))
+
+
+# ============================================================================
+# Deadlines
+# ============================================================================
+
+def test_attempt_timeout_is_capped_by_the_deadline(budget):
+    fn = failing([])
+    call_with_retries(fn, "test", deadline=Deadline(2.0), attempt_timeout=10.0)
+    assert 1.5 < fn.calls[0] <= 2.0
+
+
+def test_no_retry_when_backoff_would_pass_the_deadline(budget, sleeps):
+    fn = failing([HTTPError(429, retry_after="5")])
+    with pytest.raises(HTTPError):
+        call_with_retries(fn, "test", deadline=Deadline(1.0))
+    assert sleeps == []
+
+
+def test_expired_deadline_raises_before_calling(budget):
+    fn = failing([])
+    with pytest.raises(DeadlineExceeded):
+        call_with_retries(fn, "test", deadline=Deadline(0.0))
+    assert fn.calls == []
+
+
+def test_deadline_scope_is_ambient_and_only_shortens(budget):
+    with deadline_scope(1.0) as outer:
+        with deadline_scope(60.0) as inner:
+            assert inner is outer
+        fn = failing([])
+        call_with_retries(fn, "test", attempt_timeout=10.0)
+        assert fn.calls[0] <= 1.0
+    assert resilience.current_deadline() is None
@@ -0,0 +1,142 @@
+"""
+ResearchForge AI - Chat history tests
+"""
+
+import threading
+
+import pytest
+
+from sessions import (
+    CHARS_PER_TOKEN, SUMMARY_BUDGET_RATIO, SQLiteSessionStore, conversation_turns,
+    estimate_tokens, is_valid_session_id, summarize_turns, trim_history
+)
+
+
+def exchange(i, size=40):
+    return [
+        {"role": "user", "text": f"Question {i}. " + "q" * size},
+        {"role": "model", "text": f"Answer {i}. " + "a" * size},
+    ]
+
+
+def history(n, size=40):
+    return [turn for i in range(n) for turn in exchange(i, size)]
+
+
+# ============================================================================
+# summarize_turns
+# ============================================================================
+
+def test_summarize_keeps_first_sentence_of_user_turns():
+    dropped = [
+        {"role": "user", "text": "Find papers on graph networks. Also list authors."},
+        {"role": "model", "text": "Here are some papers."},
+    ]
+    summary = summarize_turns("", dropped, token_budget=100)
+    assert "graph networks" in summary
+    assert "list authors" not in summary
+    assert "Here are some papers" not in summary
+
+
+def test_summarize_drops_oldest_topics_to_fit_budget():
+    dropped = [{"role": "user", "text": f"Topic number {i} is interesting."} for i in range(50)]
+    summary = summarize_turns("", dropped, token_budget=40)
+    assert len(summary) <= 40 * CHARS_PER_TOKEN
+    assert "Topic number 49" in summary
+    assert "Topic number 0 " not in summary
+
+
+def test_summarize_extends_previous_summary():
+    first = summarize_turns("", [{"role": "user", "text": "Quantum annealing."}], 100)
+    second = summarize_turns(first, [{"role": "user", "text": "Protein folding."}], 100)
+    assert "Quantum annealing" in second
+    assert "Protein folding" in second
+
+
+# ============================================================================
+# trim_history
+# ============================================================================
+
+def test_trim_within_budget_is_unchanged():
+    turns = history(2)
+    assert trim_history("", turns, token_budget=4000, max_turns=20) == ("", turns)
+
+
+def test_trim_enforces_max_turns_in_pairs():
+    summary, turns = trim_history("", history(6), token_budget=4000, max_turns=4)
+    assert len(turns) == 4
+    assert turns[0]["role"] == "user"
+    assert turns[0]["text"].startswith("Question 4.")
+    assert "Question 0" in summary
+
+
+def test_trim_enforces_token_budget():
+    budget = 200
+    summary, turns = trim_history("", history(10, size=200), token_budget=budget, max_turns=100)
+    history_budget = budget - int(budget * SUMMARY_BUDGET_RATIO)
+    assert turns[0]["role"] == "user"
+    # Only the newest exchange is kept when a single one exceeds the budget
+    assert len(turns) == 2 or sum(estimate_tokens(t["text"]) for t in turns) <= history_budget
+    assert estimate_tokens(summary) <= int(budget * SUMMARY_BUDGET_RATIO)
+
+
+def test_trim_always_keeps_newest_exchange():
+    huge = exchange(0, size=100000)
+    summary, turns = trim_history("", huge, token_budget=100, max_turns=20)
+    assert turns == huge
+
+
+# ============================================================================
+# conversation_turns
+# ============================================================================
+
+def test_conversation_turns_alternate_with_summary_in_first_user_turn():
+    turns = conversation_turns("Earlier: graph networks.", history(2), "Next question")
+    roles = [turn["role"] for turn in turns]
+    assert roles == ["user", "model", "user", "model", "user"]
+    assert turns[0]["text"].startswith("[Context from earlier in this conversation]")
+    assert "Earlier: graph networks." in turns[0]["text"]
+    assert turns[-1]["text"] == "Next question"
+
+
+def test_conversation_turns_without_history():
+    turns = conversation_turns("Earlier: graph networks.", [], "Hello")
+    assert len(turns) == 1
+    assert turns[0]["role"] == "user"
+    assert turns[0]["text"].endswith("Hello")
+
+
+# ============================================================================
+# Session ids and the SQLite store
+# ============================================================================
+
+@pytest.mark.parametrize("value,valid", [
+    ('3f2b8c1e-0d4a-4e5f-9a7b-1c2d3e4f5a6b', True),
+    ('user_42', True),
+    ('x' * 64, True),
+    ('x' * 65, False),
+    ('', False),
+    ('../etc', False),
+    ('id with spaces', False),
+    ({'$ne': None}, False),
+    (42, False),
+    (None, False),
+])
+def test_is_valid_session_id(value, valid):
+    assert is_valid_session_id(value) is valid
+
+
+def test_sqlite_store_concurrent_saves_count_every_write(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), evict_every=1000)
+
+    def worker(n):
+        for i in range(25):
+            store.append(f"s{n}", f"question {i}", f"answer {i}")
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert next(store._writes) == 101
+    assert all(store.get(f"s{n}")[1] for n in range(4))
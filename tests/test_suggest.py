@@ -0,0 +1,138 @@
+"""
+ResearchForge AI - Search suggestion tests
+"""
+
+import threading
+
+from suggest import QUERY_WEIGHT, PrefixIndex, QueryGate, create_suggest_index
+
+
+def texts(suggestions):
+    return [s["text"] for s in suggestions]
+
+
+# ============================================================================
+# PrefixIndex
+# ============================================================================
+
+def test_ranks_by_weight_and_is_case_insensitive():
+    index = PrefixIndex(rebuild_threshold=1000)
+    index.add("Graph Neural Networks", 1.0, 'title')
+    index.add("graph theory", 5.0, 'title')
+    index.add("Graphene", 3.0, 'title')
+    index.add("Quantum graphs", 10.0, 'title')
+    assert texts(index.suggest("GRA")) == ["graph theory", "Graphene", "Graph Neural Networks"]
+    assert texts(index.suggest("graph ")) == ["graph theory", "Graph Neural Networks"]
+    assert index.suggest("") == []
+
+
+def test_repeated_adds_accumulate_weight():
+    index = PrefixIndex(rebuild_threshold=1000)
+    index.add("alpha", 2.0, 'title')
+    for _ in range(3):
+        index.add("alpine", 1.0, 'title')
+    assert texts(index.suggest("alp")) == ["alpine", "alpha"]
+
+
+def test_rebuild_merges_pending_entries():
+    index = PrefixIndex(rebuild_threshold=1000)
+    index.add_many([("transformers", 2.0, 'title'), ("transfer learning", 1.0, 'title')])
+    assert len(index._pending.increments) == 0
+    index.add("transfer learning", 5.0, 'query')
+    index.rebuild()
+    assert len(index._pending.increments) == 0
+    result = index.suggest("trans")
+    assert texts(result) == ["transfer learning", "transformers"]
+    # A typed query takes over the display text and kind of a title
+    assert result[0]["type"] == 'query'
+
+
+def test_precomputed_top_k_matches_full_scan():
+    index = PrefixIndex(k=5, scan_limit=16)
+    # Distinct weights in shuffled order, so the expected ranking has no ties
+    items = [(f"topic {i:04d}", float(i * 7919 % 2000), 'title') for i in range(2000)]
+    index.add_many(items)
+    assert "t" in index._snapshot.top
+    expected = sorted(items, key=lambda item: -item[1])[:5]
+    assert [s["text"] for s in index.suggest("t", 5)] == [text for text, _, _ in expected]
+
+
+def test_add_many_during_a_background_rebuild_does_not_start_another():
+    index = PrefixIndex(rebuild_threshold=2)
+    started = threading.Event()
+    release = threading.Event()
+    running = []
+    passes = []
+    precompute = index._precompute
+
+    def slow_precompute(keys, weights):
+        running.append(1)
+        assert len(running) == 1, "two rebuilds ran at once"
+        if not passes:
+            started.set()
+            release.wait(5)
+        passes.append(list(keys))
+        running.pop()
+        return precompute(keys, weights)
+
+    index._precompute = slow_precompute
+    index.add("alpha", 1.0, 'title')
+    index.add("beta", 1.0, 'title')  # threshold reached: background rebuild
+    rebuilder = next(t for t in threading.enumerate() if t.name == "suggest-rebuild")
+    assert started.wait(5)
+
+    index.add_many([("gamma", 3.0, 'title')])
+    # Handed to the running rebuild instead of rebuilding concurrently
+    assert index._rebuild_again
+    assert texts(index.suggest("gam")) == ["gamma"]
+
+    release.set()
+    rebuilder.join(5)
+    assert passes == [["alpha", "beta"], ["alpha", "beta", "gamma"]]
+    assert not index._rebuilding
+    assert len(index._pending.increments) == 0
+    index.rebuild()
+    assert len(passes) == 3
+
+
+def test_max_terms_keeps_heaviest():
+    index = PrefixIndex(max_terms=10)
+    index.add_many([(f"term {i:02d}", float(i), 'title') for i in range(50)])
+    assert len(index) == 10
+    assert texts(index.suggest("term", 3)) == ["term 49", "term 48", "term 47"]
+
+
+def test_seeded_with_categories():
+    index = create_suggest_index()
+    assert "Machine Learning" in texts(index.suggest("machine"))
+
+
+# ============================================================================
+# QueryGate
+# ============================================================================
+
+def test_query_needs_distinct_sources_before_publishing():
+    index = PrefixIndex(rebuild_threshold=1000)
+    gate = QueryGate(index, min_sources=3)
+    for source in ("a", "a", "a", "b"):
+        gate.observe("jane doe medical records", source)
+    assert index.suggest("jane") == []
+    gate.observe("Jane  Doe medical records", "c")
+    assert texts(index.suggest("jane")) == ["Jane Doe medical records"]
+    weight = index._pending.increments["jane doe medical records"]
+    assert weight == QUERY_WEIGHT * 3
+    # Once published, every occurrence counts
+    gate.observe("jane doe medical records", "a")
+    assert index._pending.increments["jane doe medical records"] == QUERY_WEIGHT * 4
+
+
+def test_query_gate_forgets_oldest_pending_queries():
+    index = PrefixIndex(rebuild_threshold=1000)
+    gate = QueryGate(index, min_sources=2, max_tracked=2)
+    gate.observe("first", "a")
+    gate.observe("second", "a")
+    gate.observe("third", "a")
+    gate.observe("first", "b")
+    assert index.suggest("first") == []
+    gate.observe("third", "b")
+    assert texts(index.suggest("third")) == ["third"]